@@ -3,6 +3,7 @@
 
 ## Must run with Python 3!!
 
+import os
 import pickle as pkl
 from math import pi
 import numpy as np
@@ -21,13 +22,15 @@ class TwoVTwo:
         self.dy_3_limits = [0, 657] 
 
         
-        self.ADDR_TORQUE_ENABLE          = 24
-        self.ADDR_LED_RED                = 65
-        self.LEN_LED_RED                 = 1         # Data Byte Length
-        self.ADDR_GOAL_POSITION          = 30
-        self.LEN_GOAL_POSITION           = 4         # Data Byte Length
-        self.ADDR_PRESENT_POSITION       = 37
-        self.LEN_PRESENT_POSITION        = 4         # Data Byte Length
+        # Register addresses and byte lengths come from the XL-320 control table
+        self.control_table               = getControlTable(XL320)
+        self.ADDR_TORQUE_ENABLE          = self.control_table.TORQUE_ENABLE.address
+        self.ADDR_LED_RED                = self.control_table.LED.address
+        self.LEN_LED_RED                 = self.control_table.LED.size              # Data Byte Length
+        self.ADDR_GOAL_POSITION          = self.control_table.GOAL_POSITION.address
+        self.LEN_GOAL_POSITION           = self.control_table.GOAL_POSITION.size    # Data Byte Length
+        self.ADDR_PRESENT_POSITION       = self.control_table.PRESENT_POSITION.address
+        self.LEN_PRESENT_POSITION        = self.control_table.PRESENT_POSITION.size # Data Byte Length
         self.DXL_MINIMUM_POSITION_VALUE  = 0         # Refer to the Minimum Position Limit of product eManual
         self.DXL_MAXIMUM_POSITION_VALUE  = 4095      # Refer to the Maximum Position Limit of product eManual
         self.BAUDRATE                    = 57600
@@ -44,7 +47,7 @@ class TwoVTwo:
 
 
         # Verify this!!
-        self.DEVICENAME                  = '/dev/ttyUSB0'
+        self.DEVICENAME                  = os.environ.get('DXL_DEVICENAME', '/dev/ttyUSB0')    # DXL_DEVICENAME: e.g. the pty of dynamixel_sdk.simulator
 
         self.TORQUE_ENABLE               = 1                 # Value for enabling the torque
         self.TORQUE_DISABLE              = 0                 # Value for disabling the torque
@@ -77,8 +80,8 @@ class TwoVTwo:
         # Get methods and members of Protocol1PacketHandler or Protocol2PacketHandler
         self.packetHandler = PacketHandler(self.PROTOCOL_VERSION)
 
-        # Initialize GroupBulkWrite instance
-        self.groupBulkWrite = GroupBulkWrite(self.portHandler, self.packetHandler)
+        # Initialize WritePlanner instance, sends the goal positions as the smallest Sync/Bulk Write
+        self.writePlanner = WritePlanner(self.portHandler, self.packetHandler)
 
         # Initialize GroupBulkRead instace for Present Position
         self.groupBulkRead = GroupBulkRead(self.portHandler, self.packetHandler)
@@ -96,6 +99,12 @@ class TwoVTwo:
         else:
             print("Failed to change the baudrate")
             quit()
+
+        # Shorten the USB-serial latency timer, status packets wait up to 16 ms in the adapter otherwise
+        if self.portHandler.setLowLatency():
+            print("Succeeded to set low latency (latency timer: %d ms)" % self.portHandler.getLatencyTimer())
+        else:
+            print("Failed to set low latency (latency timer: %d ms)" % self.portHandler.getLatencyTimer())
 	
 
         # Enable Dynamixel#0 Torque
@@ -197,44 +206,41 @@ class TwoVTwo:
         # Sends the goal positions to the Dynamixels
 
         # Allocate goal position value into byte array
-        param_goal_position0 = [DXL_LOBYTE(DXL_LOWORD(self.dxl0_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl0_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl0_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl0_goal_position))]
-        param_goal_position1 = [DXL_LOBYTE(DXL_LOWORD(self.dxl1_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl1_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl1_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl1_goal_position))]
-        param_goal_position2 = [DXL_LOBYTE(DXL_LOWORD(self.dxl2_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl2_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl2_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl2_goal_position))]
-        param_goal_position3 = [DXL_LOBYTE(DXL_LOWORD(self.dxl3_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl3_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl3_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl3_goal_position))]
+        param_goal_position0 = self.control_table.GOAL_POSITION.encode(int(self.dxl0_goal_position))
+        param_goal_position1 = self.control_table.GOAL_POSITION.encode(int(self.dxl1_goal_position))
+        param_goal_position2 = self.control_table.GOAL_POSITION.encode(int(self.dxl2_goal_position))
+        param_goal_position3 = self.control_table.GOAL_POSITION.encode(int(self.dxl3_goal_position))
         
-        # Add Dynamixel#0 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL0_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position0)
+        # Add Dynamixel#0 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL0_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position0)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL0_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL0_ID)
             quit()
         
-        # Add Dynamixel#1 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL1_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position1)
+        # Add Dynamixel#1 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL1_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position1)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL1_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL1_ID)
             quit()
 
-        # Add Dynamixel#2 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL2_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position2)
+        # Add Dynamixel#2 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL2_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position2)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL2_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL2_ID)
             quit()
 
-        # Add Dynamixel#3 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL3_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position3)
+        # Add Dynamixel#3 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL3_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position3)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL3_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL3_ID)
             quit()
 
         
-        # Bulkwrite goal position and LED value
-        dxl_comm_result = self.groupBulkWrite.txPacket()
+        # Write goal positions (one Sync Write, as every servo shares the goal position address)
+        dxl_comm_result = self.writePlanner.txPacket()
         if dxl_comm_result != COMM_SUCCESS:
             print("%s" % self.packetHandler.getTxRxResult(dxl_comm_result))
 
-        # Clear bulkwrite parameter storage
-        self.groupBulkWrite.clearParam()
-
 
 
 
@@ -242,6 +248,11 @@ class TwoVTwo:
     def end_program(self):
         ###### This code runs upon exit ######
 
+        # Bytes on the wire per tick for the goal positions
+        report = self.writePlanner.getReport()
+        print("Goal position writes: %d bytes/tick (%.2f ms), %d bytes/tick saved over Bulk Write" % (
+            report["bytes_per_tick"], report["ms_per_tick"], report["saved_bytes_per_tick"]))
+
         # Clear bulkread parameter storage
         self.groupBulkRead.clearParam()
 
@@ -252,7 +263,7 @@ class TwoVTwo:
         elif dxl_error != 0:
             print("%s" % self.packetHandler.getRxPacketError(dxl_error))
 
-        # Disable Dynamixel#1 Torque        # Add Dynamixel#3 goal position value to the Bulkwrite parameter storage
+        # Disable Dynamixel#1 Torque        # Add Dynamixel#3 goal position value to the write planner
         dxl_comm_result, dxl_error = self.packetHandler.write1ByteTxRx(self.portHandler, self.DXL1_ID, self.ADDR_TORQUE_ENABLE, self.TORQUE_DISABLE)
         if dxl_comm_result != COMM_SUCCESS:
             print("%s" % self.packetHandler.getTxRxResult(dxl_comm_result))
@@ -0,0 +1,6 @@
+# Benchmarks for the Dynamixel SDK hot path and the hand control loops.
+# Run a single benchmark from the src directory, e.g.
+#   python -m benchmarks.bench_crc
+# or the whole suite, saving JSON to compare later runs against:
+#   python -m benchmarks --output baseline.json
+#   python -m benchmarks --compare baseline.json
@@ -0,0 +1,168 @@
+# Runs the benchmark suite, optionally saving the results as JSON and comparing them to an earlier run
+#
+#   python -m benchmarks --output results.json
+#   python -m benchmarks --only crc,stuffing,instructions --compare results.json
+
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import subprocess
+import sys
+
+from .common import report, dumpJSON
+
+# name, module, function returning the rows
+SUITE = (
+    ("crc", "bench_crc", "run"),
+    ("stuffing", "bench_stuffing", "run"),
+    ("packet_build", "bench_packet_build", "run"),
+    ("instructions", "bench_instructions", "run"),
+    ("status_parser", "bench_status_parser", "run"),
+    ("group_write", "bench_group_write", "run"),
+    ("write_planner", "bench_group_write", "runPlanner"),
+    ("group_read", "bench_group_read", "run"),
+    ("group_scaling", "bench_group_scaling", "run"),
+    ("data_array", "bench_data_array", "run"),
+    ("wait_mode", "bench_wait_mode", "run"),
+    ("low_latency", "bench_low_latency", "run"),
+    ("missing_servo", "bench_missing_servo", "run"),
+    ("fast_read", "bench_fast_read", "run"),
+    ("indirect_read", "bench_indirect_read", "run"),
+    ("read_planner", "bench_read_planner", "run"),
+    ("simulator", "bench_simulator", "run"),
+    ("model_q", "bench_model_q", "run"),
+    ("profiler", "bench_profiler", "run"),
+    ("control_loop", "bench_control_loop", "run"),
+    ("threaded_io", "bench_threaded_io", "run"),
+    ("aio", "bench_aio", "run"),
+    ("bus_arbiter", "bench_bus_arbiter", "run"),
+    ("bus_cycle", "bench_bus_cycle", "run"),
+    ("multi_bus", "bench_multi_bus", "run"),
+)
+DEFAULT_THRESHOLD = 0.2
+
+
+def isTiming(key):
+    # lower is better: times per call or tick
+    return key == "us" or key == "ms" or key.endswith("_us") or key.endswith("_ms")
+
+
+def rowLabel(row):
+    # the fields that tell rows of one benchmark apart (not measured values)
+    return "  ".join("%s=%s" % (key, value) for key, value in row.items()
+                     if not isTiming(key) and not isinstance(value, float))
+
+
+def getMetadata():
+    try:
+        revision = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                           stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def runSuite(names):
+    results = {}
+    for name, module_name, function_name in SUITE:
+        if name not in names:
+            continue
+        try:
+            module = importlib.import_module("." + module_name, __package__)
+            rows = getattr(module, function_name)()
+        except Exception as e:
+            rows = [{"exception": "%s: %s" % (type(e).__name__, e)}]
+        report(name, rows)
+        results[name] = rows
+    return results
+
+
+def getErrors(results):
+    # [(benchmark, exception)] of the benchmarks (or rows of one) that raised
+    return [(name, row["exception"]) for name, rows in results.items() for row in rows if "exception" in row]
+
+
+def compare(baseline, results, threshold):
+    # [(benchmark, label, key, old, new, ratio)] of every timing found in both runs, the
+    # regressions among them and [(benchmark, label)] of the baseline rows missing now.
+    # Rows are matched by position and label, the benchmarks produce them in a fixed order.
+    results = json.loads(json.dumps(results))  # tuples as lists, like the baseline read back
+    changes = []
+    missing = []
+    for name, rows in results.items():
+        old_rows = baseline.get(name, [])
+        if not any("exception" in row for row in rows):  # a benchmark that raised counts as an error only
+            missing.extend((name, rowLabel(old_row)) for old_row in old_rows[len(rows):] if "exception" not in old_row)
+        for old_row, new_row in zip(old_rows, rows):
+            if rowLabel(old_row) != rowLabel(new_row):
+                continue
+            for key, new in new_row.items():
+                old = old_row.get(key)
+                if isTiming(key) and isinstance(old, (int, float)) and isinstance(new, (int, float)) and old > 0:
+                    changes.append((name, rowLabel(new_row), key, old, new, new / old))
+    regressions = [change for change in changes if change[5] > 1.0 + threshold]
+    return changes, regressions, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Dynamixel SDK and control loop benchmarks")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--only", default="", help="comma separated benchmarks to run")
+    parser.add_argument("--skip", default="", help="comma separated benchmarks not to run")
+    parser.add_argument("--output", default=None, help="write the results as JSON to this file, '-' for stdout")
+    parser.add_argument("--compare", default=None, help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown ratio above which a timing counts as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    all_names = [name for name, _, _ in SUITE]
+    if args.list:
+        print("\n".join(all_names))
+        return 0
+
+    names = [name for name in args.only.split(",") if name] or all_names
+    skip = [name for name in args.skip.split(",") if name]
+    unknown = [name for name in names + skip if name not in all_names]
+    if unknown:
+        parser.error("unknown benchmark %s, see --list" % ", ".join(unknown))
+    names = [name for name in names if name not in skip]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = runSuite(names)
+
+    if args.output:
+        dumpJSON({"metadata": getMetadata(), "results": results}, None if args.output == "-" else args.output)
+
+    errors = getErrors(results)
+    for name, error in errors:
+        print("! %-14s %s" % (name, error))
+
+    if baseline is None:
+        print("%d benchmarks run, %d errors" % (len(results), len(errors)))
+        return 1 if errors else 0
+
+    changes, regressions, missing = compare(baseline["results"], results, args.threshold)
+    print("compared to %s (%s)" % (args.compare, baseline["metadata"].get("revision")))
+    for name, label, key, old, new, ratio in changes:
+        print("  %s%-14s %-40s %-20s %10.2f -> %10.2f  %+6.1f%%" % (
+            "! " if ratio > 1.0 + args.threshold else "  ", name, label[:40], key, old, new, (ratio - 1.0) * 100))
+    for name, label in missing:
+        print("! %-14s %-40s missing" % (name, label[:40]))
+    print("%d timings compared, %d regressions over %.0f%%, %d errors, %d missing rows" % (
+        len(changes), len(regressions), args.threshold * 100, len(errors), len(missing)))
+    return 1 if regressions or errors or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
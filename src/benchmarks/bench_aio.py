@@ -0,0 +1,91 @@
+# Sync Read ticks on simulated buses: synchronous, one bus after the other, vs AsyncBus, all buses at once
+#
+# Every tick reads the present position of 4 XM430 on each bus. The async ticks
+# gather one AsyncBus.syncRead per bus, so the buses wait for their replies at the same time.
+
+import asyncio
+import time
+
+from dynamixel_sdk import *
+from dynamixel_sdk.bus_capacity import parseServos
+from dynamixel_sdk.simulator import BusSimulator
+
+from .common import report
+
+SERVOS = "1-4:XM430-W350"
+BAUDRATE = 1000000
+BUS_COUNTS = (1, 2, 3)
+TICKS = 100
+TABLE = getControlTable(XM430_W350)
+
+
+def makeGroup(port, ph):
+    group = GroupSyncRead(port, ph, TABLE.PRESENT_POSITION.address, TABLE.PRESENT_POSITION.size)
+    for dxl_id in parseServos(SERVOS):
+        group.addParam(dxl_id)
+    return group
+
+
+def measureSync(ports, ticks):
+    ph = PacketHandler(2.0)
+    groups = [makeGroup(port, ph) for port in ports]
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(0, ticks):
+        for group in groups:
+            if group.txRxPacket() != COMM_SUCCESS:
+                failures += 1
+    return time.perf_counter() - start, failures
+
+
+async def measureAsync(ports, ticks):
+    buses = [AsyncBus(port, PacketHandler(2.0)) for port in ports]
+    groups = [makeGroup(bus.port, bus.ph) for bus in buses]
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(0, ticks):
+        results = await asyncio.gather(*[bus.syncRead(group) for bus, group in zip(buses, groups)])
+        failures += sum(1 for result in results if result != COMM_SUCCESS)
+    return time.perf_counter() - start, failures
+
+
+def measure(bus_count, ticks):
+    simulators = [BusSimulator(parseServos(SERVOS), baudrate=BAUDRATE).start() for _ in range(0, bus_count)]
+    ports = []
+    try:
+        for simulator in simulators:
+            port = PortHandler(simulator.port_name)
+            port.setBaudRate(BAUDRATE)
+            ports.append(port)
+
+        results = []
+        for mode in ("sync", "aio"):
+            if mode == "sync":
+                elapsed, failures = measureSync(ports, ticks)
+            else:
+                elapsed, failures = asyncio.run(measureAsync(ports, ticks))
+            results.append({
+                "mode": mode,
+                "buses": bus_count,
+                "tick_ms": elapsed / ticks * 1e3,
+                "reads_per_s": ticks * bus_count / elapsed,
+                "failures": failures,
+            })
+        return results
+    finally:
+        for port in ports:
+            port.closePort()
+        for simulator in simulators:
+            simulator.close()
+
+
+def run(ticks=TICKS):
+    return [row for bus_count in BUS_COUNTS for row in measure(bus_count, ticks)]
+
+
+def main():
+    report("Sync Read ticks, synchronous vs AsyncBus (%s at %d bps per bus)" % (SERVOS, BAUDRATE), run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# A goal writer and telemetry pollers sharing one simulated bus, with and without BusArbiter
+#
+# The goal thread writes the goal positions of 4 XM430 at GOAL_RATE, TELEMETRY_THREADS
+# threads poll present position, velocity and current back to back.
+# shared: every thread calls the port directly (is_using decides, COMM_PORT_BUSY fails)
+# fifo: BusArbiter, all at the same priority
+# priority: BusArbiter, goal writes PRIORITY_GOAL, polls PRIORITY_TELEMETRY
+# goal_us is a goal write from submit (or call) to its result.
+
+import threading
+import time
+
+from dynamixel_sdk import *
+from dynamixel_sdk.bus_capacity import parseServos
+from dynamixel_sdk.simulator import BusSimulator
+
+from .common import report
+
+SERVOS = "1-4:XM430-W350"
+BAUDRATE = 1000000
+MODES = ("shared", "fifo", "priority")
+GOAL_RATE = 100  # Hz
+TELEMETRY_THREADS = 2
+DURATION = 1.0  # sec per mode
+TABLE = getControlTable(XM430_W350)
+
+
+def measure(mode):
+    servos = parseServos(SERVOS)
+    simulator = BusSimulator(servos, baudrate=BAUDRATE).start()
+    port = PortHandler(simulator.port_name)
+    port.setBaudRate(BAUDRATE)
+    ph = PacketHandler(2.0)
+
+    arbiter = BusArbiter(port).start() if mode != "shared" else None
+    goal_priority = PRIORITY_GOAL if mode == "priority" else PRIORITY_TELEMETRY
+
+    def transact(function, priority):
+        if arbiter is None:
+            return function()
+        return arbiter.call(function, priority=priority)
+
+    stop = threading.Event()
+    goal_us = []
+    counts = {"goal_failures": 0, "polls": 0, "poll_failures": 0}
+    lock = threading.Lock()
+
+    def goals():
+        planner = WritePlanner(port, ph)
+        tick = 0
+        next_tick = time.perf_counter()
+        while not stop.is_set():
+            for dxl_id in servos:
+                planner.addWrite(dxl_id, TABLE.GOAL_POSITION.address, TABLE.GOAL_POSITION.size,
+                                 TABLE.GOAL_POSITION.encode(tick))
+            start = time.perf_counter()
+            result = transact(planner.txPacket, goal_priority)
+            goal_us.append((time.perf_counter() - start) * 1e6)
+            if result != COMM_SUCCESS:
+                counts["goal_failures"] += 1
+            tick += 1
+            next_tick += 1.0 / GOAL_RATE
+            time.sleep(max(next_tick - time.perf_counter(), 0.0))
+
+    def telemetry():
+        group = GroupSyncRead(port, ph, TABLE.PRESENT_CURRENT.address, 10)  # current, velocity, position
+        for dxl_id in servos:
+            group.addParam(dxl_id)
+        while not stop.is_set():
+            result = transact(group.txRxPacket, PRIORITY_TELEMETRY)
+            with lock:
+                counts["polls"] += 1
+                if result != COMM_SUCCESS:
+                    counts["poll_failures"] += 1
+
+    threads = [threading.Thread(target=goals)] + [threading.Thread(target=telemetry) for _ in range(0, TELEMETRY_THREADS)]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(DURATION)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        if arbiter is not None:
+            arbiter.stop()
+        port.closePort()
+        simulator.close()
+
+    goal_us.sort()
+    result = {
+        "mode": mode,
+        "goal_writes": len(goal_us),
+        "goal_failures": counts["goal_failures"],
+        "goal_p50_us": goal_us[len(goal_us) // 2],
+        "goal_p99_us": goal_us[min(int(len(goal_us) * 0.99), len(goal_us) - 1)],
+        "goal_max_us": goal_us[-1],
+        "polls": counts["polls"],
+        "poll_failures": counts["poll_failures"],
+    }
+    if arbiter is not None:
+        result["max_queue_depth"] = arbiter.getReport()["max_queue_depth"]
+    return result
+
+
+def run(modes=MODES):
+    return [measure(mode) for mode in modes]
+
+
+def main():
+    report("goal writes next to %d telemetry pollers on one bus (%s at %d bps)" % (TELEMETRY_THREADS, SERVOS, BAUDRATE),
+           run())
+
+
+if __name__ == "__main__":
+    main()
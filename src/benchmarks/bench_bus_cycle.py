@@ -0,0 +1,124 @@
+# Goal write + state read ticks on the simulated bus: hand-built groups vs planners vs BusCycle
+#
+# Every tick writes the goal position of 4 XM430 and reads back their present
+# position and goal position.
+# groups: GroupSyncWrite addParam/txPacket/clearParam and one GroupSyncRead per item, as the scripts do
+# planners: WritePlanner.txPacket, then ReadPlanner.txRxPacket
+# cycle: BusCycle.commit, the write and the first read instruction in one port write
+# port_writes counts the writes that reach the port per tick (batched packets count once).
+
+import time
+
+from dynamixel_sdk import *
+from dynamixel_sdk.bus_capacity import parseServos
+from dynamixel_sdk.simulator import BusSimulator
+
+from .common import report
+
+SERVOS = "1-4:XM430-W350"
+BAUDRATE = 1000000
+MODES = ("groups", "planners", "cycle", "cycle fast")
+TICKS = 200
+TABLE = getControlTable(XM430_W350)
+READ_ITEMS = (TABLE.PRESENT_POSITION, TABLE.GOAL_POSITION)
+
+
+def countWrites(port):
+    # counts writePort calls that go to the port, not into a batch
+    counter = [0]
+    write = port.writePort
+
+    def writePort(packet):
+        if not getattr(port, "batching", False):
+            counter[0] += 1
+        return write(packet)
+
+    port.writePort = writePort
+    return counter
+
+
+def makeTick(mode, port, ph, servos):
+    goal = TABLE.GOAL_POSITION
+
+    if mode == "groups":
+        group_write = GroupSyncWrite(port, ph, goal.address, goal.size)
+        group_reads = []
+        for item in READ_ITEMS:
+            group_read = GroupSyncRead(port, ph, item.address, item.size)
+            for dxl_id in servos:
+                group_read.addParam(dxl_id)
+            group_reads.append(group_read)
+
+        def tick(value):
+            for dxl_id in servos:
+                group_write.addParam(dxl_id, goal.encode(value))
+            result = group_write.txPacket()
+            group_write.clearParam()
+            for group_read in group_reads:
+                if group_read.txRxPacket() != COMM_SUCCESS:
+                    result = COMM_RX_FAIL
+            return result
+        return tick
+
+    if mode == "planners":
+        write_planner = WritePlanner(port, ph)
+        read_planner = ReadPlanner(port, ph)
+
+        def tick(value):
+            for dxl_id in servos:
+                write_planner.addWrite(dxl_id, goal.address, goal.size, goal.encode(value))
+                for item in READ_ITEMS:
+                    read_planner.addRead(dxl_id, item.address, item.size)
+            result = write_planner.txPacket()
+            read_result = read_planner.txRxPacket()
+            return read_result if result == COMM_SUCCESS else result
+        return tick
+
+    cycle = BusCycle(port, ph, fast_read=mode == "cycle fast")
+
+    def tick(value):
+        for dxl_id in servos:
+            cycle.writeItem(dxl_id, goal, value)
+            for item in READ_ITEMS:
+                cycle.readItem(dxl_id, item)
+        return cycle.commit().result
+    return tick
+
+
+def measure(mode, ticks):
+    servos = parseServos(SERVOS)
+    simulator = BusSimulator(servos, baudrate=BAUDRATE).start()
+    port = PortHandler(simulator.port_name)
+    port.setBaudRate(BAUDRATE)
+    ph = PacketHandler(2.0)
+    try:
+        tick = makeTick(mode, port, ph, servos)
+        writes = countWrites(port)
+        failures = 0
+        start = time.perf_counter()
+        for value in range(0, ticks):
+            if tick(1000 + value) != COMM_SUCCESS:
+                failures += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        port.closePort()
+        simulator.close()
+
+    return {
+        "mode": mode,
+        "tick_ms": elapsed / ticks * 1e3,
+        "port_writes": writes[0] / float(ticks),
+        "failures": failures,
+    }
+
+
+def run(ticks=TICKS):
+    return [measure(mode, ticks) for mode in MODES]
+
+
+def main():
+    report("goal write + state read ticks (%s at %d bps)" % (SERVOS, BAUDRATE), run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# ControlLoop pacing: wake-up jitter and CPU use by rate and spin time, and overrun handling
+#
+# The work of a tick is a short busy wait; every OVERRUN_EVERY-th tick of the
+# overrun cases takes 1.5 periods, with DEGRADE_POLICY_SKIP_OPTIONAL on.
+
+import time
+
+from control_loop import ControlLoop, DEGRADE_POLICY_SKIP_OPTIONAL
+
+from .common import report
+
+CASES = (
+    # rate Hz, spin sec, overruns
+    (100, 0.0, False),
+    (100, 0.0005, False),
+    (100, 0.002, False),
+    (500, 0.0, False),
+    (500, 0.0005, False),
+    (100, 0.0005, True),
+)
+DURATION = 1.0  # sec per case
+WORK = 0.0002  # sec
+OVERRUN_EVERY = 20
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def measure(rate, spin, overruns):
+    loop = ControlLoop(rate, spin=spin, degrade_policy=DEGRADE_POLICY_SKIP_OPTIONAL)
+    ticks = int(rate * DURATION)
+
+    def tick():
+        if overruns and loop.tick_count % OVERRUN_EVERY == 0:
+            busy(1.5 / rate)
+        else:
+            busy(WORK)
+        loop.runOptional(lambda: None)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    loop.run(tick, ticks)
+    cpu = (time.process_time() - cpu_start) / (time.perf_counter() - start)
+
+    result = {"rate_hz": rate, "spin_us": spin * 1e6, "overruns_injected": overruns}
+    loop_report = loop.getReport()
+    for key in ("achieved_hz", "overruns", "missed_ticks", "skipped_optional", "jitter_p50_us", "jitter_p99_us", "jitter_max_us"):
+        result[key] = loop_report[key]
+    result["cpu"] = cpu
+    return result
+
+
+def run():
+    return [measure(rate, spin, overruns) for rate, spin, overruns in CASES]
+
+
+def main():
+    report("ControlLoop jitter and CPU use (%.1f ms work per tick)" % (WORK * 1e3), run())
+
+
+if __name__ == "__main__":
+    main()
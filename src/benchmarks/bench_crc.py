@@ -0,0 +1,45 @@
+# CRC16 cost per packet: legacy per-call table rebuild vs the shared table in dynamixel_sdk.crc16
+
+from dynamixel_sdk.crc16 import updateCRC, CRC16
+
+from .common import timePerCall, syncWritePacket, report
+from .legacy import LegacyProtocol2
+
+SERVO_COUNTS = (4, 6, 20)
+
+
+def run(servo_counts=SERVO_COUNTS):
+    legacy = LegacyProtocol2()
+    results = []
+
+    for servo_count in servo_counts:
+        packet = syncWritePacket(servo_count)
+        packet_list = list(packet)
+        crc_length = len(packet) - 2
+
+        assert legacy.updateCRC(0, packet_list, crc_length) == updateCRC(0, packet, crc_length)
+
+        def incremental():
+            crc = CRC16()
+            crc.update(packet, 7)
+            crc.update(packet, crc_length - 7, 7)
+            return crc.getCRC()
+
+        results.append({
+            "servos": servo_count,
+            "packet_bytes": len(packet),
+            "legacy_us": timePerCall(lambda: legacy.updateCRC(0, packet_list, crc_length)),
+            "table_list_us": timePerCall(lambda: updateCRC(0, packet_list, crc_length)),
+            "table_buffer_us": timePerCall(lambda: updateCRC(0, packet, crc_length)),
+            "incremental_us": timePerCall(incremental),
+        })
+
+    return results
+
+
+def main():
+    report("crc16 per packet (sync write, 4-byte goal)", run())
+
+
+if __name__ == "__main__":
+    main()
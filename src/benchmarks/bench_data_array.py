@@ -0,0 +1,59 @@
+# Reading present PWM, current, velocity and position of every servo after a
+# GroupSyncRead: one getData call per (ID, register) vs one getDataArray call
+#
+# The replies are replayed from memory once, only the accessors are timed.
+
+from dynamixel_sdk import *
+
+from .common import StreamPort, report, statusPacket, timePerCall
+
+SERVO_COUNTS = (4, 6, 20)
+START_ADDRESS = 124  # Present PWM
+DATA_LENGTH = 16  # up to the end of Present Position
+TABLE = getControlTable(XM430_W350)
+ITEMS = (TABLE.PRESENT_PWM, TABLE.PRESENT_CURRENT, TABLE.PRESENT_VELOCITY, TABLE.PRESENT_POSITION)
+
+
+def measure(servo_count, single_buffer):
+    ph = PacketHandler(2.0)
+    stream = b''.join(statusPacket(dxl_id, bytes(range(dxl_id, dxl_id + DATA_LENGTH)))
+                      for dxl_id in range(0, servo_count))
+    port = StreamPort(stream)
+
+    group = GroupSyncRead(port, ph, START_ADDRESS, DATA_LENGTH, single_buffer=single_buffer)
+    for dxl_id in range(0, servo_count):
+        group.addParam(dxl_id)
+    group.txPacket()
+    if group.rxPacket() != COMM_SUCCESS:
+        raise RuntimeError("group read failed")
+
+    def getData():
+        return [[item.toSigned(group.getData(dxl_id, item.address, item.size)) for item in ITEMS]
+                for dxl_id in range(0, servo_count)]
+
+    def getDataArray():
+        return group.getDataArray(ITEMS)
+
+    if getDataArray().tolist() != getData():
+        raise RuntimeError("getDataArray differs from getData")
+
+    return {
+        "servos": servo_count,
+        "registers": len(ITEMS),
+        "mode": "single buffer" if single_buffer else "list per ID",
+        "getData_us": timePerCall(getData),
+        "getDataArray_us": timePerCall(getDataArray),
+    }
+
+
+def run():
+    return [measure(servo_count, single_buffer)
+            for servo_count in SERVO_COUNTS for single_buffer in (False, True)]
+
+
+def main():
+    report("GroupSyncRead: getData per (ID, register) vs getDataArray", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Sync Read vs Fast Sync Read of the present position of N servos
+#
+# Reports the status bytes on the wire (and their time at the baudrate) and the
+# measured transaction time against a pseudo-terminal responder.
+
+import time
+
+from dynamixel_sdk import *
+
+from .common import PtyResponder, report
+
+SERVO_COUNTS = (4, 6)
+DATA_LENGTH = 2  # XL-320 present position
+TRANSACTIONS = 200
+
+
+def measure(port, ph, servo_count, fast_read, transactions):
+    group = GroupSyncRead(port, ph, 37, DATA_LENGTH, fast_read=fast_read)
+    for dxl_id in range(0, servo_count):
+        group.addParam(dxl_id)
+
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(0, transactions):
+        if group.txRxPacket() != COMM_SUCCESS:
+            failures += 1
+    elapsed = time.perf_counter() - start
+
+    if fast_read:
+        status_bytes = 8 + servo_count * (DATA_LENGTH + 4)
+    else:
+        status_bytes = servo_count * (11 + DATA_LENGTH)
+
+    return {
+        "servos": servo_count,
+        "instruction": "fast sync read" if fast_read else "sync read",
+        "status_bytes": status_bytes,
+        "status_wire_ms": status_bytes * port.tx_time_per_byte,
+        "transaction_us": elapsed / transactions * 1e6,
+        "failures": failures,
+    }
+
+
+def run(baudrate=57600, transactions=TRANSACTIONS):
+    responder = PtyResponder(fast_read=True)
+    port = PortHandler(responder.port_name)
+    ph = PacketHandler(2.0)
+    port.setBaudRate(baudrate)
+
+    try:
+        return [measure(port, ph, servo_count, fast_read, transactions)
+                for servo_count in SERVO_COUNTS for fast_read in (False, True)]
+    finally:
+        port.closePort()
+        responder.close()
+
+
+def main():
+    report("group read of present position (pty responder)", run())
+
+
+if __name__ == "__main__":
+    main()
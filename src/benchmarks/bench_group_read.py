@@ -0,0 +1,50 @@
+# GroupSyncRead reply handling: one readRx per ID vs the single-buffer mode
+#
+# The replies are replayed from memory in chunks of CHUNK bytes, so only the
+# receive and decode work is measured.
+
+from dynamixel_sdk import *
+
+from .common import StreamPort, report, statusPacket, timePerCall
+
+SERVO_COUNTS = (4, 6, 20)
+DATA_LENGTH = 4
+CHUNK = 256
+
+
+def measure(servo_count, single_buffer):
+    ph = PacketHandler(2.0)
+    stream = b''.join(statusPacket(dxl_id, bytes(range(dxl_id, dxl_id + DATA_LENGTH)))
+                      for dxl_id in range(0, servo_count))
+    port = StreamPort(stream, chunk=CHUNK)
+
+    group = GroupSyncRead(port, ph, 132, DATA_LENGTH, single_buffer=single_buffer)
+    for dxl_id in range(0, servo_count):
+        group.addParam(dxl_id)
+    group.txPacket()
+
+    def rx():
+        port.rewind()
+        if group.rxPacket() != COMM_SUCCESS:
+            raise RuntimeError("group read failed")
+
+    rx()
+    return {
+        "servos": servo_count,
+        "mode": "single buffer" if single_buffer else "readRx per ID",
+        "rx_us": timePerCall(rx),
+        "port_reads": port.reads,
+    }
+
+
+def run():
+    return [measure(servo_count, single_buffer)
+            for servo_count in SERVO_COUNTS for single_buffer in (False, True)]
+
+
+def main():
+    report("GroupSyncRead.rxPacket, %d byte chunks" % CHUNK, run())
+
+
+if __name__ == "__main__":
+    main()
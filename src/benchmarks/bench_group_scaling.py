@@ -0,0 +1,88 @@
+# GroupSyncWrite and GroupBulkRead cost per tick as the servo count grows, up to a full bus of 253 IDs
+#
+# sync write: changeParam of every goal position + txPacket on a null port
+# bulk read: txPacket + rxPacket of every present position, the replies replayed from memory
+# A Bulk Read of 253 IDs needs 1275 bytes and does not fit in one packet (TXPACKET_MAX_LEN),
+# the result column shows it.
+
+from dynamixel_sdk import *
+
+from .common import timePerCall, NullPort, StreamPort, statusPacket, report
+
+SERVO_COUNTS = (4, 6, 32, 253)
+ADDR_GOAL_POSITION = 30  # XL-320
+ADDR_PRESENT_POSITION = 37
+DATA_LENGTH = 2
+CHUNK = 256
+
+
+def measureSyncWrite(ph, servo_count):
+    port = NullPort()
+    group = GroupSyncWrite(port, ph, ADDR_GOAL_POSITION, DATA_LENGTH)
+    for dxl_id in range(0, servo_count):
+        group.addParam(dxl_id, [0x00, 0x02])
+
+    def tick():
+        for dxl_id in range(0, servo_count):
+            group.changeParam(dxl_id, [DXL_LOBYTE(512 + dxl_id), DXL_HIBYTE(512 + dxl_id)])
+        return group.txPacket()
+
+    result = tick()
+    port.bytes_written = 0
+    tick()
+    tx_bytes = port.bytes_written
+    us = timePerCall(tick)
+    return {
+        "group": "sync_write",
+        "servos": servo_count,
+        "result": result,
+        "tx_bytes": tx_bytes,
+        "us": us,
+        "us_per_servo": us / servo_count,
+    }
+
+
+def measureBulkRead(ph, servo_count):
+    stream = b''.join(statusPacket(dxl_id, bytes([dxl_id, 0x02])) for dxl_id in range(0, servo_count))
+    port = StreamPort(stream, chunk=CHUNK)
+    group = GroupBulkRead(port, ph, single_buffer=True)
+    for dxl_id in range(0, servo_count):
+        group.addParam(dxl_id, ADDR_PRESENT_POSITION, DATA_LENGTH)
+
+    def tick():
+        port.rewind()
+        result = group.txPacket()
+        if result != COMM_SUCCESS:
+            return result
+        return group.rxPacket()
+
+    result = tick()
+    port.bytes_written = 0
+    tick()
+    tx_bytes = port.bytes_written
+    us = timePerCall(tick)
+    return {
+        "group": "bulk_read",
+        "servos": servo_count,
+        "result": result,
+        "tx_bytes": tx_bytes,
+        "us": us,
+        "us_per_servo": us / servo_count,
+    }
+
+
+def run(servo_counts=SERVO_COUNTS):
+    ph = PacketHandler(2.0)
+    results = []
+    for servo_count in servo_counts:
+        results.append(measureSyncWrite(ph, servo_count))
+        results.append(measureBulkRead(ph, servo_count))
+    return results
+
+
+def main():
+    report("group cost per tick by servo count (XL-320 goal/present position)", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# One Model_Q tick of goal positions through GroupBulkWrite/GroupSyncWrite:
+# addParam + txPacket + clearParam every tick vs addParam once and changeParam per tick,
+# and the bytes on the wire WritePlanner saves over a Bulk Write
+
+from dynamixel_sdk import *
+
+from .common import timePerCall, peakAllocation, NullPort, report
+
+SERVO_COUNTS = (4, 6, 20)
+ADDR_GOAL_POSITION = 30
+LEN_GOAL_POSITION = 2
+
+
+def goal(position):
+    return [DXL_LOBYTE(position), DXL_HIBYTE(position)]
+
+
+def run(servo_counts=SERVO_COUNTS):
+    ph = PacketHandler(2.0)
+    port = NullPort()
+    results = []
+
+    for servo_count in servo_counts:
+        dxl_ids = range(0, servo_count)
+
+        bulk = GroupBulkWrite(port, ph)
+        sync = GroupSyncWrite(port, ph, ADDR_GOAL_POSITION, LEN_GOAL_POSITION)
+        for dxl_id in dxl_ids:
+            bulk.addParam(dxl_id, ADDR_GOAL_POSITION, LEN_GOAL_POSITION, goal(512))
+            sync.addParam(dxl_id, goal(512))
+
+        def bulkRebuild():
+            rebuilt = GroupBulkWrite(port, ph)
+            for dxl_id in dxl_ids:
+                rebuilt.addParam(dxl_id, ADDR_GOAL_POSITION, LEN_GOAL_POSITION, goal(512 + dxl_id))
+            rebuilt.txPacket()
+            rebuilt.clearParam()
+
+        def bulkPatch():
+            for dxl_id in dxl_ids:
+                bulk.changeParam(dxl_id, ADDR_GOAL_POSITION, LEN_GOAL_POSITION, goal(512 + dxl_id))
+            bulk.txPacket()
+
+        def syncRebuild():
+            rebuilt = GroupSyncWrite(port, ph, ADDR_GOAL_POSITION, LEN_GOAL_POSITION)
+            for dxl_id in dxl_ids:
+                rebuilt.addParam(dxl_id, goal(512 + dxl_id))
+            rebuilt.txPacket()
+            rebuilt.clearParam()
+
+        def syncPatch():
+            for dxl_id in dxl_ids:
+                sync.changeParam(dxl_id, goal(512 + dxl_id))
+            sync.txPacket()
+
+        for name, rebuild, patch in (("bulk_write", bulkRebuild, bulkPatch), ("sync_write", syncRebuild, syncPatch)):
+            results.append({
+                "group": name,
+                "servos": servo_count,
+                "rebuild_us": timePerCall(rebuild),
+                "patch_us": timePerCall(patch),
+                "rebuild_alloc_bytes": peakAllocation(rebuild),
+                "patch_alloc_bytes": peakAllocation(patch),
+            })
+
+    return results
+
+
+def runPlanner(servo_counts=SERVO_COUNTS):
+    ph = PacketHandler(2.0)
+    port = NullPort()
+    results = []
+
+    for servo_count in servo_counts:
+        planner = WritePlanner(port, ph)
+
+        def tick():
+            for dxl_id in range(0, servo_count):
+                planner.addWrite(dxl_id, ADDR_GOAL_POSITION, LEN_GOAL_POSITION, 512 + dxl_id)
+            planner.txPacket()
+
+        tick()
+        planner_report = planner.getReport()
+        results.append({
+            "servos": servo_count,
+            "packets": planner_report["packets"],
+            "tick_us": timePerCall(tick),
+            "bytes_per_tick": planner_report["bytes_per_tick"],
+            "bulk_bytes_per_tick": planner_report["bulk_bytes_per_tick"],
+            "ms_per_tick": planner_report["ms_per_tick"],
+            "saved_ms_per_tick": planner_report["saved_ms_per_tick"],
+        })
+
+    return results
+
+
+def main():
+    report("goal position tick (null port)", run())
+    report("WritePlanner goal position tick at %d baud" % NullPort().getBaudRate(), runPlanner())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Present current, position, input voltage and temperature of N X-series servos:
+# one Sync Read per register range, one Sync Read covering all of them, or one
+# Sync Read of the indirect data region (IndirectSyncRead)
+#
+# Reports the bytes on the wire per tick and the measured tick time against a
+# pseudo-terminal responder.
+
+import time
+
+from dynamixel_sdk import *
+
+from .common import PtyResponder, report
+
+SERVO_COUNTS = (4, 6)
+TICKS = 200
+TABLE = getControlTable(XM430_W350)
+ITEMS = (TABLE.PRESENT_CURRENT, TABLE.PRESENT_POSITION, TABLE.PRESENT_INPUT_VOLTAGE, TABLE.PRESENT_TEMPERATURE)
+
+
+def syncReadBytes(servo_count, data_length):
+    # instruction (14 + N) and N status packets (11 + data_length)
+    return 14 + servo_count + servo_count * (11 + data_length)
+
+
+def measure(port, ph, servo_count, mode, ticks):
+    if mode == "sync read per range":
+        ranges = ((126, 2), (132, 4), (144, 3))
+        groups = [GroupSyncRead(port, ph, address, data_length) for address, data_length in ranges]
+    elif mode == "covering sync read":
+        ranges = ((126, 21),)
+        groups = [GroupSyncRead(port, ph, 126, 21)]
+    else:
+        groups = [IndirectSyncRead(port, ph, TABLE, ITEMS, fast_read=False)]
+        ranges = ((groups[0].group.start_address, groups[0].group.data_length),)
+
+    for group in groups:
+        for dxl_id in range(0, servo_count):
+            if not group.addParam(dxl_id):
+                raise RuntimeError("addParam failed")
+
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(0, ticks):
+        for group in groups:
+            if group.txRxPacket() != COMM_SUCCESS:
+                failures += 1
+    elapsed = time.perf_counter() - start
+
+    tick_bytes = sum(syncReadBytes(servo_count, data_length) for _, data_length in ranges)
+    return {
+        "servos": servo_count,
+        "mode": mode,
+        "transactions": len(groups),
+        "bytes_per_tick": tick_bytes,
+        "wire_ms": tick_bytes * port.tx_time_per_byte,
+        "tick_us": elapsed / ticks * 1e6,
+        "failures": failures,
+    }
+
+
+def run(baudrate=57600, ticks=TICKS):
+    responder = PtyResponder()
+    port = PortHandler(responder.port_name)
+    ph = PacketHandler(2.0)
+    port.setBaudRate(baudrate)
+
+    try:
+        return [measure(port, ph, servo_count, mode, ticks) for servo_count in SERVO_COUNTS
+                for mode in ("sync read per range", "covering sync read", "indirect sync read")]
+    finally:
+        port.closePort()
+        responder.close()
+
+
+def main():
+    report("telemetry read per tick (pty responder)", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Build and parse cost per instruction
+#
+# build: the *Tx / *TxOnly call of the packet handler on a null port (packet, stuffing, CRC, write)
+# parse: receiving and decoding the status packet(s) of that instruction, replayed from memory
+
+from dynamixel_sdk import *
+
+from .common import timePerCall, NullPort, StreamPort, statusPacket, fastStatusPacket, report
+
+SERVO_COUNT = 4
+ADDRESS = 132  # X-series present position
+DATA_LENGTH = 4
+CHUNK = 256
+
+
+def buildCases(ph, port):
+    ids = list(range(0, SERVO_COUNT))
+    data = [0x00, 0x02, 0x00, 0x00]
+    sync_write_param = [byte for dxl_id in ids for byte in [dxl_id] + data]
+    bulk_read_param = [byte for dxl_id in ids for byte in (dxl_id, ADDRESS, 0, DATA_LENGTH, 0)]
+    bulk_write_param = [byte for dxl_id in ids for byte in [dxl_id, ADDRESS, 0, DATA_LENGTH, 0] + data]
+
+    return {
+        "ping": lambda: ph.txPacket(port, ph.packet_builder.getPacket(INST_PING, 0, 1)),
+        "read": lambda: ph.readTx(port, 1, ADDRESS, DATA_LENGTH),
+        "write": lambda: ph.txPacket(port, ph.packet_builder.getPacket(INST_WRITE, 2 + DATA_LENGTH, 1)),
+        "sync_read": lambda: ph.syncReadTx(port, ADDRESS, DATA_LENGTH, ids, len(ids)),
+        "fast_sync_read": lambda: ph.fastSyncReadTx(port, ADDRESS, DATA_LENGTH, ids, len(ids)),
+        "sync_write": lambda: ph.syncWriteTxOnly(port, ADDRESS, DATA_LENGTH, sync_write_param, len(sync_write_param)),
+        "bulk_read": lambda: ph.bulkReadTx(port, bulk_read_param, len(bulk_read_param)),
+        "fast_bulk_read": lambda: ph.fastBulkReadTx(port, bulk_read_param, len(bulk_read_param)),
+        "bulk_write": lambda: ph.bulkWriteTxOnly(port, bulk_write_param, len(bulk_write_param)),
+    }
+
+
+def runBuild():
+    ph = PacketHandler(2.0)
+    port = NullPort()
+    results = []
+
+    for name, call in buildCases(ph, port).items():
+        def build():
+            # the read instructions keep the port until their reply, which never comes here
+            port.is_using = False
+            return call()
+
+        result = build()
+        port.bytes_written = 0
+        build()
+        results.append({
+            "instruction": name,
+            "step": "build",
+            "result": result,
+            "packet_bytes": port.bytes_written,
+            "us": timePerCall(build),
+        })
+
+    return results
+
+
+def runParse():
+    ph = PacketHandler(2.0)
+    ids = list(range(0, SERVO_COUNT))
+    data = bytes(range(0, DATA_LENGTH))
+    results = []
+
+    # each maker takes the replay port and returns the receive call, which returns a result code
+    def rxPacket(port):
+        return lambda: ph.rxPacket(port)[1]
+
+    def readRx(port):
+        return lambda: ph.readRx(port, 1, DATA_LENGTH)[1]
+
+    def syncReadRx(port):
+        group = GroupSyncRead(port, ph, ADDRESS, DATA_LENGTH, single_buffer=True)
+        for dxl_id in ids:
+            group.addParam(dxl_id)
+        group.txPacket()
+        return group.rxPacket
+
+    def bulkReadRx(port):
+        group = GroupBulkRead(port, ph, single_buffer=True)
+        for dxl_id in ids:
+            group.addParam(dxl_id, ADDRESS, DATA_LENGTH)
+        group.txPacket()
+        return group.rxPacket
+
+    def fastReadRx(port):
+        def rx():
+            rxpacket, result = ph.fastReadRx(port)
+            if result != COMM_SUCCESS:
+                return result
+            return ph.decodeFastRead(rxpacket, DATA_LENGTH)[1]
+        return rx
+
+    cases = [
+        ("ping", statusPacket(1, b'\x5e\x01\x2a'), rxPacket),
+        ("read", statusPacket(1, data), readRx),
+        ("write", statusPacket(1), rxPacket),
+        ("sync_read", b''.join(statusPacket(dxl_id, data) for dxl_id in ids), syncReadRx),
+        ("fast_sync_read", fastStatusPacket([(dxl_id, data, 0) for dxl_id in ids]), fastReadRx),
+        ("bulk_read", b''.join(statusPacket(dxl_id, data) for dxl_id in ids), bulkReadRx),
+    ]
+    for name, stream, makeRx in cases:
+        port = StreamPort(stream, chunk=CHUNK)
+        receive = makeRx(port)
+
+        def parse():
+            port.rewind()
+            return receive()
+
+        result = parse()
+        results.append({
+            "instruction": name,
+            "step": "parse",
+            "result": result,
+            "packet_bytes": len(stream),
+            "us": timePerCall(parse),
+        })
+
+    return results
+
+
+def run():
+    return runBuild() + runParse()
+
+
+def main():
+    report("instruction build and parse, %d servos for the group instructions" % SERVO_COUNT, run())
+
+
+if __name__ == "__main__":
+    main()
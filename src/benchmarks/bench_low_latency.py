@@ -0,0 +1,68 @@
+# Control loop rate before and after PortHandler.setLowLatency()
+#
+# One loop reads the present position of every ID, one read2ByteTxRx each.
+# Needs a USB-serial adapter to show a difference, e.g.
+# python -m benchmarks.bench_low_latency /dev/ttyUSB0 0 1 2 3
+# Without arguments it runs against a pseudo-terminal responder, where there is
+# no latency timer and setLowLatency() reports failure.
+
+import sys
+import time
+
+from dynamixel_sdk import *
+
+from .common import PtyResponder, report
+
+LOOPS = 200
+
+
+def measure(port, ph, dxl_ids, stage, loops):
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(0, loops):
+        for dxl_id in dxl_ids:
+            _, result, _ = ph.read2ByteTxRx(port, dxl_id, 37)
+            if result != COMM_SUCCESS:
+                failures += 1
+    elapsed = time.perf_counter() - start
+
+    port.setPacketTimeout(13)
+    return {
+        "stage": stage,
+        "latency_timer_ms": port.getLatencyTimer(),
+        "read_timeout_ms": port.packet_timeout,
+        "loop_hz": loops / elapsed,
+        "loop_ms": elapsed / loops * 1e3,
+        "failures": failures,
+    }
+
+
+def run(port_name=None, dxl_ids=(1,), baudrate=57600, loops=LOOPS):
+    responder = None
+    if port_name is None:
+        responder = PtyResponder()
+        port_name = responder.port_name
+
+    port = PortHandler(port_name)
+    ph = PacketHandler(2.0)
+    port.setBaudRate(baudrate)
+
+    try:
+        results = [measure(port, ph, dxl_ids, "before", loops)]
+        low_latency = port.setLowLatency()
+        results.append(measure(port, ph, dxl_ids, "after" if low_latency else "after (setLowLatency failed)", loops))
+        return results
+    finally:
+        port.closePort()
+        if responder is not None:
+            responder.close()
+
+
+def main():
+    port_name = sys.argv[1] if len(sys.argv) > 1 else None
+    dxl_ids = tuple(int(arg) for arg in sys.argv[2:]) or (1,)
+    report("loop rate with %d servo(s) (%s)" % (len(dxl_ids), port_name or "pty responder"), run(port_name, dxl_ids))
+
+
+if __name__ == "__main__":
+    main()
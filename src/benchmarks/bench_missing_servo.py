@@ -0,0 +1,81 @@
+# Cost of reading a servo that does not answer: fixed vs adaptive packet timeout
+#
+# The adaptive policy first learns the latency of the servos that do answer.
+# Runs against a pseudo-terminal responder by default. Pass a real port, a present
+# and an absent ID to measure the hardware bus, e.g.
+# python -m benchmarks.bench_missing_servo /dev/ttyUSB0 1 9
+
+import sys
+import time
+
+from dynamixel_sdk import *
+
+from .common import PtyResponder, report
+
+TRAINING_READS = 100
+MISSING_READS = 20
+
+
+def measure(port, ph, present_id, missing_id, timeout_policy):
+    port.setTimeoutPolicy(timeout_policy)
+    port.clearRoundTripStats()
+
+    for _ in range(0, TRAINING_READS):
+        ph.read2ByteTxRx(port, present_id, 37)
+
+    costs = []
+    failures = 0
+    for _ in range(0, MISSING_READS):
+        start = time.perf_counter()
+        _, result, _ = ph.read2ByteTxRx(port, missing_id, 37)
+        costs.append((time.perf_counter() - start) * 1e3)
+        if result != COMM_RX_TIMEOUT:
+            failures += 1
+
+    # a present servo must still be read reliably with the learned timeout
+    present_failures = 0
+    for _ in range(0, TRAINING_READS):
+        _, result, _ = ph.read2ByteTxRx(port, present_id, 37)
+        if result != COMM_SUCCESS:
+            present_failures += 1
+
+    stats = port.getRoundTripStats(present_id)
+    costs.sort()
+    return {
+        "policy": "adaptive" if timeout_policy == TIMEOUT_POLICY_ADAPTIVE else "fixed",
+        "missing_read_ms": costs[len(costs) // 2],
+        "missing_read_max_ms": costs[-1],
+        "unexpected_results": failures,
+        "present_failures": present_failures,
+        "learned_p99_ms": stats.getP99() if stats is not None else 0.0,
+    }
+
+
+def run(port_name=None, present_id=1, missing_id=9, baudrate=57600):
+    responder = None
+    if port_name is None:
+        responder = PtyResponder(ids=(present_id,))
+        port_name = responder.port_name
+
+    port = PortHandler(port_name)
+    ph = PacketHandler(2.0)
+    port.setBaudRate(baudrate)
+
+    try:
+        return [measure(port, ph, present_id, missing_id, policy)
+                for policy in (TIMEOUT_POLICY_FIXED, TIMEOUT_POLICY_ADAPTIVE)]
+    finally:
+        port.closePort()
+        if responder is not None:
+            responder.close()
+
+
+def main():
+    port_name = sys.argv[1] if len(sys.argv) > 1 else None
+    present_id = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    missing_id = int(sys.argv[3]) if len(sys.argv) > 3 else 9
+    report("missing servo read cost (%s)" % (port_name or "pty responder"), run(port_name, present_id, missing_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Full control loop ticks of the hand scripts against the simulated bus
+#
+# Every tick is one pass of the scripts' main loop: Model_Q._poll() on a replayed
+# nanoKONTROL2 slider sweep, then model_q_run() when a slider moved the goal.
+# The scripts need pygame and keyboard installed; without them the rows say so.
+# The tick times are the host side of the loop, goal writes are broadcast and do not wait for the bus.
+
+import contextlib
+import importlib.util
+import io
+import os
+import time
+
+from dynamixel_sdk.bus_capacity import parseServos
+from dynamixel_sdk.simulator import BusSimulator
+
+from .common import report
+
+# model_w_position.py is left out until it starts: it has no dy_5_limits
+SCRIPTS = (
+    ("2v2.py", "0-3:XL-320"),
+    ("pros_position.py", "1-5:XL-320"),
+    ("nano_kontrol2_dynamixel.py", "0-3:XM430-W350"),
+    ("nano_linear_q.py", "0-3:XM430-W350"),
+)
+TICKS = 100
+SLIDERS = (0, 1, 2, 3, 4, 5)  # nanoKONTROL2 control change numbers, scene 1
+DRAIN_S = 0.1
+
+
+class ReplayMidi(object):
+    # Stands in for pygame.midi.Input: read() returns one slider event per call,
+    # sweeping the sliders up and down in pygame.midi's [[status, data1, data2, data3], timestamp] form.
+    def __init__(self, sliders=SLIDERS):
+        self.sliders = sliders
+        self.count = 0
+
+    def read(self, length):
+        slider = self.sliders[self.count % len(self.sliders)]
+        value = (self.count // len(self.sliders) * 8) % 254
+        if value > 127:
+            value = 254 - value
+        self.count += 1
+        return [[[0xB0, slider, value, 0], self.count]][:length]
+
+    def close(self):
+        pass
+
+
+def scriptPath(script):
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), script)
+
+
+def loadScript(script):
+    # the scripts are not importable by name (2v2.py), load them from their file
+    spec = importlib.util.spec_from_file_location("bench_" + os.path.splitext(script)[0], scriptPath(script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def measure(script, servo_text, ticks):
+    try:
+        module = loadScript(script)
+    except ImportError as e:
+        return {"script": script, "skipped": str(e)}
+
+    simulator = BusSimulator(parseServos(servo_text)).start()
+    previous_device = os.environ.get('DXL_DEVICENAME')
+    os.environ['DXL_DEVICENAME'] = simulator.port_name
+    output = io.StringIO()
+    model_q = None
+    tick_ms = []
+    runs = 0
+    try:
+        with contextlib.redirect_stdout(output):
+            model_q = module.Model_Q(midi_input=ReplayMidi())
+            for _ in range(0, ticks):
+                start = time.perf_counter()
+                model_q._poll()
+                if model_q.move_to == True:
+                    model_q.model_q_run()
+                    model_q.move_to = False
+                    runs += 1
+                tick_ms.append((time.perf_counter() - start) * 1e3)
+
+        # the goal writes are broadcast, let the simulator take in what is still on its way
+        packets = -1
+        while packets != simulator.packets_received:
+            packets = simulator.packets_received
+            time.sleep(DRAIN_S)
+    except Exception as e:
+        return {"script": script, "exception": "%s: %s" % (type(e).__name__, e)}
+    finally:
+        if model_q is not None and hasattr(model_q, "portHandler"):
+            model_q.portHandler.closePort()
+        simulator.close()
+        if previous_device is None:
+            os.environ.pop('DXL_DEVICENAME', None)
+        else:
+            os.environ['DXL_DEVICENAME'] = previous_device
+
+    return {
+        "script": script,
+        "servos": servo_text,
+        "ticks": ticks,
+        "bus_ticks": runs,
+        "mean_ms": sum(tick_ms) / len(tick_ms),
+        "p50_ms": percentile(tick_ms, 0.5),
+        "p99_ms": percentile(tick_ms, 0.99),
+        "max_ms": max(tick_ms),
+        "packets": packets,
+    }
+
+
+def run(ticks=TICKS):
+    return [measure(script, servo_text, ticks) for script, servo_text in SCRIPTS]
+
+
+def main():
+    report("Model_Q._poll + model_q_run ticks on the simulated bus", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Ticks of several simulated buses: one thread committing bus after bus vs MultiBus in parallel
+#
+# Every bus carries 4 XM430; a tick writes their goal positions and reads back the
+# present positions (one BusCycle commit per bus). The simulators run as separate
+# processes, like separate adapters they do not share the GIL with the driver.
+
+import os
+import subprocess
+import sys
+import time
+
+from dynamixel_sdk import *
+
+from .common import report
+
+SERVOS = "1-4:XM430-W350"
+BAUDRATE = 57600
+BUS_COUNTS = (1, 2, 3)
+TICKS = 50
+TABLE = getControlTable(XM430_W350)
+
+
+def startSimulator():
+    # python -m dynamixel_sdk.simulator, returns the process and its port name
+    process = subprocess.Popen([sys.executable, "-m", "dynamixel_sdk.simulator", "--servos", SERVOS,
+                                "--baudrate", str(BAUDRATE)], stdout=subprocess.PIPE, universal_newlines=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return process, process.stdout.readline().split()[0]
+
+
+def measureSequential(ports, ticks):
+    cycles = [BusCycle(port, PacketHandler(2.0)) for port in ports]
+    failures = 0
+    start = time.perf_counter()
+    for value in range(0, ticks):
+        for cycle in cycles:
+            for dxl_id in range(1, 5):
+                cycle.writeItem(dxl_id, TABLE.GOAL_POSITION, 1000 + value)
+                cycle.readItem(dxl_id, TABLE.PRESENT_POSITION)
+            if cycle.commit().result != COMM_SUCCESS:
+                failures += 1
+    return time.perf_counter() - start, failures
+
+
+def measureParallel(ports, ticks):
+    multi_bus = MultiBus(ports).start()
+    failures = 0
+    try:
+        start = time.perf_counter()
+        for value in range(0, ticks):
+            for bus in range(0, len(ports)):
+                for dxl_id in range(1, 5):
+                    multi_bus.writeItem(bus, dxl_id, TABLE.GOAL_POSITION, 1000 + value)
+                    multi_bus.readItem(bus, dxl_id, TABLE.PRESENT_POSITION)
+            for result in multi_bus.commit():
+                if result is None or result.result != COMM_SUCCESS:
+                    failures += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        multi_bus.stop()
+    return elapsed, failures
+
+
+def measure(bus_count, ticks):
+    simulators = [startSimulator() for _ in range(0, bus_count)]
+    ports = []
+    try:
+        for _, port_name in simulators:
+            port = PortHandler(port_name)
+            port.setBaudRate(BAUDRATE)
+            ports.append(port)
+
+        results = []
+        for mode, function in (("sequential", measureSequential), ("multi_bus", measureParallel)):
+            elapsed, failures = function(ports, ticks)
+            results.append({
+                "mode": mode,
+                "buses": bus_count,
+                "tick_ms": elapsed / ticks * 1e3,
+                "bus_ticks_per_s": ticks * bus_count / elapsed,
+                "failures": failures,
+            })
+        return results
+    finally:
+        for port in ports:
+            port.closePort()
+        for process, _ in simulators:
+            process.terminate()
+            process.wait()
+
+
+def run(ticks=TICKS):
+    return [row for bus_count in BUS_COUNTS for row in measure(bus_count, ticks)]
+
+
+def main():
+    report("bus ticks, sequential vs MultiBus (%s at %d bps per bus)" % (SERVOS, BAUDRATE), run())
+
+
+if __name__ == "__main__":
+    main()
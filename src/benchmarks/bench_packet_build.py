@@ -0,0 +1,58 @@
+# Instruction packet build + stuffing + CRC cost: legacy list packets vs PacketBuilder buffers
+
+from dynamixel_sdk.protocol2_packet_handler import Protocol2PacketHandler
+
+from .common import timePerCall, peakAllocation, NullPort, report
+from .legacy import LegacyProtocol2
+
+SERVO_COUNTS = (4, 6, 20)
+GOAL_LENGTH = 4
+
+
+def syncWriteParam(servo_count):
+    param = []
+    for dxl_id in range(0, servo_count):
+        param.extend([dxl_id, 0x00, 0x02, 0x00, 0x00])
+    return param
+
+
+def bulkWriteParam(servo_count):
+    param = []
+    for dxl_id in range(0, servo_count):
+        param.extend([dxl_id, 116, 0, GOAL_LENGTH, 0, 0x00, 0x02, 0x00, 0x00])
+    return param
+
+
+def run(servo_counts=SERVO_COUNTS):
+    legacy = LegacyProtocol2()
+    handler = Protocol2PacketHandler()
+    port = NullPort()
+    results = []
+
+    for servo_count in servo_counts:
+        sync_param = syncWriteParam(servo_count)
+        bulk_param = bulkWriteParam(servo_count)
+
+        cases = {
+            "sync_write": (lambda ph: ph.syncWriteTxOnly(port, 116, GOAL_LENGTH, sync_param, len(sync_param))),
+            "bulk_write": (lambda ph: ph.bulkWriteTxOnly(port, bulk_param, len(bulk_param))),
+        }
+        for name, call in cases.items():
+            results.append({
+                "instruction": name,
+                "servos": servo_count,
+                "legacy_us": timePerCall(lambda: call(legacy)),
+                "builder_us": timePerCall(lambda: call(handler)),
+                "legacy_alloc_bytes": peakAllocation(lambda: call(legacy)),
+                "builder_alloc_bytes": peakAllocation(lambda: call(handler)),
+            })
+
+    return results
+
+
+def main():
+    report("instruction packet build, stuff, CRC and write (null port)", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Cost of the per-stage profiler on a goal position tick (WritePlanner Sync Write on a null port)
+#
+# off: nothing instrumented, the loop's `if profiler is not None` checks only
+# on: packet handler and port instrumented, beginTick/endTick around every tick
+
+from dynamixel_sdk import *
+
+from .common import timePerCall, NullPort, report
+
+SERVO_COUNTS = (4, 6)
+TABLE = getControlTable(XL320)
+
+
+def measure(servo_count, enabled):
+    ph = PacketHandler(2.0)
+    port = NullPort()
+    profiler = None
+    if enabled:
+        profiler = Profiler()
+        profiler.instrument(ph, port)
+
+    planner = WritePlanner(port, ph)
+    item = TABLE.GOAL_POSITION
+
+    def tick():
+        if profiler is not None:
+            profiler.beginTick()
+        for dxl_id in range(0, servo_count):
+            planner.addWrite(dxl_id, item.address, item.size, item.encode(512 + dxl_id))
+        planner.txPacket()
+        if profiler is not None:
+            profiler.endTick()
+
+    return {
+        "servos": servo_count,
+        "profiler": "on" if enabled else "off",
+        "tick_us": timePerCall(tick),
+    }
+
+
+def run(servo_counts=SERVO_COUNTS):
+    results = [measure(servo_count, enabled) for servo_count in servo_counts for enabled in (False, True)]
+
+    histogram = LatencyHistogram()
+    results.append({"profiler": "LatencyHistogram.record", "us": timePerCall(lambda: histogram.record(123456))})
+    return results
+
+
+def main():
+    report("profiler overhead per tick", run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# ReadPlanner vs the requests sent as they are (one Bulk Read per round of
+# distinct IDs) for mixed register sets on 4 X-series servos
+#
+# Reports the planned packets, bytes and bus time per tick, and the measured
+# tick time against a pseudo-terminal responder.
+
+import time
+
+from dynamixel_sdk import *
+
+from .common import PtyResponder, report
+
+TICKS = 100
+TABLE = getControlTable(XM430_W350)
+
+# (dxl_id, item) requests of one control tick
+REQUESTS = [(dxl_id, TABLE.PRESENT_POSITION) for dxl_id in range(0, 4)] + [
+    (0, TABLE.PRESENT_CURRENT), (1, TABLE.PRESENT_CURRENT),
+    (2, TABLE.PRESENT_TEMPERATURE), (3, TABLE.HARDWARE_ERROR_STATUS),
+]
+
+
+def measure(port, ph, planned, fast_read, ticks):
+    if planned:
+        planner = ReadPlanner(port, ph, fast_read=fast_read)
+        for dxl_id, item in REQUESTS:
+            planner.addRead(dxl_id, item.address, item.size)
+        groups = [planner]
+    else:
+        groups = []
+        for dxl_id, item in REQUESTS:
+            for group in groups:
+                if group.addParam(dxl_id, item.address, item.size):
+                    break
+            else:
+                groups.append(GroupBulkRead(port, ph, fast_read=fast_read))
+                groups[-1].addParam(dxl_id, item.address, item.size)
+
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(0, ticks):
+        for group in groups:
+            if group.txRxPacket() != COMM_SUCCESS:
+                failures += 1
+    elapsed = time.perf_counter() - start
+
+    row = {
+        "mode": ("planned" if planned else "bulk read per round") + (", fast read" if fast_read else ""),
+        "transactions": len(groups),
+        "tick_us": elapsed / ticks * 1e6,
+        "failures": failures,
+    }
+    if planned:
+        plan = planner.getReport()
+        row["transactions"] = len(plan["packets"])
+        row["packets"] = plan["packets"]
+        row["bytes_per_tick"] = plan["bytes_per_tick"]
+        row["unplanned_bytes_per_tick"] = plan["unplanned_bytes_per_tick"]
+        row["ms_per_tick"] = plan["ms_per_tick"]
+        row["unplanned_ms_per_tick"] = plan["unplanned_ms_per_tick"]
+    return row
+
+
+def run(baudrate=57600, ticks=TICKS):
+    responder = PtyResponder(fast_read=True)
+    port = PortHandler(responder.port_name)
+    ph = PacketHandler(2.0)
+    port.setBaudRate(baudrate)
+
+    try:
+        return [measure(port, ph, planned, fast_read, ticks)
+                for fast_read in (False, True) for planned in (False, True)]
+    finally:
+        port.closePort()
+        responder.close()
+
+
+def main():
+    report("mixed register reads per tick (pty responder)", run())
+
+
+if __name__ == "__main__":
+    main()
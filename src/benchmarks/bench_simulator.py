@@ -0,0 +1,76 @@
+# bus_capacity predictions vs control ticks measured on the simulated bus
+#
+# One tick writes the goal position of every servo (WritePlanner) and reads
+# back the present position (ReadPlanner). The simulator has no USB latency
+# timer, so the prediction uses none either.
+
+import time
+
+from dynamixel_sdk import *
+from dynamixel_sdk.bus_capacity import predictTick, parseServos
+from dynamixel_sdk.simulator import BusSimulator
+
+from .common import report
+
+CASES = (
+    ("0-3:XL-320", 57600),
+    ("0-4:XL-320", 57600),
+    ("0-5:XL-320", 57600),
+    ("0-3:XL-320", 1000000),
+    ("0-3:XM430-W350", 57600),
+    ("0-3:XM430-W350", 1000000),
+)
+TICKS = 50
+
+
+def measure(servo_text, baudrate, ticks):
+    servos = parseServos(servo_text)
+    simulator = BusSimulator(servos, baudrate=baudrate).start()
+    port = PortHandler(simulator.port_name)
+    ph = PacketHandler(2.0)
+    port.setBaudRate(baudrate)
+
+    fast_read = all(table.fast_read for table in servos.values())
+    write_planner = WritePlanner(port, ph)
+    read_planner = ReadPlanner(port, ph, fast_read=fast_read, transaction_ms=0.0)
+    for dxl_id, table in servos.items():
+        read_planner.addRead(dxl_id, table.PRESENT_POSITION.address, table.PRESENT_POSITION.size)
+
+    failures = 0
+    try:
+        start = time.perf_counter()
+        for tick in range(0, ticks):
+            for dxl_id, table in servos.items():
+                write_planner.addWrite(dxl_id, table.GOAL_POSITION.address, table.GOAL_POSITION.size,
+                                       table.GOAL_POSITION.encode(tick))
+            if write_planner.txPacket() != COMM_SUCCESS or read_planner.txRxPacket() != COMM_SUCCESS:
+                failures += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        port.closePort()
+        simulator.close()
+
+    prediction = predictTick(baudrate, servos, [(dxl_id, "GOAL_POSITION") for dxl_id in servos],
+                             [(dxl_id, "PRESENT_POSITION") for dxl_id in servos], latency_timer=0.0)
+    measured_ms = elapsed / ticks * 1e3
+    return {
+        "servos": servo_text,
+        "baudrate": baudrate,
+        "predicted_ms": prediction["tick_ms"],
+        "measured_ms": measured_ms,
+        "prediction_error": (measured_ms - prediction["tick_ms"]) / prediction["tick_ms"],
+        "predicted_hz": prediction["max_rate_hz"],
+        "failures": failures,
+    }
+
+
+def run(ticks=TICKS):
+    return [measure(servo_text, baudrate, ticks) for servo_text, baudrate in CASES]
+
+
+def main():
+    report("predicted vs simulated control tick", run())
+
+
+if __name__ == "__main__":
+    main()
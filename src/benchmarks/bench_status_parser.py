@@ -0,0 +1,80 @@
+# Status packet receive cost on clean and corrupted streams:
+# legacy list-based rxPacket vs the StatusPacketParser ring buffer
+
+import random
+import time
+
+from dynamixel_sdk.robotis_def import COMM_SUCCESS, COMM_RX_TIMEOUT
+from dynamixel_sdk.protocol2_packet_handler import Protocol2PacketHandler
+
+from .common import statusPacket, StreamPort, report
+from .legacy import LegacyProtocol2
+
+PACKET_COUNT = 200
+NOISE_LEVELS = (0.0, 0.1, 0.5, 2.0, 20.0)  # garbage bytes per packet byte, on average
+CHUNK_SIZES = (8, 64)
+
+
+def noiseBytes(rng, length):
+    # biased towards header bytes so the resync path is exercised, not just the header search
+    return bytes(rng.choice((0xFF, 0xFF, 0xFD, 0x00, 0x55, rng.randrange(256))) for _ in range(length))
+
+
+def makeStream(rng, packet_count, noise, corrupt_ratio=0.05):
+    packets = []
+    stream = bytearray()
+    for i in range(0, packet_count):
+        packet = bytearray(statusPacket(i % 250, bytes(rng.randrange(256) for _ in range(4))))
+        if noise:
+            stream += noiseBytes(rng, int(rng.expovariate(1.0 / (noise * len(packet)))))
+        if noise and rng.random() < corrupt_ratio:
+            packet[rng.randrange(8, len(packet))] ^= 0x5A  # bad CRC
+        else:
+            packets.append(bytes(packet))
+        stream += packet
+    return bytes(stream), packets
+
+
+def drain(ph, port):
+    received = []
+    port.rewind()
+    start = time.perf_counter()
+    while True:
+        rxpacket, result = ph.rxPacket(port)
+        if result == COMM_SUCCESS:
+            received.append(bytes(rxpacket))
+        elif result == COMM_RX_TIMEOUT or port.isPacketTimeout():
+            break
+    return time.perf_counter() - start, received
+
+
+def run(packet_count=PACKET_COUNT, noise_levels=NOISE_LEVELS, chunk_sizes=CHUNK_SIZES, seed=2022):
+    rng = random.Random(seed)
+    results = []
+
+    for noise in noise_levels:
+        stream, packets = makeStream(rng, packet_count, noise)
+        for chunk in chunk_sizes:
+            port = StreamPort(stream, chunk)
+            legacy_time, legacy_received = drain(LegacyProtocol2(), port)
+            parser_time, parser_received = drain(Protocol2PacketHandler(), port)
+            results.append({
+                "noise": noise,
+                "chunk": chunk,
+                "stream_bytes": len(stream),
+                "valid_packets": len(packets),
+                "legacy_found": len(legacy_received),
+                "parser_found": len(parser_received),
+                "legacy_us_per_packet": legacy_time / len(packets) * 1e6,
+                "parser_us_per_packet": parser_time / len(packets) * 1e6,
+            })
+
+    return results
+
+
+def main():
+    report("status packet resync (%d packets per stream)" % PACKET_COUNT, run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# CRC16 and byte stuffing throughput on large packets, with and without FF FF FD in the parameters
+
+from dynamixel_sdk.crc16 import updateCRC
+from dynamixel_sdk.protocol2_packet_handler import Protocol2PacketHandler
+
+from .common import timePerCall, syncWritePacket, report
+
+SERVO_COUNT = 200  # 4-byte goals, about 1 KB: the largest sync write a packet can hold
+
+
+def patternPacket(servo_count, data_length=4):
+    # every goal is FF FF FD 00, so each one needs a stuffing byte
+    packet = syncWritePacket(servo_count, data_length)
+    for i in range(0, servo_count):
+        index = 12 + i * (1 + data_length)
+        packet[index + 1: index + 4] = b'\xff\xff\xfd'
+    return packet
+
+
+def throughput(length, us):
+    # MB/s from bytes per call and microseconds per call
+    return length / us
+
+
+def measure(name, packet):
+    handler = Protocol2PacketHandler()
+    stuffed = handler.addStuffing(bytearray(packet))
+    stuffed_length = len(stuffed)
+
+    crc_us = timePerCall(lambda: updateCRC(0, packet, len(packet) - 2))
+    add_us = timePerCall(lambda: handler.addStuffing(packet))
+    copy_us = timePerCall(lambda: bytearray(stuffed))
+    # removeStuffing works in place, every call gets a fresh copy whose cost is taken off
+    remove_us = max(timePerCall(lambda: handler.removeStuffing(bytearray(stuffed))) - copy_us, 1e-3)
+
+    return {
+        "packet": name,
+        "packet_bytes": len(packet),
+        "stuffed_bytes": stuffed_length,
+        "crc_us": crc_us,
+        "crc_mb_s": throughput(len(packet), crc_us),
+        "add_stuffing_us": add_us,
+        "add_stuffing_mb_s": throughput(len(packet), add_us),
+        "remove_stuffing_us": remove_us,
+        "remove_stuffing_mb_s": throughput(stuffed_length, remove_us),
+    }
+
+
+def run(servo_count=SERVO_COUNT):
+    return [
+        measure("clean", syncWritePacket(servo_count)),
+        measure("ff_ff_fd", patternPacket(servo_count)),
+    ]
+
+
+def main():
+    report("crc16 and byte stuffing throughput (%d-servo sync write)" % SERVO_COUNT, run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# Fader-to-packet latency of nano_linear_q.py on the simulated bus, single-threaded vs DXL_THREADED
+#
+# A fader sends control changes at event_hz into a PortMidi-like buffer. single: the
+# loop reads up to 5 of them per tick itself; threaded: a MidiReader drains them
+# into a MidiMailbox and the loop reads the newest value. The latency of a goal write
+# is the time from the newest fader event it carries becoming readable until the
+# write is on the port; the loop runs at LOOP_RATE.
+
+import contextlib
+import io
+import os
+import time
+
+from control_loop import ControlLoop
+from dynamixel_sdk.bus_capacity import parseServos
+from dynamixel_sdk.simulator import BusSimulator
+from threaded_io import MidiReader
+
+from .bench_model_q import loadScript, percentile
+from .common import report
+
+SCRIPT = ("nano_linear_q.py", "0-3:XM430-W350")
+FADER = 4  # control change of the left fader
+CASES = (
+    # threaded, fader events per sec
+    (False, 100),
+    (True, 100),
+    (False, 1000),
+    (True, 1000),
+)
+LOOP_RATE = 100  # Hz
+DURATION = 1.0  # sec per case
+
+
+class TimedFader(object):
+    # Stands in for pygame.midi.Input: a fader sweep of event_hz events per second,
+    # read() returns the events that are due, oldest first, like the PortMidi buffer.
+    def __init__(self, event_hz, control=FADER):
+        self.event_hz = event_hz
+        self.control = control
+        self.start = time.perf_counter()
+        self.count = 0
+        self.due = {}  # id of an event -> perf_counter time it became readable
+        self.events = []  # keeps the events, and so their ids, alive
+
+    def read(self, length):
+        now = time.perf_counter()
+        events = []
+        while len(events) < length and self.start + self.count / float(self.event_hz) <= now:
+            due = self.start + self.count / float(self.event_hz)
+            value = self.count % 254
+            if value > 127:
+                value = 254 - value
+            event = [[0xB0, self.control, value, 0], int(due * 1000)]
+            self.due[id(event)] = due
+            self.events.append(event)
+            events.append(event)
+            self.count += 1
+        return events
+
+    def close(self):
+        pass
+
+
+class NewestRead(object):
+    # Wraps the MIDI input the loop reads and keeps the due time of the newest event read.
+    def __init__(self, source, due):
+        self.source = source
+        self.due = due
+        self.newest = None
+
+    def read(self, length):
+        events = self.source.read(length)
+        for event in events:
+            due = self.due[id(event)]
+            if self.newest is None or due > self.newest:
+                self.newest = due
+        return events
+
+    def close(self):
+        self.source.close()
+
+
+def measure(module, threaded, event_hz):
+    fader = TimedFader(event_hz)
+    model_q = module.Model_Q(midi_input=fader)
+    fader.start = time.perf_counter() + 0.5 / LOOP_RATE  # no backlog from connecting the servos, events between ticks
+    midi_reader = None
+    if threaded:
+        midi_reader = MidiReader(fader).start()
+        model_q.controller = midi_reader.mailbox
+    tracker = model_q.controller = NewestRead(model_q.controller, fader.due)
+
+    latency_ms = []
+    written = None
+    writes = 0
+    loop = ControlLoop(LOOP_RATE)
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < DURATION:
+            loop.waitNextTick()
+            model_q._poll()
+            if model_q.move_to == True:
+                model_q.model_q_run()
+                model_q.move_to = False
+                writes += 1
+                if tracker.newest is not None and tracker.newest != written:
+                    written = tracker.newest
+                    latency_ms.append((time.perf_counter() - written) * 1e3)
+    finally:
+        if midi_reader is not None:
+            midi_reader.stop()
+        model_q.portHandler.closePort()
+
+    return {
+        "mode": "threaded" if threaded else "single",
+        "event_hz": event_hz,
+        "loop_hz": LOOP_RATE,
+        "writes": writes,
+        "events_sent": fader.count,
+        "p50_ms": percentile(latency_ms, 0.5),
+        "p99_ms": percentile(latency_ms, 0.99),
+        "max_ms": max(latency_ms),
+    }
+
+
+def run(cases=CASES):
+    script, servo_text = SCRIPT
+    try:
+        module = loadScript(script)
+    except ImportError as e:
+        return [{"script": script, "skipped": str(e)}]
+
+    simulator = BusSimulator(parseServos(servo_text)).start()
+    previous_device = os.environ.get('DXL_DEVICENAME')
+    os.environ['DXL_DEVICENAME'] = simulator.port_name
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [measure(module, threaded, event_hz) for threaded, event_hz in cases]
+    finally:
+        simulator.close()
+        if previous_device is None:
+            os.environ.pop('DXL_DEVICENAME', None)
+        else:
+            os.environ['DXL_DEVICENAME'] = previous_device
+
+
+def main():
+    report("fader-to-packet latency, %s at %d Hz" % (SCRIPT[0], LOOP_RATE), run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# CPU time and round-trip latency per transaction: spinning vs blocking status packet waits
+#
+# Runs against a pseudo-terminal responder by default. Pass a real port to measure
+# the hardware bus, e.g. python -m benchmarks.bench_wait_mode /dev/ttyUSB0 1
+
+import sys
+import time
+
+from dynamixel_sdk import *
+
+from .common import PtyResponder, report
+
+TRANSACTIONS = 500
+
+
+def measure(port, ph, dxl_id, wait_mode, transactions):
+    port.setWaitMode(wait_mode)
+    round_trips = []
+    failures = 0
+
+    cpu_start = time.thread_time()
+    for _ in range(0, transactions):
+        start = time.perf_counter()
+        _, result, _ = ph.read2ByteTxRx(port, dxl_id, 37)
+        round_trips.append((time.perf_counter() - start) * 1e3)
+        if result != COMM_SUCCESS:
+            failures += 1
+    cpu_time = time.thread_time() - cpu_start
+
+    round_trips.sort()
+    return {
+        "mode": "block" if wait_mode == PORT_WAIT_BLOCK else "spin",
+        "transactions": transactions,
+        "failures": failures,
+        "cpu_us_per_transaction": cpu_time / transactions * 1e6,
+        "rtt_median_ms": round_trips[len(round_trips) // 2],
+        "rtt_p99_ms": round_trips[int(len(round_trips) * 0.99)],
+        "cpu_share": cpu_time / (sum(round_trips) / 1e3),
+    }
+
+
+def run(port_name=None, dxl_id=1, baudrate=57600, transactions=TRANSACTIONS):
+    responder = None
+    if port_name is None:
+        responder = PtyResponder()
+        port_name = responder.port_name
+
+    port = PortHandler(port_name)
+    ph = PacketHandler(2.0)
+    port.setBaudRate(baudrate)
+
+    try:
+        return [measure(port, ph, dxl_id, mode, transactions) for mode in (PORT_WAIT_SPIN, PORT_WAIT_BLOCK)]
+    finally:
+        port.closePort()
+        if responder is not None:
+            responder.close()
+
+
+def main():
+    port_name = sys.argv[1] if len(sys.argv) > 1 else None
+    dxl_id = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    report("read2ByteTxRx wait modes (%s)" % (port_name or "pty responder"), run(port_name, dxl_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# Shared helpers for the benchmarks
+
+import json
+import sys
+import timeit
+
+
+def timePerCall(func, number=None, repeat=5):
+    # best-of-repeat wall time of one call, in microseconds
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / number * 1e6
+
+
+def syncWritePacket(servo_count, data_length=4):
+    # FF FF FD 00 FE LEN_L LEN_H 83 ADDR_L ADDR_H LEN_L LEN_H [ID DATA..] * N CRC_L CRC_H
+    param_length = servo_count * (1 + data_length)
+    packet = bytearray(14 + param_length)
+    packet[0:4] = b'\xff\xff\xfd\x00'
+    packet[4] = 0xFE
+    packet[5] = (param_length + 7) & 0xFF
+    packet[6] = ((param_length + 7) >> 8) & 0xFF
+    packet[7] = 0x83
+    packet[8] = 30
+    packet[10] = data_length
+    for i in range(0, servo_count):
+        index = 12 + i * (1 + data_length)
+        packet[index] = i
+        packet[index + 1: index + 1 + data_length] = bytes([(17 * i + j) & 0x7F for j in range(0, data_length)])
+    return packet
+
+
+def report(name, results):
+    print("%s" % name)
+    for row in results:
+        print("  " + "  ".join("%s=%s" % (key, ("%.2f" % value) if isinstance(value, float) else value)
+                               for key, value in row.items()))
+
+
+def dumpJSON(results, path=None):
+    if path is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+class NullPort(object):
+    # Stands in for PortHandler when only the transmit path is measured.
+    def __init__(self, baudrate=57600):
+        self.is_using = False
+        self.baudrate = baudrate
+        self.tx_time_per_byte = (1000.0 / baudrate) * 10.0
+        self.bytes_written = 0
+
+    def clearPort(self):
+        pass
+
+    def writePort(self, packet):
+        self.bytes_written += len(packet)
+        return len(packet)
+
+    def readPort(self, length):
+        return b''
+
+    def getBaudRate(self):
+        return self.baudrate
+
+    def setPacketTimeout(self, packet_length, dxl_id=None):
+        pass
+
+    def recordRoundTrip(self):
+        pass
+
+    def setPacketTimeoutMillis(self, msec):
+        pass
+
+    def isPacketTimeout(self):
+        return True
+
+
+def peakAllocation(func, warmup=3):
+    # bytes of transient Python allocations made by one call
+    import tracemalloc
+
+    for _ in range(0, warmup):
+        func()
+    tracemalloc.start()
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - current
+
+
+def statusPacket(dxl_id, params=b'', error=0):
+    # Protocol 2.0 status packet (no byte stuffing)
+    from dynamixel_sdk.crc16 import updateCRC
+
+    length = len(params) + 4  # INST ERROR CRC16_L CRC16_H
+    packet = bytearray(b'\xff\xff\xfd\x00')
+    packet += bytes([dxl_id, length & 0xFF, (length >> 8) & 0xFF, 0x55, error])
+    packet += bytes(params)
+    crc = updateCRC(0, packet, len(packet))
+    packet += bytes([crc & 0xFF, (crc >> 8) & 0xFF])
+    return bytes(packet)
+
+
+def fastStatusPacket(blocks):
+    # combined Fast Sync/Bulk Read status packet for [(dxl_id, data, error), ..]
+    from dynamixel_sdk.crc16 import updateCRC
+
+    length = 1 + sum(len(data) + 4 for _, data, _ in blocks)  # INST + per ID: ERROR ID DATA CRC16_L CRC16_H
+    packet = bytearray(b'\xff\xff\xfd\x00')
+    packet += bytes([0xFE, length & 0xFF, (length >> 8) & 0xFF, 0x55])
+    for dxl_id, data, error in blocks:
+        packet += bytes([error, dxl_id])
+        packet += bytes(data)
+        crc = updateCRC(0, packet, len(packet))
+        packet += bytes([crc & 0xFF, (crc >> 8) & 0xFF])
+    return bytes(packet)
+
+
+class StreamPort(NullPort):
+    # Replays a byte stream in fixed-size chunks; times out once it is drained.
+    def __init__(self, stream, chunk=64, baudrate=57600):
+        NullPort.__init__(self, baudrate)
+        self.stream = stream
+        self.chunk = chunk
+        self.position = 0
+        self.reads = 0
+
+    def rewind(self):
+        self.position = 0
+        self.reads = 0
+        self.is_using = False
+
+    def readPort(self, length):
+        self.reads += 1
+        length = min(length, self.chunk)
+        data = self.stream[self.position: self.position + length]
+        self.position += len(data)
+        return data
+
+    def readPortInto(self, buffer, wait_length=0):
+        data = self.readPort(len(buffer))
+        buffer[0: len(data)] = data
+        return len(data)
+
+    def isPacketTimeout(self):
+        return self.position >= len(self.stream)
+
+
+class PtyResponder(object):
+    # Minimal device on the master side of a pseudo-terminal: answers every
+    # non-broadcast instruction with a status packet after `delay` seconds.
+    # READ gets the requested number of zero bytes, everything else no parameters.
+    # Sync/Bulk Read are answered by each listed ID; Fast Sync/Bulk Read only with
+    # `fast_read`, like a model that lacks them otherwise.
+    # With `ids` only those IDs answer, the others behave like missing servos.
+    def __init__(self, delay=0.0005, ids=None, fast_read=False):
+        import os
+        import threading
+        import tty
+
+        self.delay = delay
+        self.ids = ids
+        self.fast_read = fast_read
+        self.packets_received = 0
+        # the slave stays open: with no slave open, reading the master fails with EIO
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port_name = os.ttyname(self.slave_fd)
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        import os
+        import select
+        import time
+
+        data = bytearray()
+        while self.running:
+            # wake up now and then to notice close(), the fd number may be reused after it
+            if not select.select([self.master_fd], [], [], 0.05)[0]:
+                continue
+            try:
+                data += os.read(self.master_fd, 1024)
+            except OSError:
+                return
+
+            while True:
+                idx = data.find(b'\xff\xff\xfd\x00')
+                if idx < 0 or len(data) - idx < 8:
+                    break
+                del data[:idx]
+                length = (data[5] | (data[6] << 8)) + 7
+                if len(data) < length:
+                    break
+                packet = bytes(data[:length])
+                del data[:length]
+
+                self.packets_received += 1
+                dxl_id = packet[4]
+                if packet[7] in (0x82, 0x8A, 0x92, 0x9A):
+                    self.groupRead(packet)
+                    continue
+                if dxl_id == 0xFE or (self.ids is not None and dxl_id not in self.ids):
+                    continue
+                params = b''
+                if packet[7] == 0x02:  # INST_READ
+                    params = bytes(packet[10] | (packet[11] << 8))
+                elif packet[7] == 0x01:  # INST_PING
+                    params = b'\x5e\x01\x2a'
+                time.sleep(self.delay)
+                os.write(self.master_fd, statusPacket(dxl_id, params))
+
+    def groupRead(self, packet):
+        import os
+        import time
+
+        # (dxl_id, data_length) in reply order
+        params = packet[8: len(packet) - 2]
+        if packet[7] in (0x82, 0x8A):  # (FAST_)SYNC_READ
+            requests = [(dxl_id, params[2] | (params[3] << 8)) for dxl_id in params[4:]]
+        else:  # (FAST_)BULK_READ
+            requests = [(params[i], params[i + 3] | (params[i + 4] << 8)) for i in range(0, len(params) - 4, 5)]
+
+        blocks = []
+        for dxl_id, data_length in requests:
+            if self.ids is not None and dxl_id not in self.ids:
+                break  # a missing servo ends the reply chain
+            blocks.append((dxl_id, bytes(data_length), 0))
+
+        time.sleep(self.delay)
+        if packet[7] in (0x8A, 0x9A):
+            if self.fast_read and len(blocks) == len(requests):
+                os.write(self.master_fd, fastStatusPacket(blocks))
+        else:
+            os.write(self.master_fd, b''.join(statusPacket(dxl_id, data, error) for dxl_id, data, error in blocks))
+
+    def close(self):
+        import os
+
+        self.running = False
+        self.thread.join()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
@@ -0,0 +1,293 @@
+# Reference copies of the original DynamixelSDK hot-path code.
+# The benchmarks compare against these so the speed-up stays measurable
+# after the SDK itself has been changed.
+
+from dynamixel_sdk.robotis_def import *
+from dynamixel_sdk.protocol2_packet_handler import PKT_HEADER0, PKT_HEADER1, PKT_HEADER2, PKT_RESERVED, \
+    PKT_ID, PKT_LENGTH_L, PKT_LENGTH_H, PKT_INSTRUCTION, PKT_ERROR, PKT_PARAMETER0, \
+    TXPACKET_MAX_LEN, RXPACKET_MAX_LEN
+
+
+class LegacyProtocol2(object):
+    def updateCRC(self, crc_accum, data_blk_ptr, data_blk_size):
+        crc_table = [0x0000,
+                     0x8005, 0x800F, 0x000A, 0x801B, 0x001E, 0x0014, 0x8011,
+                     0x8033, 0x0036, 0x003C, 0x8039, 0x0028, 0x802D, 0x8027,
+                     0x0022, 0x8063, 0x0066, 0x006C, 0x8069, 0x0078, 0x807D,
+                     0x8077, 0x0072, 0x0050, 0x8055, 0x805F, 0x005A, 0x804B,
+                     0x004E, 0x0044, 0x8041, 0x80C3, 0x00C6, 0x00CC, 0x80C9,
+                     0x00D8, 0x80DD, 0x80D7, 0x00D2, 0x00F0, 0x80F5, 0x80FF,
+                     0x00FA, 0x80EB, 0x00EE, 0x00E4, 0x80E1, 0x00A0, 0x80A5,
+                     0x80AF, 0x00AA, 0x80BB, 0x00BE, 0x00B4, 0x80B1, 0x8093,
+                     0x0096, 0x009C, 0x8099, 0x0088, 0x808D, 0x8087, 0x0082,
+                     0x8183, 0x0186, 0x018C, 0x8189, 0x0198, 0x819D, 0x8197,
+                     0x0192, 0x01B0, 0x81B5, 0x81BF, 0x01BA, 0x81AB, 0x01AE,
+                     0x01A4, 0x81A1, 0x01E0, 0x81E5, 0x81EF, 0x01EA, 0x81FB,
+                     0x01FE, 0x01F4, 0x81F1, 0x81D3, 0x01D6, 0x01DC, 0x81D9,
+                     0x01C8, 0x81CD, 0x81C7, 0x01C2, 0x0140, 0x8145, 0x814F,
+                     0x014A, 0x815B, 0x015E, 0x0154, 0x8151, 0x8173, 0x0176,
+                     0x017C, 0x8179, 0x0168, 0x816D, 0x8167, 0x0162, 0x8123,
+                     0x0126, 0x012C, 0x8129, 0x0138, 0x813D, 0x8137, 0x0132,
+                     0x0110, 0x8115, 0x811F, 0x011A, 0x810B, 0x010E, 0x0104,
+                     0x8101, 0x8303, 0x0306, 0x030C, 0x8309, 0x0318, 0x831D,
+                     0x8317, 0x0312, 0x0330, 0x8335, 0x833F, 0x033A, 0x832B,
+                     0x032E, 0x0324, 0x8321, 0x0360, 0x8365, 0x836F, 0x036A,
+                     0x837B, 0x037E, 0x0374, 0x8371, 0x8353, 0x0356, 0x035C,
+                     0x8359, 0x0348, 0x834D, 0x8347, 0x0342, 0x03C0, 0x83C5,
+                     0x83CF, 0x03CA, 0x83DB, 0x03DE, 0x03D4, 0x83D1, 0x83F3,
+                     0x03F6, 0x03FC, 0x83F9, 0x03E8, 0x83ED, 0x83E7, 0x03E2,
+                     0x83A3, 0x03A6, 0x03AC, 0x83A9, 0x03B8, 0x83BD, 0x83B7,
+                     0x03B2, 0x0390, 0x8395, 0x839F, 0x039A, 0x838B, 0x038E,
+                     0x0384, 0x8381, 0x0280, 0x8285, 0x828F, 0x028A, 0x829B,
+                     0x029E, 0x0294, 0x8291, 0x82B3, 0x02B6, 0x02BC, 0x82B9,
+                     0x02A8, 0x82AD, 0x82A7, 0x02A2, 0x82E3, 0x02E6, 0x02EC,
+                     0x82E9, 0x02F8, 0x82FD, 0x82F7, 0x02F2, 0x02D0, 0x82D5,
+                     0x82DF, 0x02DA, 0x82CB, 0x02CE, 0x02C4, 0x82C1, 0x8243,
+                     0x0246, 0x024C, 0x8249, 0x0258, 0x825D, 0x8257, 0x0252,
+                     0x0270, 0x8275, 0x827F, 0x027A, 0x826B, 0x026E, 0x0264,
+                     0x8261, 0x0220, 0x8225, 0x822F, 0x022A, 0x823B, 0x023E,
+                     0x0234, 0x8231, 0x8213, 0x0216, 0x021C, 0x8219, 0x0208,
+                     0x820D, 0x8207, 0x0202]
+
+        for j in range(0, data_blk_size):
+            i = ((crc_accum >> 8) ^ data_blk_ptr[j]) & 0xFF
+            crc_accum = ((crc_accum << 8) ^ crc_table[i]) & 0xFFFF
+
+        return crc_accum
+
+    def addStuffing(self, packet):
+        packet_length_in = DXL_MAKEWORD(packet[PKT_LENGTH_L], packet[PKT_LENGTH_H])
+        packet_length_out = packet_length_in
+
+        temp = [0] * TXPACKET_MAX_LEN
+
+        # FF FF FD XX ID LEN_L LEN_H
+        temp[PKT_HEADER0: PKT_HEADER0 + PKT_LENGTH_H + 1] = packet[PKT_HEADER0: PKT_HEADER0 + PKT_LENGTH_H + 1]
+
+        index = PKT_INSTRUCTION
+
+        for i in range(0, packet_length_in - 2):  # except CRC
+            temp[index] = packet[i + PKT_INSTRUCTION]
+            index = index + 1
+            if packet[i + PKT_INSTRUCTION] == 0xFD \
+                    and packet[i + PKT_INSTRUCTION - 1] == 0xFF \
+                    and packet[i + PKT_INSTRUCTION - 2] == 0xFF:
+                # FF FF FD
+                temp[index] = 0xFD
+                index = index + 1
+                packet_length_out = packet_length_out + 1
+
+        temp[index] = packet[PKT_INSTRUCTION + packet_length_in - 2]
+        temp[index + 1] = packet[PKT_INSTRUCTION + packet_length_in - 1]
+        index = index + 2
+
+        if packet_length_in != packet_length_out:
+            packet = [0] * index
+
+        packet[0: index] = temp[0: index]
+
+        packet[PKT_LENGTH_L] = DXL_LOBYTE(packet_length_out)
+        packet[PKT_LENGTH_H] = DXL_HIBYTE(packet_length_out)
+
+        return packet
+
+    def removeStuffing(self, packet):
+        packet_length_in = DXL_MAKEWORD(packet[PKT_LENGTH_L], packet[PKT_LENGTH_H])
+        packet_length_out = packet_length_in
+
+        index = PKT_INSTRUCTION
+        for i in range(0, (packet_length_in - 2)):  # except CRC
+            if (packet[i + PKT_INSTRUCTION] == 0xFD) and (packet[i + PKT_INSTRUCTION + 1] == 0xFD) and (
+                    packet[i + PKT_INSTRUCTION - 1] == 0xFF) and (packet[i + PKT_INSTRUCTION - 2] == 0xFF):
+                # FF FF FD FD
+                packet_length_out = packet_length_out - 1
+            else:
+                packet[index] = packet[i + PKT_INSTRUCTION]
+                index += 1
+
+        packet[index] = packet[PKT_INSTRUCTION + packet_length_in - 2]
+        packet[index + 1] = packet[PKT_INSTRUCTION + packet_length_in - 1]
+
+        packet[PKT_LENGTH_L] = DXL_LOBYTE(packet_length_out)
+        packet[PKT_LENGTH_H] = DXL_HIBYTE(packet_length_out)
+
+        return packet
+
+    def txPacket(self, port, txpacket):
+        if port.is_using:
+            return COMM_PORT_BUSY
+        port.is_using = True
+
+        # byte stuffing for header
+        self.addStuffing(txpacket)
+
+        # check max packet length
+        total_packet_length = DXL_MAKEWORD(txpacket[PKT_LENGTH_L], txpacket[PKT_LENGTH_H]) + 7
+        # 7: HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H
+
+        if total_packet_length > TXPACKET_MAX_LEN:
+            port.is_using = False
+            return COMM_TX_ERROR
+
+        # make packet header
+        txpacket[PKT_HEADER0] = 0xFF
+        txpacket[PKT_HEADER1] = 0xFF
+        txpacket[PKT_HEADER2] = 0xFD
+        txpacket[PKT_RESERVED] = 0x00
+
+        # add CRC16
+        crc = self.updateCRC(0, txpacket, total_packet_length - 2)  # 2: CRC16
+
+        txpacket[total_packet_length - 2] = DXL_LOBYTE(crc)
+        txpacket[total_packet_length - 1] = DXL_HIBYTE(crc)
+
+        # tx packet
+        port.clearPort()
+        written_packet_length = port.writePort(txpacket)
+        if total_packet_length != written_packet_length:
+            port.is_using = False
+            return COMM_TX_FAIL
+
+        return COMM_SUCCESS
+
+    def rxPacket(self, port):
+        rxpacket = []
+
+        result = COMM_TX_FAIL
+        rx_length = 0
+        wait_length = 11  # minimum length (HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H INST ERROR CRC16_L CRC16_H)
+
+        while True:
+            rxpacket.extend(port.readPort(wait_length - rx_length))
+            rx_length = len(rxpacket)
+            if rx_length >= wait_length:
+                # find packet header
+                for idx in range(0, (rx_length - 3)):
+                    if (rxpacket[idx] == 0xFF) and (rxpacket[idx + 1] == 0xFF) and (rxpacket[idx + 2] == 0xFD) and (
+                            rxpacket[idx + 3] != 0xFD):
+                        break
+
+                if idx == 0:
+                    if (rxpacket[PKT_RESERVED] != 0x00) or (rxpacket[PKT_ID] > 0xFC) or (
+                            DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) > RXPACKET_MAX_LEN) or (
+                            rxpacket[PKT_INSTRUCTION] != 0x55):
+                        # remove the first byte in the packet
+                        del rxpacket[0]
+                        rx_length -= 1
+                        continue
+
+                    if wait_length != (DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) + PKT_LENGTH_H + 1):
+                        wait_length = DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) + PKT_LENGTH_H + 1
+                        continue
+
+                    if rx_length < wait_length:
+                        if port.isPacketTimeout():
+                            if rx_length == 0:
+                                result = COMM_RX_TIMEOUT
+                            else:
+                                result = COMM_RX_CORRUPT
+                            break
+                        else:
+                            continue
+
+                    crc = DXL_MAKEWORD(rxpacket[wait_length - 2], rxpacket[wait_length - 1])
+
+                    if self.updateCRC(0, rxpacket, wait_length - 2) == crc:
+                        result = COMM_SUCCESS
+                    else:
+                        result = COMM_RX_CORRUPT
+                    break
+
+                else:
+                    # remove unnecessary packets
+                    del rxpacket[0: idx]
+                    rx_length -= idx
+
+            else:
+                if port.isPacketTimeout():
+                    if rx_length == 0:
+                        result = COMM_RX_TIMEOUT
+                    else:
+                        result = COMM_RX_CORRUPT
+                    break
+
+        port.is_using = False
+
+        if result == COMM_SUCCESS:
+            rxpacket = self.removeStuffing(rxpacket)
+
+        return rxpacket, result
+
+    # NOT for BulkRead / SyncRead instruction
+    def txRxPacket(self, port, txpacket):
+        rxpacket = None
+        error = 0
+
+        # tx packet
+        result = self.txPacket(port, txpacket)
+        if result != COMM_SUCCESS:
+            return rxpacket, result, error
+
+        # (Instruction == BulkRead or SyncRead) == this function is not available.
+        if txpacket[PKT_INSTRUCTION] == INST_BULK_READ or txpacket[PKT_INSTRUCTION] == INST_SYNC_READ:
+            result = COMM_NOT_AVAILABLE
+
+        # (ID == Broadcast ID) == no need to wait for status packet or not available.
+        # (Instruction == action) == no need to wait for status packet
+        if txpacket[PKT_ID] == BROADCAST_ID or txpacket[PKT_INSTRUCTION] == INST_ACTION:
+            port.is_using = False
+            return rxpacket, result, error
+
+        # set packet timeout
+        if txpacket[PKT_INSTRUCTION] == INST_READ:
+            port.setPacketTimeout(DXL_MAKEWORD(txpacket[PKT_PARAMETER0 + 2], txpacket[PKT_PARAMETER0 + 3]) + 11)
+        else:
+            port.setPacketTimeout(11)
+            # HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H INST ERROR CRC16_L CRC16_H
+
+        # rx packet
+        while True:
+            rxpacket, result = self.rxPacket(port)
+            if result != COMM_SUCCESS or txpacket[PKT_ID] == rxpacket[PKT_ID]:
+                break
+
+        if result == COMM_SUCCESS and txpacket[PKT_ID] == rxpacket[PKT_ID]:
+            error = rxpacket[PKT_ERROR]
+
+        return rxpacket, result, error
+
+    def syncWriteTxOnly(self, port, start_address, data_length, param, param_length):
+        txpacket = [0] * (param_length + 14)
+        # 14: HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
+
+        txpacket[PKT_ID] = BROADCAST_ID
+        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(
+            param_length + 7)  # 7: INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
+        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(
+            param_length + 7)  # 7: INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
+        txpacket[PKT_INSTRUCTION] = INST_SYNC_WRITE
+        txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(start_address)
+        txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(start_address)
+        txpacket[PKT_PARAMETER0 + 2] = DXL_LOBYTE(data_length)
+        txpacket[PKT_PARAMETER0 + 3] = DXL_HIBYTE(data_length)
+
+        txpacket[PKT_PARAMETER0 + 4: PKT_PARAMETER0 + 4 + param_length] = param[0: param_length]
+
+        _, result, _ = self.txRxPacket(port, txpacket)
+
+        return result
+
+    def bulkWriteTxOnly(self, port, param, param_length):
+        txpacket = [0] * (param_length + 10)
+        # 10: HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST CRC16_L CRC16_H
+
+        txpacket[PKT_ID] = BROADCAST_ID
+        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(param_length + 3)  # 3: INST CRC16_L CRC16_H
+        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(param_length + 3)  # 3: INST CRC16_L CRC16_H
+        txpacket[PKT_INSTRUCTION] = INST_BULK_WRITE
+
+        txpacket[PKT_PARAMETER0: PKT_PARAMETER0 + param_length] = param[0: param_length]
+
+        _, result, _ = self.txRxPacket(port, txpacket)
+
+        return result
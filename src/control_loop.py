@@ -0,0 +1,135 @@
+# Fixed-rate scheduling for the hand control loops
+#
+#   loop = ControlLoop(100)                # Hz
+#   while True:
+#       loop.waitNextTick()
+#       obj_model_q._poll()
+#       ...
+#       loop.runOptional(read_telemetry)   # skipped for a few ticks after an overrun
+
+import time
+
+from dynamixel_sdk.profiler import LatencyHistogram
+
+DEFAULT_LOOP_RATE = 100  # Hz, DXL_LOOP_RATE in the scripts
+DEFAULT_SPIN = 0.0005  # sec before a deadline spent spinning instead of sleeping
+DEFAULT_RECOVER_TICKS = 10  # ticks optional work stays skipped after an overrun
+
+DEGRADE_POLICY_NONE = 0  # always run optional work
+DEGRADE_POLICY_SKIP_OPTIONAL = 1  # skip optional work (telemetry reads) after a tick over budget
+
+
+class ControlLoop(object):
+    # Runs a loop at `rate` ticks per second on absolute deadlines, so the rate does
+    # not drift with the time the work takes. waitNextTick() sleeps until `spin` sec
+    # before the deadline (time.sleep wakes up late by up to a few 100 us) and spins
+    # for the rest. When the loop falls a whole period or more behind, the missed
+    # ticks are dropped instead of run back to back.
+    #
+    # The lateness of each wake-up (jitter) and the work time of each tick go into
+    # histograms; a tick whose work takes longer than `budget` sec (one period by
+    # default) is an overrun. A rate of 0 runs the loop unpaced, as fast as it goes.
+    def __init__(self, rate, spin=DEFAULT_SPIN, budget=None, degrade_policy=DEGRADE_POLICY_NONE,
+                 recover_ticks=DEFAULT_RECOVER_TICKS):
+        self.rate = rate
+        self.period = 1.0 / rate if rate > 0 else 0.0
+        self.spin = spin
+        self.budget = budget if budget is not None else self.period
+        self.degrade_policy = degrade_policy
+        self.recover_ticks = recover_ticks
+
+        self.jitter = LatencyHistogram()  # ns after the deadline
+        self.work = LatencyHistogram()  # ns per tick
+
+        self.deadline = None
+        self.tick_start = None
+        self.start_time = None  # start of the first tick
+        self.last_start = None  # start of the latest tick
+        self.tick_count = 0
+        self.overrun_count = 0
+        self.missed_count = 0
+        self.skipped_count = 0
+        self.degraded_ticks = 0  # ticks left with optional work skipped
+
+    def endTick(self, now):
+        work = now - self.tick_start
+        self.work.record(int(work * 1e9))
+        if self.budget > 0 and work > self.budget:
+            self.overrun_count += 1
+            if self.degrade_policy == DEGRADE_POLICY_SKIP_OPTIONAL:
+                self.degraded_ticks = self.recover_ticks
+        elif self.degraded_ticks > 0:
+            self.degraded_ticks -= 1
+
+    def waitNextTick(self):
+        # returns how late (sec) the tick starts
+        now = time.perf_counter()
+        if self.tick_start is not None:
+            self.endTick(now)
+
+        if self.period <= 0:
+            if self.start_time is None:
+                self.start_time = now
+            self.tick_start = self.last_start = now
+            self.tick_count += 1
+            return 0.0
+
+        if self.deadline is None:
+            self.deadline = now
+        else:
+            self.deadline += self.period
+            if now - self.deadline >= self.period:
+                missed = int((now - self.deadline) / self.period)
+                self.missed_count += missed
+                self.deadline += missed * self.period
+
+        if self.deadline - now > self.spin:
+            time.sleep(self.deadline - now - self.spin)
+        now = time.perf_counter()
+        while now < self.deadline:
+            now = time.perf_counter()
+
+        if self.start_time is None:
+            self.start_time = now
+        late = now - self.deadline
+        self.jitter.record(int(late * 1e9))
+        self.tick_start = self.last_start = now
+        self.tick_count += 1
+        return late
+
+    def isDegraded(self):
+        return self.degraded_ticks > 0
+
+    def runOptional(self, function, *args):
+        # function(*args) unless the degradation policy skips optional work right now
+        if self.degraded_ticks > 0:
+            self.skipped_count += 1
+            return None
+        return function(*args)
+
+    def run(self, tick, ticks=None):
+        # tick() at the loop rate, `ticks` times or until it raises (KeyboardInterrupt)
+        count = 0
+        while ticks is None or count < ticks:
+            self.waitNextTick()
+            tick()
+            count += 1
+        self.endTick(time.perf_counter())
+        self.tick_start = None
+
+    def getReport(self):
+        elapsed = self.last_start - self.start_time if self.start_time is not None else 0.0
+        return {
+            "rate_hz": self.rate,
+            "achieved_hz": (self.tick_count - 1) / elapsed if elapsed > 0 else 0.0,
+            "ticks": self.tick_count,
+            "overruns": self.overrun_count,
+            "missed_ticks": self.missed_count,
+            "skipped_optional": self.skipped_count,
+            "jitter_p50_us": self.jitter.getValueAtPercentile(50) / 1000.0,
+            "jitter_p99_us": self.jitter.getValueAtPercentile(99) / 1000.0,
+            "jitter_max_us": self.jitter.getMax() / 1000.0,
+            "work_p50_us": self.work.getValueAtPercentile(50) / 1000.0,
+            "work_p99_us": self.work.getValueAtPercentile(99) / 1000.0,
+            "work_max_us": self.work.getMax() / 1000.0,
+        }
@@ -25,3 +25,12 @@ from .group_sync_read import *
 from .group_sync_write import *
 from .group_bulk_read import *
 from .group_bulk_write import *
+from .write_planner import *
+from .read_planner import *
+from .control_table import *
+from .indirect_sync_read import *
+from .profiler import *
+from .aio import *
+from .bus_arbiter import *
+from .bus_cycle import *
+from .multi_bus import *
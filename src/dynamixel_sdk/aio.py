@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# asyncio access to a Protocol 2.0 bus
+#
+#   bus = AsyncBus(port, PacketHandler(2.0))
+#   rxpacket, result, error = await bus.txRxPacket(txpacket)
+#   result = await bus.syncRead(group_sync_read)
+#   result = await bus.bulkWrite(group_bulk_write)
+
+import asyncio
+
+from .robotis_def import *
+from .protocol2_packet_handler import PKT_ID, PKT_INSTRUCTION, PKT_ERROR, PKT_PARAMETER0, PKT_LENGTH_L, PKT_LENGTH_H
+
+
+class AsyncBus(object):
+    # One port and packet handler shared by the tasks of an event loop. `lock` (an
+    # asyncio.Lock) keeps a whole transaction, instruction and status packets, to
+    # one task; the port's is_using flag is still set as in the synchronous calls.
+    #
+    # Status packets are awaited with the event loop's reader callback on the
+    # serial file descriptor, up to the port's packet deadline, so waiting tasks cost
+    # nothing while the bus is busy. Instruction packets are written to the kernel
+    # buffer directly. A port without a file descriptor (Windows) does its blocking
+    # reads on the loop's default executor instead.
+    def __init__(self, port, ph):
+        self.port = port
+        self.ph = ph
+        self.lock = asyncio.Lock()
+
+    async def waitReadable(self, timeout):
+        # True when the port has bytes to read within timeout sec
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def ready(value):
+            if not future.done():
+                future.set_result(value)
+
+        loop.add_reader(self.port.fd, ready, True)
+        timer = loop.call_later(max(timeout, 0.0), ready, False)
+        try:
+            return await future
+        finally:
+            timer.cancel()
+            loop.remove_reader(self.port.fd)
+
+    async def readStatus(self, parser):
+        # reads status packet bytes into the parser; False once the packet deadline passed without any
+        port = self.port
+        while True:
+            if port.fd is None:
+                length = await asyncio.get_running_loop().run_in_executor(
+                    None, parser.readFrom, port, None, parser.getBytesMissing())
+            else:
+                length = parser.readFrom(port)
+            if length > 0:
+                return True
+            if port.isPacketTimeout():
+                return False
+            if port.fd is not None:
+                await self.waitReadable(port.getTimeRemaining() / 1000.0)
+
+    async def rxPacket(self, accept_broadcast=False):
+        parser = self.ph.getStatusParser(self.port)
+        parser.accept_broadcast = accept_broadcast
+        rxpacket, result = None, COMM_RX_WAITING
+        timed_out = False
+        try:
+            while True:
+                rxpacket, result = parser.nextPacket()
+                if result != COMM_RX_WAITING:
+                    break
+
+                if not await self.readStatus(parser):
+                    if parser.getBytesAvailable() == 0:
+                        result = COMM_RX_TIMEOUT
+                    else:
+                        result = COMM_RX_CORRUPT
+                    timed_out = True
+                    break
+        finally:
+            # also when the task is cancelled (asyncio.wait_for): free the port, and a
+            # partial reply must not prefix the next one (after a CRC failure the parser
+            # has resynced and keeps the packets behind it)
+            parser.accept_broadcast = False
+            if timed_out or result == COMM_RX_WAITING:
+                parser.clear()
+            self.port.is_using = False
+
+        if result == COMM_SUCCESS and parser.last_packet_stuffed:
+            rxpacket = self.ph.removeStuffing(rxpacket)
+
+        return rxpacket, result
+
+    async def rxStatus(self, dxl_id):
+        # the status packet of dxl_id, skipping replies of other IDs
+        while True:
+            rxpacket, result = await self.rxPacket(dxl_id == BROADCAST_ID)
+            if result != COMM_SUCCESS or rxpacket[PKT_ID] == dxl_id:
+                break
+
+        if result == COMM_SUCCESS:
+            self.port.recordRoundTrip()
+
+        return rxpacket, result
+
+    # NOT for BulkRead / SyncRead instruction
+    async def txRxPacket(self, txpacket):
+        rxpacket = None
+        error = 0
+
+        if self.ph.getProtocolVersion() == 1.0:
+            return rxpacket, COMM_NOT_AVAILABLE, error
+
+        async with self.lock:
+            result = self.ph.txPacket(self.port, txpacket)
+            if result != COMM_SUCCESS:
+                return rxpacket, result, error
+
+            if txpacket[PKT_INSTRUCTION] in (INST_BULK_READ, INST_SYNC_READ, INST_FAST_SYNC_READ, INST_FAST_BULK_READ):
+                result = COMM_NOT_AVAILABLE
+
+            if txpacket[PKT_ID] == BROADCAST_ID or txpacket[PKT_INSTRUCTION] == INST_ACTION:
+                self.port.is_using = False
+                return rxpacket, result, error
+
+            if txpacket[PKT_INSTRUCTION] == INST_READ:
+                self.port.setPacketTimeout(DXL_MAKEWORD(txpacket[PKT_PARAMETER0 + 2], txpacket[PKT_PARAMETER0 + 3]) + 11,
+                                           txpacket[PKT_ID])
+            else:
+                self.port.setPacketTimeout(11, txpacket[PKT_ID])
+
+            rxpacket, result = await self.rxStatus(txpacket[PKT_ID])
+            if result == COMM_SUCCESS:
+                error = rxpacket[PKT_ERROR]
+                # the parser reuses its buffer on the next read, the caller keeps a copy
+                rxpacket = bytes(rxpacket)
+
+        return rxpacket, result, error
+
+    async def syncRead(self, group):
+        # GroupSyncRead.txRxPacket() of a group on this bus, read the data with group.getData() as usual
+        if self.ph.getProtocolVersion() == 1.0 or len(group.data_dict.keys()) == 0:
+            return COMM_NOT_AVAILABLE
+
+        async with self.lock:
+            result = await self.syncReadLocked(group)
+            if result != COMM_SUCCESS and group.fast_read and not group.fast_read_ok:
+                # some model on the bus lacks Fast Sync Read, a servo is off or the reply was bad
+                group.fastReadFailed(result)
+                result = await self.syncReadLocked(group)
+            if not group.fast_read:
+                group.plainReadDone(result)
+
+        return result
+
+    async def syncReadLocked(self, group):
+        group.last_result = False
+
+        result = group.txPacket()
+        if result != COMM_SUCCESS:
+            return result
+
+        if group.fast_read:
+            rxpacket, result = await self.rxStatus(BROADCAST_ID)
+            if result != COMM_SUCCESS:
+                return result
+            return group.setFastReadData(rxpacket)
+
+        for dxl_id in group.data_dict:
+            rxpacket, result = await self.rxStatus(dxl_id)
+            if result != COMM_SUCCESS:
+                return result
+            if DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) - 4 < group.data_length:
+                return COMM_RX_CORRUPT
+
+            data = rxpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + group.data_length]
+            if group.single_buffer:
+                group.data_dict[dxl_id][:] = data
+            else:
+                group.data_dict[dxl_id] = list(data)
+
+        group.last_result = True
+        return result
+
+    async def bulkWrite(self, group):
+        # GroupBulkWrite.txPacket() of a group on this bus, in turn with the other tasks' transactions
+        async with self.lock:
+            return group.txPacket()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# One thread owning a port, running the transactions of many threads by priority
+#
+#   arbiter = BusArbiter(port).start()
+#   future = arbiter.submit(write_planner.txPacket, priority=PRIORITY_GOAL)
+#   data, result, error = arbiter.call(ph.read4ByteTxRx, port, dxl_id, address, priority=PRIORITY_TELEMETRY)
+
+import heapq
+import threading
+import time
+from concurrent.futures import Future
+
+from .profiler import LatencyHistogram
+
+PRIORITY_GOAL = 0  # goal writes of the control loop
+PRIORITY_COMMAND = 1  # one-off reads and writes (torque, LED, settings)
+PRIORITY_TELEMETRY = 2  # health and telemetry polling
+PRIORITIES = (PRIORITY_GOAL, PRIORITY_COMMAND, PRIORITY_TELEMETRY)
+
+
+class BusArbiter(object):
+    # The port's is_using flag is not synchronized and a busy port fails the
+    # transaction (COMM_PORT_BUSY). Here only the arbiter thread touches the port:
+    # other threads submit a function doing one transaction (group.txRxPacket,
+    # ph.read2ByteTxRx, ..) and get a concurrent.futures.Future of its result.
+    # Waiting transactions run lowest priority number first, in submit order within
+    # a priority; a running transaction is never interrupted.
+    #
+    # The wait time (submit to start) and run time of every transaction go into
+    # histograms per priority, see getReport().
+    def __init__(self, port, name="bus_arbiter"):
+        self.port = port
+        self.name = name
+        self.condition = threading.Condition()
+        self.queue = []  # heap of (priority, sequence, future, function, args, submit time)
+        self.sequence = 0
+        self.thread = None
+        self.stopped = False
+
+        self.max_depth = 0
+        self.submitted = dict((priority, 0) for priority in PRIORITIES)
+        self.wait = dict((priority, LatencyHistogram()) for priority in PRIORITIES)  # ns
+        self.busy = dict((priority, LatencyHistogram()) for priority in PRIORITIES)  # ns
+
+    def start(self):
+        self.stopped = False
+        self.thread = threading.Thread(target=self.serve, name=self.name)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self, cancel_pending=False):
+        # runs what is queued (or cancels it) and ends the arbiter thread
+        with self.condition:
+            self.stopped = True
+            if cancel_pending:
+                for entry in self.queue:
+                    entry[2].cancel()
+                self.queue = []
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def submit(self, function, *args, **kwargs):
+        # function(*args) on the arbiter thread; priority=PRIORITY_TELEMETRY unless given
+        priority = kwargs.pop("priority", PRIORITY_TELEMETRY)
+        if kwargs:
+            raise TypeError("unexpected keyword arguments: %s" % ", ".join(kwargs))
+
+        future = Future()
+        with self.condition:
+            if self.stopped:
+                raise RuntimeError("%s is stopped" % self.name)
+            heapq.heappush(self.queue, (priority, self.sequence, future, function, args, time.perf_counter_ns()))
+            self.sequence += 1
+            self.submitted[priority] = self.submitted.get(priority, 0) + 1
+            if len(self.queue) > self.max_depth:
+                self.max_depth = len(self.queue)
+            self.condition.notify()
+        return future
+
+    def call(self, function, *args, **kwargs):
+        # submit() and wait for the result
+        return self.submit(function, *args, **kwargs).result()
+
+    def getQueueDepth(self, priority=None):
+        # waiting transactions, of one priority or all
+        with self.condition:
+            if priority is None:
+                return len(self.queue)
+            return sum(1 for entry in self.queue if entry[0] == priority)
+
+    def serve(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.stopped:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                priority, _, future, function, args, submit_time = heapq.heappop(self.queue)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            start = time.perf_counter_ns()
+            try:
+                result = function(*args)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            end = time.perf_counter_ns()
+
+            with self.condition:
+                self.getHistogram(self.wait, priority).record(start - submit_time)
+                self.getHistogram(self.busy, priority).record(end - start)
+
+    def getHistogram(self, histograms, priority):
+        histogram = histograms.get(priority)
+        if histogram is None:
+            histogram = histograms[priority] = LatencyHistogram()
+        return histogram
+
+    def getReport(self):
+        # {"queue_depth", "max_queue_depth", priority: {submitted, completed, wait_p50_us, ..}}
+        with self.condition:
+            report = {"queue_depth": len(self.queue), "max_queue_depth": self.max_depth}
+            for priority in sorted(self.submitted):
+                wait = self.getHistogram(self.wait, priority)
+                busy = self.getHistogram(self.busy, priority)
+                report[priority] = {
+                    "submitted": self.submitted[priority],
+                    "completed": wait.getTotalCount(),
+                    "wait_p50_us": wait.getValueAtPercentile(50) / 1000.0,
+                    "wait_p99_us": wait.getValueAtPercentile(99) / 1000.0,
+                    "wait_max_us": wait.getMax() / 1000.0,
+                    "busy_p50_us": busy.getValueAtPercentile(50) / 1000.0,
+                    "busy_max_us": busy.getMax() / 1000.0,
+                }
+        return report
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Predicts the bus time of one control tick and the highest loop rate for a servo set
+#
+#   python -m dynamixel_sdk.bus_capacity --baudrate 57600,1000000 --servos 1-6:XL-320 \
+#       --write GOAL_POSITION --read PRESENT_POSITION --rate 100
+
+import argparse
+
+from .robotis_def import *
+from .port_handler import LOW_LATENCY_TIMER
+from .packet_handler import PacketHandler
+from .control_table import getControlTableByName
+from .write_planner import WritePlanner
+from .read_planner import ReadPlanner
+
+DEFAULT_RETURN_DELAY_US = 500  # Return Delay Time 250 in 2 us units, the factory setting
+
+
+class CapacityPort(object):
+    # The parts of PortHandler the planners need to size packets, without a serial port
+    def __init__(self, baudrate, latency_timer=LOW_LATENCY_TIMER):
+        self.baudrate = baudrate
+        self.tx_time_per_byte = (1000.0 / baudrate) * 10.0
+        self.latency_timer = latency_timer
+
+    def getBaudRate(self):
+        return self.baudrate
+
+    def getLatencyTimer(self):
+        return self.latency_timer
+
+
+def getServoItem(servos, dxl_id, name):
+    item = servos[dxl_id].getItem(name)
+    if item is None:
+        raise ValueError("%s has no control table item %s" % (servos[dxl_id].model_name, name))
+    return item
+
+
+def predictTick(baudrate, servos, writes, reads, rate=None, latency_timer=LOW_LATENCY_TIMER,
+                return_delay_us=DEFAULT_RETURN_DELAY_US, fast_read=None, protocol_version=2.0):
+    # servos: {dxl_id: control table}, writes and reads: [(dxl_id, item name)].
+    # return_delay_us is one value or {dxl_id: value}.
+    #
+    # Writes go out as the WritePlanner plan (broadcast, no status packets). Reads
+    # follow the ReadPlanner plan; every read transaction waits for the return delay
+    # of each replying servo (once for Fast Sync/Bulk Read) and one latency timer.
+    port = CapacityPort(baudrate, latency_timer)
+    ph = PacketHandler(protocol_version)
+
+    if fast_read is None:
+        fast_read = all(servos[dxl_id].fast_read for dxl_id in servos)
+
+    write_planner = WritePlanner(port, ph)
+    for dxl_id, name in writes:
+        item = getServoItem(servos, dxl_id, name)
+        write_planner.addWrite(dxl_id, item.address, item.size, bytes(item.size))
+    write_planner.makePlan()
+
+    read_planner = ReadPlanner(port, ph, fast_read=fast_read, transaction_ms=latency_timer)
+    for dxl_id, name in reads:
+        item = getServoItem(servos, dxl_id, name)
+        read_planner.addRead(dxl_id, item.address, item.size)
+    read_planner.makePlan()
+
+    return_delay_ms = 0.0
+    for _, kind, entries in read_planner.plan:
+        replying = entries[:1] if read_planner.fast_read else entries
+        for dxl_id, _, _ in replying:
+            delay = return_delay_us.get(dxl_id, DEFAULT_RETURN_DELAY_US) if isinstance(return_delay_us, dict) else return_delay_us
+            return_delay_ms += delay / 1000.0
+
+    write_bytes = write_planner.plan_length
+    read_bytes = read_planner.plan_length
+    wire_ms = (write_bytes + read_bytes) * port.tx_time_per_byte
+    latency_ms = len(read_planner.plan) * float(latency_timer)
+    tick_ms = wire_ms + return_delay_ms + latency_ms
+
+    prediction = {
+        "baudrate": baudrate,
+        "servos": len(servos),
+        "write_packets": len(write_planner.plan),
+        "write_bytes": write_bytes,
+        "read_packets": len(read_planner.plan),
+        "read_bytes": read_bytes,
+        "wire_ms": wire_ms,
+        "return_delay_ms": return_delay_ms,
+        "latency_ms": latency_ms,
+        "tick_ms": tick_ms,
+        "max_rate_hz": 1000.0 / tick_ms if tick_ms > 0 else 0.0,
+    }
+    if rate:
+        period_ms = 1000.0 / rate
+        prediction["rate_hz"] = rate
+        prediction["budget_ms"] = period_ms - tick_ms
+        prediction["bus_load"] = tick_ms / period_ms
+    return prediction
+
+
+def parseServos(text):
+    # "1-4:XL-320,5:XM430-W350" -> {1: table, 2: table, ..}
+    servos = {}
+    for group in text.split(','):
+        ids, model_name = group.split(':')
+        table = getControlTableByName(model_name)
+        if table is None:
+            raise ValueError("unknown model %s" % model_name)
+        if '-' in ids:
+            first, last = ids.split('-')
+            id_range = range(int(first), int(last) + 1)
+        else:
+            id_range = [int(ids)]
+        for dxl_id in id_range:
+            servos[dxl_id] = table
+    return servos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bus time per control tick and maximum loop rate")
+    parser.add_argument("--baudrate", default="57600", help="one or more, comma separated")
+    parser.add_argument("--servos", required=True, help="IDs and model, e.g. 1-4:XL-320,5:XM430-W350")
+    parser.add_argument("--write", default="GOAL_POSITION", help="items written to every servo each tick")
+    parser.add_argument("--read", default="PRESENT_POSITION", help="items read from every servo each tick, '' for none")
+    parser.add_argument("--rate", type=float, default=None, help="target loop rate in Hz")
+    parser.add_argument("--latency-timer", type=float, default=LOW_LATENCY_TIMER, help="USB-serial latency timer in ms")
+    parser.add_argument("--return-delay-us", type=float, default=DEFAULT_RETURN_DELAY_US)
+    parser.add_argument("--no-fast-read", action="store_true", help="do not use Fast Sync/Bulk Read")
+    args = parser.parse_args(argv)
+
+    try:
+        servos = parseServos(args.servos)
+    except ValueError as e:
+        parser.error(str(e))
+    writes = [(dxl_id, name) for name in args.write.split(',') if name for dxl_id in servos]
+    reads = [(dxl_id, name) for name in args.read.split(',') if name for dxl_id in servos]
+
+    for baudrate in args.baudrate.split(','):
+        try:
+            prediction = predictTick(int(baudrate), servos, writes, reads, rate=args.rate,
+                                     latency_timer=args.latency_timer, return_delay_us=args.return_delay_us,
+                                     fast_read=False if args.no_fast_read else None)
+        except ValueError as e:
+            parser.error(str(e))
+        print("  ".join("%s=%s" % (key, ("%.2f" % value) if isinstance(value, float) else value)
+                        for key, value in prediction.items()))
+
+
+if __name__ == "__main__":
+    main()
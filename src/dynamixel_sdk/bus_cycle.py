@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# The writes and reads of one control tick, sent as one bus cycle
+#
+#   cycle = BusCycle(port, ph)
+#   cycle.writeItem(1, table.GOAL_POSITION, 2048)
+#   cycle.readItem(1, table.PRESENT_POSITION)
+#   result = cycle.commit()
+#   if result.result == COMM_SUCCESS:
+#       position = result.getItem(1, table.PRESENT_POSITION)
+
+from .robotis_def import *
+from .write_planner import WritePlanner
+from .read_planner import ReadPlanner
+
+
+class CycleResult(object):
+    # Outcome of BusCycle.commit(). The data stays readable until the next commit
+    # (in single buffer mode the next read overwrites it).
+    def __init__(self, write_result, read_result, read_planner):
+        self.write_result = write_result  # COMM_NOT_AVAILABLE when there was nothing to write
+        self.read_result = read_result  # COMM_NOT_AVAILABLE when there was nothing to read
+        self.read_planner = read_planner
+
+        self.result = COMM_SUCCESS
+        for result in (write_result, read_result):
+            if result not in (COMM_SUCCESS, COMM_NOT_AVAILABLE):
+                self.result = result
+                break
+
+    def isAvailable(self, dxl_id, address, data_length):
+        return self.read_result == COMM_SUCCESS and self.read_planner.isAvailable(dxl_id, address, data_length)
+
+    def getData(self, dxl_id, address, data_length):
+        if self.read_result != COMM_SUCCESS:
+            return 0
+        return self.read_planner.getData(dxl_id, address, data_length)
+
+    def getItem(self, dxl_id, item):
+        # the value of a ControlItem, signed items as the model means them
+        return item.toSigned(self.getData(dxl_id, item.address, item.size))
+
+
+class BusCycle(object):
+    # Collects the register writes and reads requested during a tick. commit() sends
+    # the writes as the fewest Sync/Bulk Write bytes (WritePlanner) and the reads as
+    # the fewest (Fast) Sync/Bulk Read transactions (ReadPlanner); the write packets
+    # and the first read instruction leave in a single port write (PortHandler
+    # beginBatch), so there are no gaps between them on the bus. The requests are
+    # cleared for the next tick, the plans are kept while the next ticks ask for
+    # the same registers.
+    def __init__(self, port, ph, fast_read=False, single_buffer=False, transaction_ms=None):
+        self.port = port
+        self.ph = ph
+        self.write_planner = WritePlanner(port, ph)
+        self.read_planner = ReadPlanner(port, ph, fast_read=fast_read, single_buffer=single_buffer,
+                                        transaction_ms=transaction_ms)
+
+    def write(self, dxl_id, address, data_length, value):
+        return self.write_planner.addWrite(dxl_id, address, data_length, value)
+
+    def writeItem(self, dxl_id, item, value):
+        return self.write_planner.addWrite(dxl_id, item.address, item.size, item.encode(value))
+
+    def read(self, dxl_id, address, data_length):
+        return self.read_planner.addRead(dxl_id, address, data_length)
+
+    def readItem(self, dxl_id, item):
+        return self.read_planner.addRead(dxl_id, item.address, item.size)
+
+    def clear(self):
+        self.write_planner.clearWrites()
+        self.read_planner.clearReads()
+
+    def commit(self):
+        write_result = COMM_NOT_AVAILABLE
+        read_result = COMM_NOT_AVAILABLE
+
+        batch = hasattr(self.port, "beginBatch")
+        if batch:
+            self.port.beginBatch()
+        try:
+            if self.write_planner.writes:
+                write_result = self.write_planner.txPacket()
+            if self.read_planner.reads:
+                read_result = self.read_planner.txRxPacket()
+        finally:
+            if batch:
+                self.port.flushBatch()
+
+        self.clear()
+        return CycleResult(write_result, read_result, self.read_planner)
+
+    def getReport(self):
+        return {"write": self.write_planner.getReport(), "read": self.read_planner.getReport()}
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Control table registry: register address, byte length and signedness per servo model
+
+import struct
+
+from .robotis_def import *
+
+# Model numbers as returned by ping
+XL320 = 350
+XL430_W250 = 1060
+XM430_W210 = 1030
+XM430_W350 = 1020
+XH430_W210 = 1010
+XH430_W350 = 1000
+XC430_W150 = 1070
+XC430_W240 = 1080
+XL330_M077 = 1190
+XL330_M288 = 1200
+
+STRUCT_FORMATS = {
+    (1, False): '<B',
+    (1, True): '<b',
+    (2, False): '<H',
+    (2, True): '<h',
+    (4, False): '<I',
+    (4, True): '<i',
+}
+
+
+class ControlItem(object):
+    # One register: values are little endian, encode/decode use a precompiled struct.Struct
+    def __init__(self, name, address, size, signed=False):
+        self.name = name
+        self.address = address
+        self.size = size
+        self.signed = signed
+        self.struct = struct.Struct(STRUCT_FORMATS[(size, signed)])
+
+    def encode(self, value):
+        return self.struct.pack(value)
+
+    def decode(self, data, offset=0):
+        if isinstance(data, list):
+            data = bytes(data[offset: offset + self.size])
+            offset = 0
+        return self.struct.unpack_from(data, offset)[0]
+
+    def toSigned(self, value):
+        # unsigned register value (e.g. from GroupSyncRead.getData) to the value the model means
+        if self.signed and value >= 1 << (8 * self.size - 1):
+            return value - (1 << (8 * self.size))
+        return value
+
+
+class ControlTable(object):
+    # Items are reachable as attributes, e.g. table.GOAL_POSITION.address
+    def __init__(self, model_name, model_number, items, fast_read=False):
+        self.model_name = model_name
+        self.model_number = model_number
+        self.items = dict((item.name, item) for item in items)
+        self.fast_read = fast_read  # Fast Sync/Bulk Read instructions (X series firmware 45 or newer)
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['items'][name]
+        except KeyError:
+            raise AttributeError("%s has no control table item %s" % (self.__dict__.get('model_name'), name))
+
+    def hasItem(self, name):
+        return name in self.items
+
+    def getItem(self, name):
+        return self.items.get(name)
+
+    def getAddress(self, name):
+        return self.items[name].address
+
+    def getSize(self, name):
+        return self.items[name].size
+
+
+XL320_ITEMS = (
+    # EEPROM
+    ControlItem('MODEL_NUMBER', 0, 2),
+    ControlItem('FIRMWARE_VERSION', 2, 1),
+    ControlItem('ID', 3, 1),
+    ControlItem('BAUD_RATE', 4, 1),
+    ControlItem('RETURN_DELAY_TIME', 5, 1),
+    ControlItem('CW_ANGLE_LIMIT', 6, 2),
+    ControlItem('CCW_ANGLE_LIMIT', 8, 2),
+    ControlItem('CONTROL_MODE', 11, 1),
+    ControlItem('TEMPERATURE_LIMIT', 12, 1),
+    ControlItem('MIN_VOLTAGE_LIMIT', 13, 1),
+    ControlItem('MAX_VOLTAGE_LIMIT', 14, 1),
+    ControlItem('MAX_TORQUE', 15, 2),
+    ControlItem('STATUS_RETURN_LEVEL', 17, 1),
+    ControlItem('SHUTDOWN', 18, 1),
+    # RAM
+    ControlItem('TORQUE_ENABLE', 24, 1),
+    ControlItem('LED', 25, 1),
+    ControlItem('D_GAIN', 27, 1),
+    ControlItem('I_GAIN', 28, 1),
+    ControlItem('P_GAIN', 29, 1),
+    ControlItem('GOAL_POSITION', 30, 2),
+    ControlItem('MOVING_SPEED', 32, 2),
+    ControlItem('TORQUE_LIMIT', 35, 2),
+    ControlItem('PRESENT_POSITION', 37, 2),
+    ControlItem('PRESENT_SPEED', 39, 2),  # bit 10 is the direction, not a sign
+    ControlItem('PRESENT_LOAD', 41, 2),  # bit 10 is the direction, not a sign
+    ControlItem('PRESENT_VOLTAGE', 45, 1),
+    ControlItem('PRESENT_TEMPERATURE', 46, 1),
+    ControlItem('REGISTERED', 47, 1),
+    ControlItem('MOVING', 49, 1),
+    ControlItem('HARDWARE_ERROR_STATUS', 50, 1),
+    ControlItem('PUNCH', 51, 2),
+)
+
+X_SERIES_ITEMS = (
+    # EEPROM
+    ControlItem('MODEL_NUMBER', 0, 2),
+    ControlItem('MODEL_INFORMATION', 2, 4),
+    ControlItem('FIRMWARE_VERSION', 6, 1),
+    ControlItem('ID', 7, 1),
+    ControlItem('BAUD_RATE', 8, 1),
+    ControlItem('RETURN_DELAY_TIME', 9, 1),
+    ControlItem('DRIVE_MODE', 10, 1),
+    ControlItem('OPERATING_MODE', 11, 1),
+    ControlItem('SECONDARY_ID', 12, 1),
+    ControlItem('PROTOCOL_TYPE', 13, 1),
+    ControlItem('HOMING_OFFSET', 20, 4, True),
+    ControlItem('MOVING_THRESHOLD', 24, 4),
+    ControlItem('TEMPERATURE_LIMIT', 31, 1),
+    ControlItem('MAX_VOLTAGE_LIMIT', 32, 2),
+    ControlItem('MIN_VOLTAGE_LIMIT', 34, 2),
+    ControlItem('PWM_LIMIT', 36, 2),
+    ControlItem('VELOCITY_LIMIT', 44, 4),
+    ControlItem('MAX_POSITION_LIMIT', 48, 4),
+    ControlItem('MIN_POSITION_LIMIT', 52, 4),
+    ControlItem('SHUTDOWN', 63, 1),
+    # RAM
+    ControlItem('TORQUE_ENABLE', 64, 1),
+    ControlItem('LED', 65, 1),
+    ControlItem('STATUS_RETURN_LEVEL', 68, 1),
+    ControlItem('REGISTERED_INSTRUCTION', 69, 1),
+    ControlItem('HARDWARE_ERROR_STATUS', 70, 1),
+    ControlItem('VELOCITY_I_GAIN', 76, 2),
+    ControlItem('VELOCITY_P_GAIN', 78, 2),
+    ControlItem('POSITION_D_GAIN', 80, 2),
+    ControlItem('POSITION_I_GAIN', 82, 2),
+    ControlItem('POSITION_P_GAIN', 84, 2),
+    ControlItem('FEEDFORWARD_2ND_GAIN', 88, 2),
+    ControlItem('FEEDFORWARD_1ST_GAIN', 90, 2),
+    ControlItem('BUS_WATCHDOG', 98, 1, True),
+    ControlItem('GOAL_PWM', 100, 2, True),
+    ControlItem('GOAL_VELOCITY', 104, 4, True),
+    ControlItem('PROFILE_ACCELERATION', 108, 4),
+    ControlItem('PROFILE_VELOCITY', 112, 4),
+    ControlItem('GOAL_POSITION', 116, 4, True),
+    ControlItem('REALTIME_TICK', 120, 2),
+    ControlItem('MOVING', 122, 1),
+    ControlItem('MOVING_STATUS', 123, 1),
+    ControlItem('PRESENT_PWM', 124, 2, True),
+    ControlItem('PRESENT_VELOCITY', 128, 4, True),
+    ControlItem('PRESENT_POSITION', 132, 4, True),
+    ControlItem('VELOCITY_TRAJECTORY', 136, 4, True),
+    ControlItem('POSITION_TRAJECTORY', 140, 4, True),
+    ControlItem('PRESENT_INPUT_VOLTAGE', 144, 2),
+    ControlItem('PRESENT_TEMPERATURE', 146, 1),
+    ControlItem('INDIRECT_ADDRESS_1', 168, 2),  # 28 indirect addresses, 2 bytes each
+    ControlItem('INDIRECT_DATA_1', 224, 1),  # 28 indirect data bytes
+)
+
+# XL430 has no current sensing: register 126 reports load
+X_CURRENT_ITEMS = (
+    ControlItem('CURRENT_LIMIT', 38, 2),
+    ControlItem('GOAL_CURRENT', 102, 2, True),
+    ControlItem('PRESENT_CURRENT', 126, 2, True),
+)
+XL430_ITEMS = X_SERIES_ITEMS + (ControlItem('PRESENT_LOAD', 126, 2, True),)
+
+INDIRECT_ADDRESS_COUNT = 28
+
+CONTROL_TABLES = {}
+
+
+def registerControlTable(table):
+    CONTROL_TABLES[table.model_number] = table
+
+
+def getControlTable(model_number):
+    return CONTROL_TABLES.get(model_number)
+
+
+def getControlTableByName(model_name):
+    # 'XL-320', 'XM430-W350', .. (case and dashes do not matter)
+    key = model_name.upper().replace('-', '')
+    for table in CONTROL_TABLES.values():
+        if table.model_name.replace('-', '') == key:
+            return table
+    return None
+
+
+def pingControlTable(port, ph, dxl_id):
+    # control table of the model answering at dxl_id: (table or None, result, error)
+    model_number, result, error = ph.ping(port, dxl_id)
+    if result != COMM_SUCCESS:
+        return None, result, error
+    return getControlTable(model_number), result, error
+
+
+registerControlTable(ControlTable('XL-320', XL320, XL320_ITEMS))
+registerControlTable(ControlTable('XL430-W250', XL430_W250, XL430_ITEMS, fast_read=True))
+for model_name, model_number in (('XM430-W210', XM430_W210), ('XM430-W350', XM430_W350),
+                                 ('XH430-W210', XH430_W210), ('XH430-W350', XH430_W350),
+                                 ('XC430-W150', XC430_W150), ('XC430-W240', XC430_W240),
+                                 ('XL330-M077', XL330_M077), ('XL330-M288', XL330_M288)):
+    registerControlTable(ControlTable(model_name, model_number, X_SERIES_ITEMS + X_CURRENT_ITEMS, fast_read=True))
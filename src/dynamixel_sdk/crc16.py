@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# CRC16 used by Protocol 2.0 (polynomial 0x8005, no reflection, initial value 0)
+
+import sys
+
+CRC16_POLYNOMIAL = 0x8005
+
+
+def makeCRCTable(polynomial):
+    table = []
+    for i in range(0, 256):
+        crc = i << 8
+        for _ in range(0, 8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ polynomial
+            else:
+                crc = crc << 1
+        table.append(crc & 0xFFFF)
+
+    return tuple(table)
+
+
+def makeWordCRCTable(table):
+    # Feeds two bytes per lookup. Indexed by a little-endian 16 bit word (b0 | b1 << 8)
+    # xor-ed with the byte-swapped CRC, and returns the next byte-swapped CRC.
+    swapped = tuple(((crc & 0xFF) << 8) | (crc >> 8) for crc in table)
+    return tuple((table[lo] & 0xFF) ^ swapped[(table[lo] >> 8) ^ hi]
+                 for hi in range(0, 256) for lo in range(0, 256))
+
+
+# built once at import, shared by every packet handler
+CRC_TABLE = makeCRCTable(CRC16_POLYNOMIAL)
+CRC_WORD_TABLE = makeWordCRCTable(CRC_TABLE) if sys.byteorder == 'little' else None
+
+
+def updateCRC(crc_accum, data_blk_ptr, data_blk_size=None, offset=0):
+    if isinstance(data_blk_ptr, (bytes, bytearray, memoryview)):
+        # zero-copy view of the requested range
+        data = memoryview(data_blk_ptr)
+    else:
+        # legacy list packets
+        data = memoryview(bytes(data_blk_ptr[offset:] if data_blk_size is None
+                                else data_blk_ptr[offset: offset + data_blk_size]))
+        offset = 0
+
+    if data_blk_size is None:
+        data = data[offset:]
+    else:
+        data = data[offset: offset + data_blk_size]
+
+    crc_table = CRC_TABLE
+    word_table = CRC_WORD_TABLE
+    data_length = len(data)
+
+    if word_table is not None and data_length > 1:
+        even_length = data_length & ~1
+        crc = ((crc_accum & 0xFF) << 8) | (crc_accum >> 8)
+        for word in data[:even_length].cast('H'):
+            crc = word_table[crc ^ word]
+        crc_accum = ((crc & 0xFF) << 8) | (crc >> 8)
+        data = data[even_length:]
+
+    for byte in data:
+        crc_accum = ((crc_accum << 8) ^ crc_table[(crc_accum >> 8) ^ byte]) & 0xFFFF
+
+    return crc_accum
+
+
+class CRC16(object):
+    # Incremental CRC16: feed the packet in pieces as they arrive.
+    def __init__(self, crc_accum=0):
+        self.crc_accum = crc_accum
+        self.length = 0
+
+    def reset(self, crc_accum=0):
+        self.crc_accum = crc_accum
+        self.length = 0
+
+    def update(self, data_blk_ptr, data_blk_size=None, offset=0):
+        if data_blk_size is None:
+            data_blk_size = len(data_blk_ptr) - offset
+
+        self.crc_accum = updateCRC(self.crc_accum, data_blk_ptr, data_blk_size, offset)
+        self.length += data_blk_size
+        return self.crc_accum
+
+    def getCRC(self):
+        return self.crc_accum
@@ -20,6 +20,8 @@
 # Author: Ryu Woon Jung (Leon)
 
 from .robotis_def import *
+from .group_read_array import readRecords, recordsFromBlocks, recordsToArray
+from .group_sync_read import FAST_READ_RETRY
 
 PARAM_NUM_DATA = 0
 PARAM_NUM_ADDRESS = 1
@@ -27,7 +29,7 @@ PARAM_NUM_LENGTH = 2
 
 
 class GroupBulkRead:
-    def __init__(self, port, ph):
+    def __init__(self, port, ph, fast_read=False, single_buffer=False):
         self.port = port
         self.ph = ph
 
@@ -36,6 +38,26 @@ class GroupBulkRead:
         self.param = []
         self.data_dict = {}
 
+        # Single buffer (Protocol 2.0): all replies are drained at once and the data of
+        # every ID is a memoryview into data_buffer instead of a new list per read
+        self.single_buffer = single_buffer and ph.getProtocolVersion() == 2.0
+        self.data_buffer = bytearray()
+        self.data_views = {}
+        self.wait_length = 0
+
+        # Fast Bulk Read: one combined status packet instead of one per ID.
+        # If it fails before it ever worked, Bulk Read is used instead: for good when no
+        # servo answered it but they answer the Bulk Read right after (a model without
+        # the instruction ignores it), else Fast Bulk Read is tried again later (the
+        # failure can be a servo that was off or one bad reply).
+        self.fast_read = False
+        self.fast_read_ok = False
+        self.fast_read_unsupported = False
+        self.fast_read_silent = False  # the failed Fast Bulk Read got no reply at all
+        self.fast_read_retry = FAST_READ_RETRY
+        self.fast_read_wait = 0  # successful Bulk Reads before the next try
+        self.setFastRead(fast_read)
+
         self.clearParam()
 
     def makeParam(self):
@@ -56,6 +78,21 @@ class GroupBulkRead:
                 self.param.append(DXL_LOBYTE(self.data_dict[dxl_id][2]))  # LEN_L
                 self.param.append(DXL_HIBYTE(self.data_dict[dxl_id][2]))  # LEN_H
 
+        if self.single_buffer:
+            self.data_buffer = bytearray(sum(self.data_dict[dxl_id][PARAM_NUM_LENGTH] for dxl_id in self.data_dict))
+            view = memoryview(self.data_buffer)
+            self.data_views = {}
+            self.wait_length = 0
+            offset = 0
+            for dxl_id in self.data_dict:
+                data_length = self.data_dict[dxl_id][PARAM_NUM_LENGTH]
+                self.data_views[dxl_id] = view[offset: offset + data_length]
+                self.data_dict[dxl_id][PARAM_NUM_DATA] = self.data_views[dxl_id]
+                self.wait_length += 11 + data_length
+                offset += data_length
+
+        self.is_param_changed = False
+
     def addParam(self, dxl_id, start_address, data_length):
         if dxl_id in self.data_dict:  # dxl_id already exist
             return False
@@ -78,6 +115,40 @@ class GroupBulkRead:
         self.data_dict.clear()
         return
 
+    def setFastRead(self, fast_read):
+        self.fast_read = fast_read and self.ph.getProtocolVersion() == 2.0
+        self.fast_read_ok = False
+        self.fast_read_unsupported = False
+        self.fast_read_silent = False
+        self.fast_read_retry = FAST_READ_RETRY
+        self.fast_read_wait = 0
+
+    def fastReadFailed(self, result):
+        # Bulk Read until fast_read_wait of them succeeded
+        self.fast_read = False
+        self.fast_read_silent = result == COMM_RX_TIMEOUT
+        self.fast_read_wait = self.fast_read_retry
+        self.fast_read_retry *= 2
+
+    def plainReadDone(self, result):
+        # after every Bulk Read: try Fast Bulk Read again when it is due, never again when
+        # the servos answer this Bulk Read but did not answer the Fast Bulk Read before it
+        silent = self.fast_read_silent
+        self.fast_read_silent = False
+        if result != COMM_SUCCESS:
+            return
+        if silent:
+            self.fast_read_unsupported = True
+            self.fast_read_wait = 0
+            return
+        if self.fast_read_wait > 0:
+            self.fast_read_wait -= 1
+            if self.fast_read_wait == 0:
+                self.fast_read = True
+
+    def isFastRead(self):
+        return self.fast_read
+
     def txPacket(self):
         if len(self.data_dict.keys()) == 0:
             return COMM_NOT_AVAILABLE
@@ -85,7 +156,9 @@ class GroupBulkRead:
         if self.is_param_changed is True or not self.param:
             self.makeParam()
 
-        if self.ph.getProtocolVersion() == 1.0:
+        if self.fast_read:
+            return self.ph.fastBulkReadTx(self.port, self.param, len(self.data_dict.keys()) * 5)
+        elif self.ph.getProtocolVersion() == 1.0:
             return self.ph.bulkReadTx(self.port, self.param, len(self.data_dict.keys()) * 3)
         else:
             return self.ph.bulkReadTx(self.port, self.param, len(self.data_dict.keys()) * 5)
@@ -98,6 +171,15 @@ class GroupBulkRead:
         if len(self.data_dict.keys()) == 0:
             return COMM_NOT_AVAILABLE
 
+        if self.fast_read:
+            return self.fastRxPacket()
+
+        if self.single_buffer:
+            result = self.ph.groupReadRx(self.port, self.wait_length, self.data_views)
+            if result == COMM_SUCCESS:
+                self.last_result = True
+            return result
+
         for dxl_id in self.data_dict:
             self.data_dict[dxl_id][PARAM_NUM_DATA], result, _ = self.ph.readRx(self.port, dxl_id,
                                                                                self.data_dict[dxl_id][PARAM_NUM_LENGTH])
@@ -109,12 +191,45 @@ class GroupBulkRead:
 
         return result
 
+    def fastRxPacket(self):
+        rxpacket, result = self.ph.fastReadRx(self.port)
+        if result != COMM_SUCCESS:
+            return result
+
+        data_length = dict((dxl_id, self.data_dict[dxl_id][PARAM_NUM_LENGTH]) for dxl_id in self.data_dict)
+        data_dict, result = self.ph.decodeFastRead(rxpacket, data_length)
+        if result != COMM_SUCCESS:
+            return result
+
+        for dxl_id in self.data_dict:
+            if dxl_id not in data_dict:
+                return COMM_RX_CORRUPT
+
+        for dxl_id in self.data_dict:
+            if self.single_buffer:
+                self.data_views[dxl_id][:] = data_dict[dxl_id][0]
+            else:
+                self.data_dict[dxl_id][PARAM_NUM_DATA] = list(data_dict[dxl_id][0])
+
+        self.last_result = True
+        self.fast_read_ok = True
+        return result
+
     def txRxPacket(self):
         result = self.txPacket()
         if result != COMM_SUCCESS:
             return result
 
-        return self.rxPacket()
+        result = self.rxPacket()
+        if result != COMM_SUCCESS and self.fast_read and not self.fast_read_ok:
+            # some model on the bus lacks Fast Bulk Read, a servo is off or the reply was bad
+            self.fastReadFailed(result)
+            return self.txRxPacket()
+
+        if not self.fast_read:
+            self.plainReadDone(result)
+
+        return result
 
     def isAvailable(self, dxl_id, address, data_length):
         if self.last_result is False or dxl_id not in self.data_dict:
@@ -145,3 +260,34 @@ class GroupBulkRead:
                                               self.data_dict[dxl_id][PARAM_NUM_DATA][address - start_addr + 3]))
         else:
             return 0
+
+    def getDataIds(self):
+        # row order of getDataRecords/getDataArray
+        return list(self.data_dict)
+
+    def getDataRecords(self, items):
+        # control table items of every ID as a NumPy structured array, one field per item.
+        # None unless every ID read all of them. When all IDs read the same block in single
+        # buffer mode the array is a view over the reply buffer and changes on the next read.
+        if self.last_result is False or not self.data_dict:
+            return None
+
+        blocks = [(self.data_dict[dxl_id][PARAM_NUM_ADDRESS], self.data_dict[dxl_id][PARAM_NUM_DATA])
+                  for dxl_id in self.data_dict]
+
+        if self.single_buffer and len(set((address, len(data)) for address, data in blocks)) == 1:
+            start_address, data_length = blocks[0][0], len(blocks[0][1])
+            for item in items:
+                if (item.address < start_address) or (start_address + data_length < item.address + item.size):
+                    return None
+            return readRecords(self.data_buffer, len(blocks), items, start_address, data_length)
+
+        return recordsFromBlocks(blocks, items)
+
+    def getDataArray(self, items):
+        # IDs x items int64 array
+        records = self.getDataRecords(items)
+        if records is None:
+            return None
+
+        return recordsToArray(records, items)
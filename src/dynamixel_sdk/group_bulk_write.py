@@ -28,28 +28,38 @@ class GroupBulkWrite:
         self.ph = ph
 
         self.is_param_changed = False
-        self.param = []
+        self.param = bytearray()
         self.data_list = {}
 
+        # ID -> offset of its data in param. Adding or removing an ID (or changing its
+        # address or length) rebuilds param, changeParam only overwrites the data bytes.
+        self.slot_offset = {}
+
         self.clearParam()
 
     def makeParam(self):
         if self.ph.getProtocolVersion() == 1.0 or not self.data_list:
             return
 
-        self.param = []
+        self.param = bytearray(sum(5 + self.data_list[dxl_id][2] for dxl_id in self.data_list))
+        self.slot_offset = {}
 
+        index = 0
         for dxl_id in self.data_list:
             if not self.data_list[dxl_id]:
                 return
 
-            self.param.append(dxl_id)
-            self.param.append(DXL_LOBYTE(self.data_list[dxl_id][1]))
-            self.param.append(DXL_HIBYTE(self.data_list[dxl_id][1]))
-            self.param.append(DXL_LOBYTE(self.data_list[dxl_id][2]))
-            self.param.append(DXL_HIBYTE(self.data_list[dxl_id][2]))
+            self.param[index + 0] = dxl_id
+            self.param[index + 1] = DXL_LOBYTE(self.data_list[dxl_id][1])
+            self.param[index + 2] = DXL_HIBYTE(self.data_list[dxl_id][1])
+            self.param[index + 3] = DXL_LOBYTE(self.data_list[dxl_id][2])
+            self.param[index + 4] = DXL_HIBYTE(self.data_list[dxl_id][2])
+
+            self.slot_offset[dxl_id] = index + 5
+            self.param[index + 5: index + 5 + len(self.data_list[dxl_id][0])] = bytes(self.data_list[dxl_id][0])
+            index += 5 + self.data_list[dxl_id][2]
 
-            self.param.extend(self.data_list[dxl_id][0])
+        self.is_param_changed = False
 
     def addParam(self, dxl_id, start_address, data_length, data):
         if self.ph.getProtocolVersion() == 1.0:
@@ -87,9 +97,15 @@ class GroupBulkWrite:
         if len(data) > data_length:  # input data is longer than set
             return False
 
-        self.data_list[dxl_id] = [data, start_address, data_length]
+        if not self.is_param_changed and dxl_id in self.slot_offset and \
+                self.data_list[dxl_id][1] == start_address and self.data_list[dxl_id][2] == data_length:
+            # same address and length: patch the data bytes of this ID in place
+            offset = self.slot_offset[dxl_id]
+            self.param[offset: offset + len(data)] = bytes(data)
+        else:
+            self.is_param_changed = True
 
-        self.is_param_changed = True
+        self.data_list[dxl_id] = [data, start_address, data_length]
         return True
 
     def clearParam(self):
@@ -97,6 +113,8 @@ class GroupBulkWrite:
             return
 
         self.data_list.clear()
+        self.slot_offset.clear()
+        self.is_param_changed = True
         return
 
     def txPacket(self):
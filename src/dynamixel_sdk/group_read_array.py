@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Group read results of every ID at once as NumPy arrays
+
+try:
+    import numpy as np
+except ImportError:  # only the array accessors need numpy
+    np = None
+
+DTYPE_CACHE = {}
+
+
+def makeRecordDtype(items, base_address, record_length):
+    # one field per control table item, at its offset from base_address in a record of record_length bytes
+    key = (tuple((item.name, item.address, item.size, item.signed) for item in items), base_address, record_length)
+    dtype = DTYPE_CACHE.get(key)
+    if dtype is None:
+        dtype = np.dtype({
+            'names': [item.name for item in items],
+            'formats': [('<i%d' if item.signed else '<u%d') % item.size for item in items],
+            'offsets': [item.address - base_address for item in items],
+            'itemsize': record_length,
+        })
+        DTYPE_CACHE[key] = dtype
+    return dtype
+
+
+def readRecords(buffer, count, items, base_address, record_length):
+    # zero copy: the records share memory with buffer
+    if np is None:
+        raise ImportError("numpy is required for getDataRecords/getDataArray")
+    return np.frombuffer(buffer, dtype=makeRecordDtype(items, base_address, record_length), count=count)
+
+
+def recordsFromBlocks(blocks, items):
+    # blocks: [(start_address, data)] one per ID. The bytes covering items are copied
+    # into one buffer first, None if an item is outside any block.
+    low = min(item.address for item in items)
+    high = max(item.address + item.size for item in items)
+    record_length = high - low
+
+    buffer = bytearray(record_length * len(blocks))
+    for index, (start_address, data) in enumerate(blocks):
+        if low < start_address or high > start_address + len(data):
+            return None
+        buffer[index * record_length: (index + 1) * record_length] = bytes(data[low - start_address: high - start_address])
+
+    return readRecords(buffer, len(blocks), items, low, record_length)
+
+
+def recordsToArray(records, items):
+    # IDs x items, widened to int64 so signed and unsigned registers share one array
+    array = np.empty((len(records), len(items)), dtype=np.int64)
+    for column, item in enumerate(items):
+        array[:, column] = records[item.name]
+    return array
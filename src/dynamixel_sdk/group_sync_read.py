@@ -20,10 +20,15 @@
 # Author: Ryu Woon Jung (Leon)
 
 from .robotis_def import *
+from .group_read_array import readRecords, recordsFromBlocks, recordsToArray
+
+# successful plain reads before Fast Sync/Bulk Read is tried again after it failed,
+# doubled after every try that fails again
+FAST_READ_RETRY = 100
 
 
 class GroupSyncRead:
-    def __init__(self, port, ph, start_address, data_length):
+    def __init__(self, port, ph, start_address, data_length, fast_read=False, single_buffer=False):
         self.port = port
         self.ph = ph
         self.start_address = start_address
@@ -34,6 +39,25 @@ class GroupSyncRead:
         self.param = []
         self.data_dict = {}
 
+        # Single buffer: all replies are drained at once and the data of every ID is a
+        # memoryview into data_buffer instead of a new list per read
+        self.single_buffer = single_buffer
+        self.data_buffer = bytearray()
+        self.wait_length = 0
+
+        # Fast Sync Read: one combined status packet instead of one per ID.
+        # If it fails before it ever worked, Sync Read is used instead: for good when no
+        # servo answered it but they answer the Sync Read right after (a model without
+        # the instruction ignores it), else Fast Sync Read is tried again later (the
+        # failure can be a servo that was off or one bad reply).
+        self.fast_read = False
+        self.fast_read_ok = False
+        self.fast_read_unsupported = False
+        self.fast_read_silent = False  # the failed Fast Sync Read got no reply at all
+        self.fast_read_retry = FAST_READ_RETRY
+        self.fast_read_wait = 0  # successful Sync Reads before the next try
+        self.setFastRead(fast_read)
+
         self.clearParam()
 
     def makeParam(self):
@@ -48,6 +72,15 @@ class GroupSyncRead:
         for dxl_id in self.data_dict:
             self.param.append(dxl_id)
 
+        if self.single_buffer:
+            self.data_buffer = bytearray(self.data_length * len(self.param))
+            view = memoryview(self.data_buffer)
+            for i, dxl_id in enumerate(self.param):
+                self.data_dict[dxl_id] = view[i * self.data_length: (i + 1) * self.data_length]
+            self.wait_length = (11 + self.data_length) * len(self.param)
+
+        self.is_param_changed = False
+
     def addParam(self, dxl_id):
         if self.ph.getProtocolVersion() == 1.0:
             return False
@@ -77,6 +110,40 @@ class GroupSyncRead:
 
         self.data_dict.clear()
 
+    def setFastRead(self, fast_read):
+        self.fast_read = fast_read and self.ph.getProtocolVersion() == 2.0
+        self.fast_read_ok = False
+        self.fast_read_unsupported = False
+        self.fast_read_silent = False
+        self.fast_read_retry = FAST_READ_RETRY
+        self.fast_read_wait = 0
+
+    def fastReadFailed(self, result):
+        # Sync Read until fast_read_wait of them succeeded
+        self.fast_read = False
+        self.fast_read_silent = result == COMM_RX_TIMEOUT
+        self.fast_read_wait = self.fast_read_retry
+        self.fast_read_retry *= 2
+
+    def plainReadDone(self, result):
+        # after every Sync Read: try Fast Sync Read again when it is due, never again when
+        # the servos answer this Sync Read but did not answer the Fast Sync Read before it
+        silent = self.fast_read_silent
+        self.fast_read_silent = False
+        if result != COMM_SUCCESS:
+            return
+        if silent:
+            self.fast_read_unsupported = True
+            self.fast_read_wait = 0
+            return
+        if self.fast_read_wait > 0:
+            self.fast_read_wait -= 1
+            if self.fast_read_wait == 0:
+                self.fast_read = True
+
+    def isFastRead(self):
+        return self.fast_read
+
     def txPacket(self):
         if self.ph.getProtocolVersion() == 1.0 or len(self.data_dict.keys()) == 0:
             return COMM_NOT_AVAILABLE
@@ -84,6 +151,10 @@ class GroupSyncRead:
         if self.is_param_changed is True or not self.param:
             self.makeParam()
 
+        if self.fast_read:
+            return self.ph.fastSyncReadTx(self.port, self.start_address, self.data_length, self.param,
+                                          len(self.data_dict.keys()) * 1)
+
         return self.ph.syncReadTx(self.port, self.start_address, self.data_length, self.param,
                                   len(self.data_dict.keys()) * 1)
 
@@ -98,6 +169,15 @@ class GroupSyncRead:
         if len(self.data_dict.keys()) == 0:
             return COMM_NOT_AVAILABLE
 
+        if self.fast_read:
+            return self.fastRxPacket()
+
+        if self.single_buffer:
+            result = self.ph.groupReadRx(self.port, self.wait_length, self.data_dict)
+            if result == COMM_SUCCESS:
+                self.last_result = True
+            return result
+
         for dxl_id in self.data_dict:
             self.data_dict[dxl_id], result, _ = self.ph.readRx(self.port, dxl_id, self.data_length)
             if result != COMM_SUCCESS:
@@ -108,6 +188,33 @@ class GroupSyncRead:
 
         return result
 
+    def fastRxPacket(self):
+        rxpacket, result = self.ph.fastReadRx(self.port)
+        if result != COMM_SUCCESS:
+            return result
+
+        return self.setFastReadData(rxpacket)
+
+    def setFastReadData(self, rxpacket):
+        # the data of every ID from the combined Fast Sync Read status packet
+        data_dict, result = self.ph.decodeFastRead(rxpacket, self.data_length)
+        if result != COMM_SUCCESS:
+            return result
+
+        for dxl_id in self.data_dict:
+            if dxl_id not in data_dict:
+                return COMM_RX_CORRUPT
+
+        for dxl_id in self.data_dict:
+            if self.single_buffer:
+                self.data_dict[dxl_id][:] = data_dict[dxl_id][0]
+            else:
+                self.data_dict[dxl_id] = list(data_dict[dxl_id][0])
+
+        self.last_result = True
+        self.fast_read_ok = True
+        return result
+
     def txRxPacket(self):
         if self.ph.getProtocolVersion() == 1.0:
             return COMM_NOT_AVAILABLE
@@ -116,7 +223,16 @@ class GroupSyncRead:
         if result != COMM_SUCCESS:
             return result
 
-        return self.rxPacket()
+        result = self.rxPacket()
+        if result != COMM_SUCCESS and self.fast_read and not self.fast_read_ok:
+            # some model on the bus lacks Fast Sync Read, a servo is off or the reply was bad
+            self.fastReadFailed(result)
+            return self.txRxPacket()
+
+        if not self.fast_read:
+            self.plainReadDone(result)
+
+        return result
 
     def isAvailable(self, dxl_id, address, data_length):
         if self.ph.getProtocolVersion() == 1.0 or self.last_result is False or dxl_id not in self.data_dict:
@@ -143,3 +259,30 @@ class GroupSyncRead:
                                               self.data_dict[dxl_id][address - self.start_address + 3]))
         else:
             return 0
+
+    def getDataIds(self):
+        # row order of getDataRecords/getDataArray
+        return list(self.data_dict)
+
+    def getDataRecords(self, items):
+        # control table items of every ID as a NumPy structured array, one field per item.
+        # In single buffer mode the array is a view over the reply buffer and changes on the next read.
+        if self.ph.getProtocolVersion() == 1.0 or self.last_result is False:
+            return None
+
+        for item in items:
+            if (item.address < self.start_address) or (self.start_address + self.data_length < item.address + item.size):
+                return None
+
+        if self.single_buffer:
+            return readRecords(self.data_buffer, len(self.param), items, self.start_address, self.data_length)
+
+        return recordsFromBlocks([(self.start_address, self.data_dict[dxl_id]) for dxl_id in self.data_dict], items)
+
+    def getDataArray(self, items):
+        # IDs x items int64 array
+        records = self.getDataRecords(items)
+        if records is None:
+            return None
+
+        return recordsToArray(records, items)
@@ -30,23 +30,33 @@ class GroupSyncWrite:
         self.data_length = data_length
 
         self.is_param_changed = False
-        self.param = []
+        self.param = bytearray()
         self.data_dict = {}
 
+        # ID -> offset of its data in param. Adding or removing an ID rebuilds param,
+        # changeParam only overwrites the data bytes of that ID.
+        self.slot_offset = {}
+
         self.clearParam()
 
     def makeParam(self):
         if not self.data_dict:
             return
 
-        self.param = []
+        self.param = bytearray(len(self.data_dict) * (1 + self.data_length))
+        self.slot_offset = {}
 
+        index = 0
         for dxl_id in self.data_dict:
             if not self.data_dict[dxl_id]:
                 return
 
-            self.param.append(dxl_id)
-            self.param.extend(self.data_dict[dxl_id])
+            self.param[index] = dxl_id
+            self.slot_offset[dxl_id] = index + 1
+            self.param[index + 1: index + 1 + len(self.data_dict[dxl_id])] = bytes(self.data_dict[dxl_id])
+            index += 1 + self.data_length
+
+        self.is_param_changed = False
 
     def addParam(self, dxl_id, data):
         if dxl_id in self.data_dict:  # dxl_id already exist
@@ -77,11 +87,18 @@ class GroupSyncWrite:
 
         self.data_dict[dxl_id] = data
 
-        self.is_param_changed = True
+        if not self.is_param_changed and dxl_id in self.slot_offset:
+            # patch the data bytes of this ID in place
+            offset = self.slot_offset[dxl_id]
+            self.param[offset: offset + len(data)] = bytes(data)
+        else:
+            self.is_param_changed = True
         return True
 
     def clearParam(self):
         self.data_dict.clear()
+        self.slot_offset.clear()
+        self.is_param_changed = True
 
     def txPacket(self):
         if len(self.data_dict.keys()) == 0:
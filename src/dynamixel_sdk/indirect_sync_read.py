@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# One Sync Read of scattered control table items through the indirect address table
+
+from .robotis_def import *
+from .control_table import ControlItem, INDIRECT_ADDRESS_COUNT
+from .group_sync_read import GroupSyncRead
+
+
+class IndirectSyncRead(object):
+    # The bytes of `items` are mapped to consecutive indirect data bytes, starting at
+    # indirect slot `indirect_index`, so a single GroupSyncRead over the indirect
+    # data region returns all of them. addParam() programs the indirect addresses of
+    # an ID once, the mapping is kept on the host and reused for every read.
+    #
+    # Models without an indirect address table (XL-320) read the smallest address
+    # range covering the items instead, without any setup writes.
+    #
+    # Values are looked up by the original items: getData(dxl_id, table.PRESENT_LOAD).
+    def __init__(self, port, ph, control_table, items, indirect_index=1, fast_read=None, single_buffer=False):
+        self.port = port
+        self.ph = ph
+        self.control_table = control_table
+        self.items = list(items)
+        self.indirect_index = indirect_index
+
+        self.indirect = control_table.hasItem('INDIRECT_ADDRESS_1') and ph.getProtocolVersion() == 2.0
+        self.data_items = {}  # item name -> item at its address in the read region
+
+        if self.indirect:
+            data_length = sum(item.size for item in self.items)
+            if indirect_index < 1 or indirect_index - 1 + data_length > INDIRECT_ADDRESS_COUNT:
+                raise ValueError("%d bytes do not fit in the indirect slots from %d on" % (data_length, indirect_index))
+
+            start_address = control_table.INDIRECT_DATA_1.address + indirect_index - 1
+            address = start_address
+            for item in self.items:
+                self.data_items[item.name] = ControlItem(item.name, address, item.size, item.signed)
+                address += item.size
+        else:
+            start_address = min(item.address for item in self.items)
+            data_length = max(item.address + item.size for item in self.items) - start_address
+            for item in self.items:
+                self.data_items[item.name] = item
+
+        if fast_read is None:
+            fast_read = control_table.fast_read
+        self.group = GroupSyncRead(port, ph, start_address, data_length, fast_read=fast_read, single_buffer=single_buffer)
+
+        self.programmed = set()  # IDs whose indirect addresses are set up
+        self.setup_result = {}  # dxl_id -> (result, error) of its setup write
+
+    def getIndirectAddresses(self):
+        # the control table address behind each indirect data byte, in order
+        return [item.address + i for item in self.items for i in range(0, item.size)]
+
+    def setupIndirect(self, dxl_id):
+        # write the indirect addresses of dxl_id, a single Write of 2 bytes per slot
+        if not self.indirect or dxl_id in self.programmed:
+            return COMM_SUCCESS, 0
+
+        param = []
+        for address in self.getIndirectAddresses():
+            param.append(DXL_LOBYTE(address))
+            param.append(DXL_HIBYTE(address))
+
+        address = self.control_table.INDIRECT_ADDRESS_1.address + 2 * (self.indirect_index - 1)
+        result, error = self.ph.writeTxRx(self.port, dxl_id, address, len(param), param)
+        self.setup_result[dxl_id] = (result, error)
+        if result == COMM_SUCCESS and error == 0:
+            self.programmed.add(dxl_id)
+        return result, error
+
+    def addParam(self, dxl_id):
+        result, error = self.setupIndirect(dxl_id)
+        if result != COMM_SUCCESS or error != 0:
+            return False
+
+        return self.group.addParam(dxl_id)
+
+    def removeParam(self, dxl_id):
+        self.group.removeParam(dxl_id)
+
+    def clearParam(self):
+        self.group.clearParam()
+
+    def forgetIndirect(self, dxl_id=None):
+        # after a servo reboot its indirect addresses are gone, the next addParam programs them again
+        if dxl_id is None:
+            self.programmed.clear()
+        else:
+            self.programmed.discard(dxl_id)
+
+    def txPacket(self):
+        return self.group.txPacket()
+
+    def rxPacket(self):
+        return self.group.rxPacket()
+
+    def txRxPacket(self):
+        return self.group.txRxPacket()
+
+    def isAvailable(self, dxl_id, item):
+        data_item = self.data_items.get(item.name)
+        if data_item is None:
+            return False
+
+        return self.group.isAvailable(dxl_id, data_item.address, data_item.size)
+
+    def getData(self, dxl_id, item):
+        # value of item, signed when the item is
+        data_item = self.data_items.get(item.name)
+        if data_item is None or not self.group.isAvailable(dxl_id, data_item.address, data_item.size):
+            return 0
+
+        return item.toSigned(self.group.getData(dxl_id, data_item.address, data_item.size))
+
+    def getDataIds(self):
+        return self.group.getDataIds()
+
+    def getDataRecords(self, items=None):
+        if items is None:
+            items = self.items
+        if any(item.name not in self.data_items for item in items):
+            return None
+
+        return self.group.getDataRecords([self.data_items[item.name] for item in items])
+
+    def getDataArray(self, items=None):
+        if items is None:
+            items = self.items
+        if any(item.name not in self.data_items for item in items):
+            return None
+
+        return self.group.getDataArray([self.data_items[item.name] for item in items])
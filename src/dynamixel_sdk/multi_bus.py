@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Several buses (one USB-serial adapter each) committing their ticks in parallel
+#
+#   multi_bus = MultiBus([PortHandler('/dev/ttyUSB0'), PortHandler('/dev/ttyUSB1')]).start()
+#   multi_bus.writeItem(0, 1, table.GOAL_POSITION, left_goal)
+#   multi_bus.writeItem(1, 1, table.GOAL_POSITION, right_goal)
+#   multi_bus.readItem(1, 1, table.PRESENT_POSITION)
+#   results = multi_bus.commit(deadline)   # one CycleResult (or None when late) per bus
+#   sequence, result, error = multi_bus.getLastResult(1)   # also of a commit that was late
+
+import threading
+import time
+
+from .robotis_def import *
+from .packet_handler import PacketHandler
+from .bus_cycle import BusCycle
+from .profiler import LatencyHistogram
+
+REQUEST_WRITE = 0
+REQUEST_READ = 1
+
+
+class BusWorker(threading.Thread):
+    # Runs the BusCycle commits of one bus. The requests of a tick are handed over as
+    # a list and applied on this thread, so the cycle and the port are only touched
+    # here. Waiting for status packets blocks in select/read, which releases the
+    # GIL, so the buses wait for their replies at the same time.
+    def __init__(self, port, ph, fast_read=False, name=None):
+        threading.Thread.__init__(self, name=name)
+        self.daemon = True
+        self.port = port
+        self.ph = ph
+        self.cycle = BusCycle(port, ph, fast_read=fast_read)
+
+        self.requested = threading.Event()
+        self.done = threading.Event()
+        self.busy = False
+        self.stopped = False
+        self.sequence = 0  # MultiBus commit the requests belong to
+        self.requests = []
+        self.last = None  # (sequence, CycleResult or None, exception or None) of the latest finished commit
+
+        self.commit_time = LatencyHistogram()  # ns per commit
+        self.commit_count = 0
+        self.error_count = 0
+
+    def submit(self, sequence, requests):
+        self.sequence = sequence
+        self.requests = requests
+        self.busy = True
+        self.done.clear()
+        self.requested.set()
+
+    def stop(self):
+        self.stopped = True
+        self.requested.set()
+        self.join()
+
+    def run(self):
+        while True:
+            self.requested.wait()
+            self.requested.clear()
+            if self.stopped:
+                return
+
+            start = time.perf_counter_ns()
+            result = None
+            error = None
+            try:
+                for (kind, dxl_id, address), (data_length, value) in self.requests:
+                    if kind == REQUEST_WRITE:
+                        self.cycle.write(dxl_id, address, data_length, value)
+                    else:
+                        self.cycle.read(dxl_id, address, data_length)
+                result = self.cycle.commit()
+            except Exception as e:
+                # only this thread uses the port, free it for the next commit
+                self.port.is_using = False
+                self.cycle.clear()
+                error = e
+                self.error_count += 1
+            self.last = (self.sequence, result, error)
+            self.commit_time.record(time.perf_counter_ns() - start)
+            self.commit_count += 1
+
+            self.busy = False
+            self.done.set()
+
+
+class MultiBus(object):
+    # One BusWorker per port (opened, baud rate set), each with its own packet handler:
+    # the handlers keep packet buffers and status parsers that must not be shared
+    # between threads.
+    #
+    # The requests of a tick are collected per bus; commit() releases the commits of
+    # all buses together and waits for them up to a shared deadline. A bus still busy
+    # at the deadline is late: its result is None, and while it finishes the next
+    # commits leave it out and keep its requests, so a slow bus never holds back the
+    # others. The requests are kept by (write or read, ID, address): a newer write of
+    # a register replaces the older one, and the requests of a wedged bus stay bounded.
+    #
+    # Every commit() gets a sequence number. A bus that finished by the deadline gives
+    # its result, or raises its exception, in that commit(); what a late bus ends with
+    # is kept with its sequence for getLastResult() and never raised by a later commit().
+    def __init__(self, ports, protocol_version=2.0, fast_read=False):
+        self.ports = list(ports)
+        self.workers = [BusWorker(port, PacketHandler(protocol_version), fast_read=fast_read, name="bus_%d" % bus)
+                        for bus, port in enumerate(self.ports)]
+        self.pending = [{} for _ in self.ports]  # (kind, dxl_id, address) -> (data_length, value)
+        self.sequence = 0
+
+        self.late_count = [0] * len(self.ports)
+        self.skipped_count = [0] * len(self.ports)
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        return self
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def getBusCount(self):
+        return len(self.workers)
+
+    def write(self, bus, dxl_id, address, data_length, value):
+        self.pending[bus][(REQUEST_WRITE, dxl_id, address)] = (data_length, value)
+
+    def writeItem(self, bus, dxl_id, item, value):
+        self.pending[bus][(REQUEST_WRITE, dxl_id, item.address)] = (item.size, item.encode(value))
+
+    def read(self, bus, dxl_id, address, data_length):
+        self.pending[bus][(REQUEST_READ, dxl_id, address)] = (data_length, None)
+
+    def readItem(self, bus, dxl_id, item):
+        self.pending[bus][(REQUEST_READ, dxl_id, item.address)] = (item.size, None)
+
+    def commit(self, deadline=None):
+        # deadline: time.perf_counter() the results are needed by, None waits for all buses
+        self.sequence += 1
+        started = []
+        for bus, worker in enumerate(self.workers):
+            if worker.busy:
+                self.skipped_count[bus] += 1
+                continue
+            if not self.pending[bus]:
+                continue
+            requests = list(self.pending[bus].items())
+            self.pending[bus] = {}
+            started.append(bus)
+            worker.submit(self.sequence, requests)
+
+        results = [None] * len(self.workers)
+        error = None
+        for bus in started:
+            worker = self.workers[bus]
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0.0)
+            if not worker.done.wait(timeout):
+                self.late_count[bus] += 1
+                continue
+            _, results[bus], bus_error = worker.last
+            if error is None:
+                error = bus_error
+        if error is not None:
+            raise error
+        return results
+
+    def getLastResult(self, bus):
+        # (sequence, CycleResult or None, exception or None) of the latest finished commit
+        # of a bus, also when it came in after the deadline; None before the first one
+        return self.workers[bus].last
+
+    def getReport(self):
+        # per bus: commits, late, skipped and commit times
+        report = []
+        for bus, worker in enumerate(self.workers):
+            report.append({
+                "port": worker.port.getPortName(),
+                "commits": worker.commit_count,
+                "late": self.late_count[bus],
+                "skipped": self.skipped_count[bus],
+                "errors": worker.error_count,
+                "commit_p50_us": worker.commit_time.getValueAtPercentile(50) / 1000.0,
+                "commit_p99_us": worker.commit_time.getValueAtPercentile(99) / 1000.0,
+                "commit_max_us": worker.commit_time.getMax() / 1000.0,
+            })
+        return report
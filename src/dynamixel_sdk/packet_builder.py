@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Reusable Protocol 2.0 instruction packet buffers
+
+from .robotis_def import *
+
+PACKET_HEADER = b'\xff\xff\xfd\x00'  # HEADER0 HEADER1 HEADER2 RESERVED
+PACKET_OVERHEAD = 10  # HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST CRC16_L CRC16_H
+
+
+class PacketBuilder(object):
+    # One bytearray per (instruction, parameter length) shape. Header, length and
+    # instruction are written when the buffer is created; callers patch ID and
+    # parameters and the packet handler fills in the CRC.
+    # Buffers are reused on the next call with the same shape, so a builder must
+    # not be shared by threads transmitting at the same time.
+    def __init__(self):
+        self.buffers = {}
+
+    def getPacket(self, instruction, param_length, dxl_id=BROADCAST_ID):
+        key = (instruction, param_length)
+        packet = self.buffers.get(key)
+
+        if packet is None or len(packet) != param_length + PACKET_OVERHEAD:
+            packet = bytearray(param_length + PACKET_OVERHEAD)
+            packet[0:4] = PACKET_HEADER
+            packet[5] = DXL_LOBYTE(param_length + 3)  # 3: INST CRC16_L CRC16_H
+            packet[6] = DXL_HIBYTE(param_length + 3)
+            packet[7] = instruction
+            self.buffers[key] = packet
+
+        packet[4] = dxl_id
+        return packet
+
+    def clear(self):
+        self.buffers.clear()
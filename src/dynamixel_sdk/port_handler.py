@@ -19,14 +19,80 @@
 
 # Author: Ryu Woon Jung (Leon)
 
+import os
+import select
 import time
+from collections import deque
 import serial
 import sys
 import platform
 
-LATENCY_TIMER = 16
+LATENCY_TIMER = 16  # msec, FTDI default, used when the adapter latency timer can not be read
+LOW_LATENCY_TIMER = 1  # msec
+USB_SERIAL_SYSFS = '/sys/bus/usb-serial/devices'
 DEFAULT_BAUDRATE = 1000000
 
+# How readPort / readPortInto wait for status packet bytes
+PORT_WAIT_SPIN = 0  # return immediately, the caller polls until the packet timeout
+PORT_WAIT_BLOCK = 1  # block in the kernel until the expected bytes or the packet deadline arrive
+
+# How setPacketTimeout sizes the status packet deadline
+TIMEOUT_POLICY_FIXED = 0  # wire time + 2 latency timer periods + 2 msec
+TIMEOUT_POLICY_ADAPTIVE = 1  # wire time + p99 of the measured latency of that ID + margin
+
+RTT_WINDOW = 256  # latency samples kept per ID
+RTT_MIN_SAMPLES = 16  # samples needed before an ID gets an adaptive timeout
+RTT_UPDATE_INTERVAL = 16  # new samples between percentile updates
+ADAPTIVE_TIMEOUT_MARGIN = 0.5  # msec
+
+
+class RoundTripStats(object):
+    # Sliding window of status packet latencies in msec. A latency is the time from
+    # the end of txPacket to the complete status packet, minus the wire time of
+    # the status packet itself, so reads of any length share the same samples.
+    def __init__(self, window=RTT_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.sample_count = 0
+        self.p99 = 0.0
+        self.p99_count = 0
+
+    def clear(self):
+        self.samples.clear()
+        self.sample_count = 0
+        self.p99 = 0.0
+        self.p99_count = 0
+
+    def addSample(self, msec):
+        self.samples.append(msec)
+        self.sample_count += 1
+
+    def getSampleCount(self):
+        return self.sample_count
+
+    def getPercentile(self, percentile):
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        idx = int(len(samples) * percentile / 100.0 + 0.5) - 1
+        return samples[min(max(idx, 0), len(samples) - 1)]
+
+    def getP99(self):
+        # sorting the window on every packet would cost more than the read itself
+        if self.sample_count - self.p99_count >= RTT_UPDATE_INTERVAL or self.p99_count == 0:
+            self.p99 = self.getPercentile(99)
+            self.p99_count = self.sample_count
+        return self.p99
+
+    def getMean(self):
+        if not self.samples:
+            return 0.0
+        return sum(self.samples) / len(self.samples)
+
+    def getMax(self):
+        if not self.samples:
+            return 0.0
+        return max(self.samples)
+
 
 class PortHandler(object):
     def __init__(self, port_name):
@@ -35,10 +101,26 @@ class PortHandler(object):
         self.packet_start_time = 0.0
         self.packet_timeout = 0.0
         self.tx_time_per_byte = 0.0
+        self.latency_timer = LATENCY_TIMER
 
         self.is_using = False
         self.port_name = port_name
         self.ser = None
+        self.fd = None
+        self.wait_mode = PORT_WAIT_BLOCK
+        self.read_timeout = 0
+
+        self.timeout_policy = TIMEOUT_POLICY_FIXED
+        self.timeout_margin = ADAPTIVE_TIMEOUT_MARGIN
+        self.rtt_stats = {}
+        self.bus_rtt_stats = RoundTripStats()
+        self.packet_id = None
+        self.packet_length = 0
+
+        # beginBatch(): instruction packets are collected and written at once
+        self.batching = False
+        self.batch = bytearray()
+        self.batch_ahead = 0  # bytes in the batch before its last packet
 
     def openPort(self):
         return self.setBaudRate(self.baudrate)
@@ -46,8 +128,11 @@ class PortHandler(object):
     def closePort(self):
         self.ser.close()
         self.is_open = False
+        self.fd = None
 
     def clearPort(self):
+        if self.batching:
+            return  # nothing of the batch is on its way yet
         self.ser.flush()
 
     def setPortName(self, port_name):
@@ -73,22 +158,239 @@ class PortHandler(object):
     def getBytesAvailable(self):
         return self.ser.in_waiting
 
+    def setWaitMode(self, wait_mode):
+        self.wait_mode = wait_mode
+
+    def getWaitMode(self):
+        return self.wait_mode
+
+    def setReadTimeout(self, timeout):
+        # serial read timeout in seconds, only touches the port settings when it changes
+        if timeout != self.read_timeout:
+            self.ser.timeout = timeout
+            self.read_timeout = timeout
+
+    def getLatencyTimerPath(self):
+        # sysfs latency_timer of a USB-serial adapter (FTDI), None for other ports
+        if self.port_name is None:
+            return None
+        tty = os.path.basename(os.path.realpath(self.port_name))
+        path = os.path.join(USB_SERIAL_SYSFS, tty, 'latency_timer')
+        if os.path.exists(path):
+            return path
+        return None
+
+    def readLatencyTimer(self):
+        # updates the latency timer used for packet timeouts from the adapter
+        path = self.getLatencyTimerPath()
+        if path is None:
+            return None
+
+        try:
+            with open(path) as f:
+                self.latency_timer = int(f.read())
+        except (IOError, OSError, ValueError):
+            return None
+
+        return self.latency_timer
+
+    def getLatencyTimer(self):
+        return self.latency_timer
+
+    def setLowLatency(self, latency_timer=LOW_LATENCY_TIMER):
+        # Sets the adapter latency timer through sysfs (needs write access, e.g. a
+        # udev rule) and the ASYNC_LOW_LATENCY flag of the tty. Returns True when
+        # either took effect; the latency timer read back is used for timeouts.
+        result = False
+
+        path = self.getLatencyTimerPath()
+        if path is not None:
+            try:
+                with open(path, 'w') as f:
+                    f.write(str(latency_timer))
+                result = True
+            except (IOError, OSError):
+                pass
+
+        try:
+            self.ser.set_low_latency_mode(True)
+            result = True
+        except (AttributeError, ValueError, IOError, OSError):
+            pass  # not a posix serial port or the driver has no serial_struct
+
+        if self.readLatencyTimer() is None and result:
+            # ASYNC_LOW_LATENCY alone: no adapter buffering to wait for
+            self.latency_timer = latency_timer
+
+        return result
+
+    def setTimeoutPolicy(self, timeout_policy, margin=ADAPTIVE_TIMEOUT_MARGIN):
+        self.timeout_policy = timeout_policy
+        self.timeout_margin = margin
+
+    def getTimeoutPolicy(self):
+        return self.timeout_policy
+
+    def getRoundTripStats(self, dxl_id=None):
+        # stats of one ID, or of every status packet on the bus for None
+        if dxl_id is None:
+            return self.bus_rtt_stats
+        return self.rtt_stats.get(dxl_id)
+
+    def clearRoundTripStats(self):
+        self.rtt_stats.clear()
+        self.bus_rtt_stats.clear()
+
+    def recordRoundTrip(self):
+        # called by the packet handler when the status packet of the ID given to
+        # setPacketTimeout has been received
+        if self.packet_id is None:
+            return
+
+        latency = self.getTimeSinceStart() - (self.tx_time_per_byte * self.packet_length)
+        stats = self.rtt_stats.get(self.packet_id)
+        if stats is None:
+            stats = self.rtt_stats[self.packet_id] = RoundTripStats()
+        stats.addSample(latency)
+        self.bus_rtt_stats.addSample(latency)
+        self.packet_id = None
+
+    def getAdaptiveLatency(self, dxl_id):
+        # learned latency of the ID, else of the bus (an ID that never answered),
+        # None until there are enough samples
+        stats = self.rtt_stats.get(dxl_id)
+        if stats is None or stats.getSampleCount() < RTT_MIN_SAMPLES:
+            stats = self.bus_rtt_stats
+            if stats.getSampleCount() < RTT_MIN_SAMPLES:
+                return None
+        return stats.getP99() + self.timeout_margin
+
+    def getTimeRemaining(self):
+        # msec until the packet deadline set by setPacketTimeout
+        return self.packet_timeout - self.getTimeSinceStart()
+
+    def beginBatch(self):
+        # writePort() collects the instruction packets from here on; flushBatch(), or the
+        # first read for a status packet, writes all of them back to back in one write
+        self.batching = True
+
+    def flushBatch(self):
+        self.batching = False
+        if not self.batch:
+            return 0
+
+        data = self.batch
+        self.batch = bytearray()
+        written = self.writePort(data)
+
+        # a status packet deadline set while batching counts from now, and the packets
+        # ahead of the instruction it answers are on the wire first
+        if self.packet_timeout > 0:
+            self.packet_start_time = self.getCurrentTime()
+            self.packet_timeout += self.tx_time_per_byte * self.batch_ahead
+        self.batch_ahead = 0
+        return written
+
     def readPort(self, length):
+        if self.batch:
+            self.flushBatch()
+
+        if self.wait_mode == PORT_WAIT_BLOCK:
+            buffer = bytearray(length)
+            read_length = self.readPortInto(buffer, length)
+            del buffer[read_length:]
+            return bytes(buffer)
+
+        if self.fd is None:
+            self.setReadTimeout(0)
+
         if (sys.version_info > (3, 0)):
             return self.ser.read(length)
         else:
             return [ord(ch) for ch in self.ser.read(length)]
 
-    def writePort(self, packet):
-        return self.ser.write(packet)
+    def readPortInto(self, buffer, wait_length=0):
+        # Reads into `buffer` and returns the byte count. In PORT_WAIT_BLOCK mode it
+        # waits until at least `wait_length` bytes arrived or the packet deadline passed.
+        if self.batch:
+            self.flushBatch()
+
+        buffer = memoryview(buffer)
+        block = self.wait_mode == PORT_WAIT_BLOCK and wait_length > 0
+
+        if self.fd is None:
+            # no file descriptor to wait on: use a serial timeout derived from the deadline
+            if block:
+                self.setReadTimeout(max(self.getTimeRemaining(), 0.0) / 1000.0)
+                data = self.ser.read(min(wait_length, len(buffer)))
+            else:
+                self.setReadTimeout(0)
+                data = self.ser.read(len(buffer))
+            buffer[0: len(data)] = data
+            return len(data)
+
+        read_length = 0
+        ready = False
+        while True:
+            try:
+                length = os.readv(self.fd, [buffer[read_length:]])
+            except BlockingIOError:
+                length = 0
+
+            if length == 0 and ready:
+                raise serial.SerialException('device reports readiness to read but returned no data '
+                                             '(device disconnected or multiple access on port?)')
+            read_length += length
+
+            if not block or read_length >= wait_length or read_length == len(buffer):
+                return read_length
+
+            time_remaining = self.getTimeRemaining()
+            if time_remaining <= 0:
+                return read_length
+
+            # sleeps in the kernel until the next bytes arrive
+            ready = bool(select.select([self.fd], [], [], time_remaining / 1000.0)[0])
 
-    def setPacketTimeout(self, packet_length):
+    def writePort(self, packet):
+        if self.batching:
+            self.batch_ahead = len(self.batch)
+            self.batch += packet
+            return len(packet)
+
+        if self.fd is None or not isinstance(packet, (bytes, bytearray, memoryview)):
+            return self.ser.write(packet)
+
+        # posix: hand the buffer to the kernel directly, pyserial would copy it to bytes first
+        packet = memoryview(packet)
+        written = 0
+        while written < len(packet):
+            try:
+                written += os.write(self.fd, packet[written:])
+            except BlockingIOError:
+                select.select([], [self.fd], [])
+
+        return written
+
+    def setPacketTimeout(self, packet_length, dxl_id=None):
+        # dxl_id: the single ID expected to answer, enables the adaptive policy and
+        # latency recording. Group reads leave it out and keep the fixed timeout.
         self.packet_start_time = self.getCurrentTime()
-        self.packet_timeout = (self.tx_time_per_byte * packet_length) + (LATENCY_TIMER * 2.0) + 2.0
+        self.packet_id = dxl_id
+        self.packet_length = packet_length
+
+        latency = None
+        if dxl_id is not None and self.timeout_policy == TIMEOUT_POLICY_ADAPTIVE:
+            latency = self.getAdaptiveLatency(dxl_id)
+        if latency is None:
+            latency = (self.latency_timer * 2.0) + 2.0
+
+        self.packet_timeout = (self.tx_time_per_byte * packet_length) + latency
 
     def setPacketTimeoutMillis(self, msec):
         self.packet_start_time = self.getCurrentTime()
         self.packet_timeout = msec
+        self.packet_id = None
 
     def isPacketTimeout(self):
         if self.getTimeSinceStart() > self.packet_timeout:
@@ -98,7 +400,8 @@ class PortHandler(object):
         return False
 
     def getCurrentTime(self):
-        return round(time.time() * 1000000000) / 1000000.0
+        # msec on the monotonic clock, wall clock steps (NTP) must not move deadlines
+        return time.perf_counter_ns() / 1000000.0
 
     def getTimeSinceStart(self):
         time_since = self.getCurrentTime() - self.packet_start_time
@@ -122,7 +425,13 @@ class PortHandler(object):
 
         self.is_open = True
 
+        try:
+            self.fd = self.ser.fileno()
+        except Exception:
+            self.fd = None  # no file descriptor (e.g. Windows)
+
         self.ser.reset_input_buffer()
+        self.readLatencyTimer()
 
         self.tx_time_per_byte = (1000.0 / self.baudrate) * 10.0
 
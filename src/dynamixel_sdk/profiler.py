@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Per-stage timing of the control loop with in-memory latency histograms
+
+import atexit
+import os
+import signal
+import sys
+import threading
+import time
+
+STAGE_MIDI_READ = "midi_read"  # MIDI input read
+STAGE_MAPPING = "mapping"  # controller events to goal positions
+STAGE_ENCODE = "encode"  # goal values and instruction packets: parameters, byte stuffing, CRC
+STAGE_WRITE = "write"  # serial port writes (and input flushes)
+STAGE_WAIT = "wait"  # waiting for status packet bytes
+STAGE_DECODE = "decode"  # status packet parsing and data copies
+STAGE_TICK = "tick"  # one whole loop iteration
+STAGES = (STAGE_MIDI_READ, STAGE_MAPPING, STAGE_ENCODE, STAGE_WRITE, STAGE_WAIT, STAGE_DECODE, STAGE_TICK)
+
+# packet handler methods by stage, the ones a handler lacks (Protocol 1.0 Fast Read) are left out
+ENCODE_METHODS = ("txPacket", "readTx", "writeTxOnly", "regWriteTxOnly", "syncReadTx", "fastSyncReadTx",
+                  "syncWriteTxOnly", "bulkReadTx", "fastBulkReadTx", "bulkWriteTxOnly")
+DECODE_METHODS = ("rxPacket", "readRx", "groupReadRx", "fastReadRx", "decodeFastRead")
+WRITE_METHODS = ("writePort", "clearPort")
+WAIT_METHODS = ("readPort", "readPortInto")
+
+HISTOGRAM_DIGITS = 2  # significant decimal digits kept of every value
+REPORT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram(object):
+    # HDR-style histogram of nanosecond values: every power of two range is split
+    # into the same number of linear sub-buckets, so each value is kept to
+    # HISTOGRAM_DIGITS significant digits at any magnitude with a fixed, small
+    # memory footprint and O(1) recording.
+    def __init__(self, significant_digits=HISTOGRAM_DIGITS):
+        sub_bucket_count = 1
+        while sub_bucket_count < 2 * 10 ** significant_digits:
+            sub_bucket_count *= 2
+        self.sub_bucket_bits = sub_bucket_count.bit_length() - 1
+        self.sub_bucket_half = sub_bucket_count // 2
+        self.counts = [0] * sub_bucket_count
+        self.clear()
+
+    def clear(self):
+        for i in range(0, len(self.counts)):
+            self.counts[i] = 0
+        self.total_count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def getIndex(self, value):
+        bucket = max(value.bit_length() - self.sub_bucket_bits, 0)
+        return bucket * self.sub_bucket_half + (value >> bucket)
+
+    def getHighestValue(self, index):
+        # the largest value counted at index
+        if index < 2 * self.sub_bucket_half:
+            return index
+        bucket = index // self.sub_bucket_half - 1
+        return ((index - bucket * self.sub_bucket_half + 1) << bucket) - 1
+
+    def record(self, value):
+        value = max(int(value), 0)
+        index = self.getIndex(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+
+        if self.total_count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.total_count += 1
+        self.total += value
+
+    def getTotalCount(self):
+        return self.total_count
+
+    def getMean(self):
+        if self.total_count == 0:
+            return 0.0
+        return self.total / self.total_count
+
+    def getMin(self):
+        return self.min
+
+    def getMax(self):
+        return self.max
+
+    def getValueAtPercentile(self, percentile):
+        if self.total_count == 0:
+            return 0
+        target = max(int(self.total_count * percentile / 100.0 + 0.5), 1)
+        count = 0
+        for index, index_count in enumerate(self.counts):
+            count += index_count
+            if count >= target:
+                return min(self.getHighestValue(index), self.max)
+        return self.max
+
+
+class Profiler(object):
+    # Times stages of a control loop. Instrumented methods are replaced on their
+    # instance by a timing wrapper; objects that are not instrumented run without
+    # any overhead, so a loop without a profiler pays nothing.
+    #
+    # Stage times are exclusive: time spent in a nested instrumented call counts for
+    # the inner stage only (txPacket is encode, its writePort inside is write).
+    # Between beginTick() and endTick() the time of every stage is summed over the
+    # tick and recorded once per tick; calls outside a tick, or on other threads,
+    # are recorded per call.
+    def __init__(self, output=None):
+        self.output = output  # file name the report is appended to, stderr when None
+        self.histograms = dict((stage, LatencyHistogram()) for stage in STAGES)
+        self.local = threading.local()
+        self.tick_thread = None
+        self.tick_start = 0
+        self.tick_totals = {}
+        self.lock = threading.Lock()
+
+    def getHistogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = LatencyHistogram()
+            self.histograms[stage] = histogram
+        return histogram
+
+    def beginTick(self):
+        self.tick_thread = threading.get_ident()
+        self.tick_totals = {}
+        self.tick_start = time.perf_counter_ns()
+
+    def endTick(self):
+        elapsed = time.perf_counter_ns() - self.tick_start
+        with self.lock:
+            for stage, total in self.tick_totals.items():
+                self.getHistogram(stage).record(total)
+            self.histograms[STAGE_TICK].record(elapsed)
+        self.tick_thread = None
+
+    def addTime(self, stage, elapsed):
+        if self.tick_thread == threading.get_ident():
+            self.tick_totals[stage] = self.tick_totals.get(stage, 0) + elapsed
+        else:
+            with self.lock:
+                self.getHistogram(stage).record(elapsed)
+
+    def wrap(self, obj, name, stage):
+        # time every call of obj.name as stage
+        function = getattr(obj, name)
+        local = self.local
+
+        def timed(*args, **kwargs):
+            stack = getattr(local, "stack", None)
+            if stack is None:
+                stack = local.stack = []
+            frame = [0]  # time of nested instrumented calls
+            stack.append(frame)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                stack.pop()
+                if stack:
+                    stack[-1][0] += elapsed
+                self.addTime(stage, elapsed - frame[0])
+
+        setattr(obj, name, timed)
+
+    def instrument(self, ph, port):
+        # the packet handler and port stages: encode, write, wait and decode
+        for stage, obj, names in ((STAGE_ENCODE, ph, ENCODE_METHODS), (STAGE_DECODE, ph, DECODE_METHODS),
+                                  (STAGE_WRITE, port, WRITE_METHODS), (STAGE_WAIT, port, WAIT_METHODS)):
+            for name in names:
+                if hasattr(obj, name):
+                    self.wrap(obj, name, stage)
+
+    def clear(self):
+        with self.lock:
+            for histogram in self.histograms.values():
+                histogram.clear()
+
+    def getReport(self):
+        # {stage: {count, mean_us, p50_us, .., max_us}} of the stages that ran
+        report = {}
+        with self.lock:
+            for stage, histogram in self.histograms.items():
+                if histogram.getTotalCount() == 0:
+                    continue
+                stats = {"count": histogram.getTotalCount(), "mean_us": histogram.getMean() / 1000.0}
+                for percentile in REPORT_PERCENTILES:
+                    stats["p%s_us" % percentile] = histogram.getValueAtPercentile(percentile) / 1000.0
+                stats["max_us"] = histogram.getMax() / 1000.0
+                report[stage] = stats
+        return report
+
+    def dump(self, file=None):
+        report = self.getReport()
+        lines = ["[Profiler] pid %d, %s" % (os.getpid(), time.strftime("%Y-%m-%d %H:%M:%S"))]
+        for stage, stats in report.items():
+            lines.append("  %-10s " % stage + "  ".join(
+                "%s=%s" % (key, ("%.1f" % value) if isinstance(value, float) else value) for key, value in stats.items()))
+        text = "\n".join(lines) + "\n"
+
+        if file is not None:
+            file.write(text)
+        elif self.output is not None:
+            with open(self.output, "a") as f:
+                f.write(text)
+        else:
+            sys.stderr.write(text)
+            sys.stderr.flush()
+
+    def dumpOnSignal(self, signum, frame):
+        # the handler runs on the main thread, maybe while it holds self.lock (endTick,
+        # addTime): dump from another thread, which waits for the loop to release it
+        thread = threading.Thread(target=self.dump, name="profiler_dump")
+        thread.daemon = True
+        thread.start()
+
+    def install(self, dump_signal="SIGUSR1", at_exit=True):
+        # dump the histograms on the signal (kill -USR1 <pid>) and when the program exits;
+        # only the main thread can set signal handlers, and Windows has no SIGUSR1
+        signum = getattr(signal, dump_signal, None)
+        if signum is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signum, self.dumpOnSignal)
+        if at_exit:
+            atexit.register(self.dump)
+        return self
+
+
+def profilerFromEnvironment(name='DXL_PROFILE'):
+    # DXL_PROFILE=1 reports to stderr, any other value is a file the reports are appended to;
+    # unset (or 0) returns None and nothing is timed
+    value = os.environ.get(name, '')
+    if value in ('', '0'):
+        return None
+    return Profiler(output=None if value == '1' else value).install()
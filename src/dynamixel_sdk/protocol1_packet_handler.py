@@ -222,9 +222,9 @@ class Protocol1PacketHandler(object):
 
         # set packet timeout
         if txpacket[PKT_INSTRUCTION] == INST_READ:
-            port.setPacketTimeout(txpacket[PKT_PARAMETER0 + 1] + 6)
+            port.setPacketTimeout(txpacket[PKT_PARAMETER0 + 1] + 6, txpacket[PKT_ID])
         else:
-            port.setPacketTimeout(6)  # HEADER0 HEADER1 ID LENGTH ERROR CHECKSUM
+            port.setPacketTimeout(6, txpacket[PKT_ID])  # HEADER0 HEADER1 ID LENGTH ERROR CHECKSUM
 
         # rx packet
         while True:
@@ -234,6 +234,7 @@ class Protocol1PacketHandler(object):
 
         if result == COMM_SUCCESS and txpacket[PKT_ID] == rxpacket[PKT_ID]:
             error = rxpacket[PKT_ERROR]
+            port.recordRoundTrip()
 
         return rxpacket, result, error
 
@@ -305,7 +306,7 @@ class Protocol1PacketHandler(object):
 
         # set packet timeout
         if result == COMM_SUCCESS:
-            port.setPacketTimeout(length + 6)
+            port.setPacketTimeout(length + 6, dxl_id)
 
         return result
 
@@ -324,6 +325,7 @@ class Protocol1PacketHandler(object):
 
         if result == COMM_SUCCESS and rxpacket[PKT_ID] == dxl_id:
             error = rxpacket[PKT_ERROR]
+            port.recordRoundTrip()
 
             data.extend(rxpacket[PKT_PARAMETER0: PKT_PARAMETER0 + length])
 
@@ -20,6 +20,9 @@
 # Author: Ryu Woon Jung (Leon)
 
 from .robotis_def import *
+from .crc16 import updateCRC
+from .packet_builder import *
+from .status_parser import *
 
 TXPACKET_MAX_LEN = 1 * 1024
 RXPACKET_MAX_LEN = 1 * 1024
@@ -49,6 +52,10 @@ ERRBIT_ALERT = 128  # When the device has a problem, this bit is set to 1. Check
 
 
 class Protocol2PacketHandler(object):
+    def __init__(self):
+        self.packet_builder = PacketBuilder()
+        self.status_parsers = {}
+
     def getProtocolVersion(self):
         return 2.0
 
@@ -106,86 +113,34 @@ class Protocol2PacketHandler(object):
             return "[RxPacketError] Unknown error code!"
 
     def updateCRC(self, crc_accum, data_blk_ptr, data_blk_size):
-        crc_table = [0x0000,
-                     0x8005, 0x800F, 0x000A, 0x801B, 0x001E, 0x0014, 0x8011,
-                     0x8033, 0x0036, 0x003C, 0x8039, 0x0028, 0x802D, 0x8027,
-                     0x0022, 0x8063, 0x0066, 0x006C, 0x8069, 0x0078, 0x807D,
-                     0x8077, 0x0072, 0x0050, 0x8055, 0x805F, 0x005A, 0x804B,
-                     0x004E, 0x0044, 0x8041, 0x80C3, 0x00C6, 0x00CC, 0x80C9,
-                     0x00D8, 0x80DD, 0x80D7, 0x00D2, 0x00F0, 0x80F5, 0x80FF,
-                     0x00FA, 0x80EB, 0x00EE, 0x00E4, 0x80E1, 0x00A0, 0x80A5,
-                     0x80AF, 0x00AA, 0x80BB, 0x00BE, 0x00B4, 0x80B1, 0x8093,
-                     0x0096, 0x009C, 0x8099, 0x0088, 0x808D, 0x8087, 0x0082,
-                     0x8183, 0x0186, 0x018C, 0x8189, 0x0198, 0x819D, 0x8197,
-                     0x0192, 0x01B0, 0x81B5, 0x81BF, 0x01BA, 0x81AB, 0x01AE,
-                     0x01A4, 0x81A1, 0x01E0, 0x81E5, 0x81EF, 0x01EA, 0x81FB,
-                     0x01FE, 0x01F4, 0x81F1, 0x81D3, 0x01D6, 0x01DC, 0x81D9,
-                     0x01C8, 0x81CD, 0x81C7, 0x01C2, 0x0140, 0x8145, 0x814F,
-                     0x014A, 0x815B, 0x015E, 0x0154, 0x8151, 0x8173, 0x0176,
-                     0x017C, 0x8179, 0x0168, 0x816D, 0x8167, 0x0162, 0x8123,
-                     0x0126, 0x012C, 0x8129, 0x0138, 0x813D, 0x8137, 0x0132,
-                     0x0110, 0x8115, 0x811F, 0x011A, 0x810B, 0x010E, 0x0104,
-                     0x8101, 0x8303, 0x0306, 0x030C, 0x8309, 0x0318, 0x831D,
-                     0x8317, 0x0312, 0x0330, 0x8335, 0x833F, 0x033A, 0x832B,
-                     0x032E, 0x0324, 0x8321, 0x0360, 0x8365, 0x836F, 0x036A,
-                     0x837B, 0x037E, 0x0374, 0x8371, 0x8353, 0x0356, 0x035C,
-                     0x8359, 0x0348, 0x834D, 0x8347, 0x0342, 0x03C0, 0x83C5,
-                     0x83CF, 0x03CA, 0x83DB, 0x03DE, 0x03D4, 0x83D1, 0x83F3,
-                     0x03F6, 0x03FC, 0x83F9, 0x03E8, 0x83ED, 0x83E7, 0x03E2,
-                     0x83A3, 0x03A6, 0x03AC, 0x83A9, 0x03B8, 0x83BD, 0x83B7,
-                     0x03B2, 0x0390, 0x8395, 0x839F, 0x039A, 0x838B, 0x038E,
-                     0x0384, 0x8381, 0x0280, 0x8285, 0x828F, 0x028A, 0x829B,
-                     0x029E, 0x0294, 0x8291, 0x82B3, 0x02B6, 0x02BC, 0x82B9,
-                     0x02A8, 0x82AD, 0x82A7, 0x02A2, 0x82E3, 0x02E6, 0x02EC,
-                     0x82E9, 0x02F8, 0x82FD, 0x82F7, 0x02F2, 0x02D0, 0x82D5,
-                     0x82DF, 0x02DA, 0x82CB, 0x02CE, 0x02C4, 0x82C1, 0x8243,
-                     0x0246, 0x024C, 0x8249, 0x0258, 0x825D, 0x8257, 0x0252,
-                     0x0270, 0x8275, 0x827F, 0x027A, 0x826B, 0x026E, 0x0264,
-                     0x8261, 0x0220, 0x8225, 0x822F, 0x022A, 0x823B, 0x023E,
-                     0x0234, 0x8231, 0x8213, 0x0216, 0x021C, 0x8219, 0x0208,
-                     0x820D, 0x8207, 0x0202]
-
-        for j in range(0, data_blk_size):
-            i = ((crc_accum >> 8) ^ data_blk_ptr[j]) & 0xFF
-            crc_accum = ((crc_accum << 8) ^ crc_table[i]) & 0xFFFF
-
-        return crc_accum
+        return updateCRC(crc_accum, data_blk_ptr, data_blk_size)
 
     def addStuffing(self, packet):
         packet_length_in = DXL_MAKEWORD(packet[PKT_LENGTH_L], packet[PKT_LENGTH_H])
-        packet_length_out = packet_length_in
-
-        temp = [0] * TXPACKET_MAX_LEN
-
-        # FF FF FD XX ID LEN_L LEN_H
-        temp[PKT_HEADER0: PKT_HEADER0 + PKT_LENGTH_H + 1] = packet[PKT_HEADER0: PKT_HEADER0 + PKT_LENGTH_H + 1]
-
-        index = PKT_INSTRUCTION
-
-        for i in range(0, packet_length_in - 2):  # except CRC
-            temp[index] = packet[i + PKT_INSTRUCTION]
-            index = index + 1
-            if packet[i + PKT_INSTRUCTION] == 0xFD \
-                    and packet[i + PKT_INSTRUCTION - 1] == 0xFF \
-                    and packet[i + PKT_INSTRUCTION - 2] == 0xFF:
-                # FF FF FD
-                temp[index] = 0xFD
-                index = index + 1
-                packet_length_out = packet_length_out + 1
+        crc_index = PKT_INSTRUCTION + packet_length_in - 2
 
-        temp[index] = packet[PKT_INSTRUCTION + packet_length_in - 2]
-        temp[index + 1] = packet[PKT_INSTRUCTION + packet_length_in - 1]
-        index = index + 2
+        if not isinstance(packet, bytearray):
+            packet = bytearray(packet)
 
-        if packet_length_in != packet_length_out:
-            packet = [0] * index
+        # FF FF FD inside LEN_H .. last parameter needs an extra FD
+        idx = packet.find(b'\xff\xff\xfd', PKT_LENGTH_L, crc_index)
+        if idx < 0:
+            return packet
 
-        packet[0: index] = temp[0: index]
+        stuffed = bytearray()
+        start = 0
+        while idx >= 0:
+            stuffed += packet[start: idx + 3]
+            stuffed.append(0xFD)
+            start = idx + 3
+            idx = packet.find(b'\xff\xff\xfd', start, crc_index)
+        stuffed += packet[start: crc_index + 2]
 
-        packet[PKT_LENGTH_L] = DXL_LOBYTE(packet_length_out)
-        packet[PKT_LENGTH_H] = DXL_HIBYTE(packet_length_out)
+        packet_length_out = packet_length_in + len(stuffed) - (crc_index + 2)
+        stuffed[PKT_LENGTH_L] = DXL_LOBYTE(packet_length_out)
+        stuffed[PKT_LENGTH_H] = DXL_HIBYTE(packet_length_out)
 
-        return packet
+        return stuffed
 
     def removeStuffing(self, packet):
         packet_length_in = DXL_MAKEWORD(packet[PKT_LENGTH_L], packet[PKT_LENGTH_H])
@@ -214,8 +169,8 @@ class Protocol2PacketHandler(object):
             return COMM_PORT_BUSY
         port.is_using = True
 
-        # byte stuffing for header
-        self.addStuffing(txpacket)
+        # byte stuffing for header (returns a new packet only if stuffing was needed)
+        txpacket = self.addStuffing(txpacket)
 
         # check max packet length
         total_packet_length = DXL_MAKEWORD(txpacket[PKT_LENGTH_L], txpacket[PKT_LENGTH_H]) + 7
@@ -232,84 +187,56 @@ class Protocol2PacketHandler(object):
         txpacket[PKT_RESERVED] = 0x00
 
         # add CRC16
-        crc = self.updateCRC(0, txpacket, total_packet_length - 2)  # 2: CRC16
+        crc = updateCRC(0, txpacket, total_packet_length - 2)  # 2: CRC16
 
         txpacket[total_packet_length - 2] = DXL_LOBYTE(crc)
         txpacket[total_packet_length - 1] = DXL_HIBYTE(crc)
 
-        # tx packet
+        # tx packet, bytes left in the status parser belong to an earlier transaction
         port.clearPort()
-        written_packet_length = port.writePort(txpacket)
+        parser = self.status_parsers.get(port)
+        if parser is not None:
+            parser.clear()
+        written_packet_length = port.writePort(memoryview(txpacket)[:total_packet_length])
         if total_packet_length != written_packet_length:
             port.is_using = False
             return COMM_TX_FAIL
 
         return COMM_SUCCESS
 
-    def rxPacket(self, port):
-        rxpacket = []
+    def getStatusParser(self, port):
+        # one parser per port, leftover bytes are kept for the next status packet of the transaction
+        parser = self.status_parsers.get(port)
+        if parser is None:
+            parser = StatusPacketParser()
+            self.status_parsers[port] = parser
+        return parser
 
-        result = COMM_TX_FAIL
-        rx_length = 0
-        wait_length = 11  # minimum length (HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H INST ERROR CRC16_L CRC16_H)
+    def rxPacket(self, port):
+        parser = self.getStatusParser(port)
+        timed_out = False
 
         while True:
-            rxpacket.extend(port.readPort(wait_length - rx_length))
-            rx_length = len(rxpacket)
-            if rx_length >= wait_length:
-                # find packet header
-                for idx in range(0, (rx_length - 3)):
-                    if (rxpacket[idx] == 0xFF) and (rxpacket[idx + 1] == 0xFF) and (rxpacket[idx + 2] == 0xFD) and (
-                            rxpacket[idx + 3] != 0xFD):
-                        break
-
-                if idx == 0:
-                    if (rxpacket[PKT_RESERVED] != 0x00) or (rxpacket[PKT_ID] > 0xFC) or (
-                            DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) > RXPACKET_MAX_LEN) or (
-                            rxpacket[PKT_INSTRUCTION] != 0x55):
-                        # remove the first byte in the packet
-                        del rxpacket[0]
-                        rx_length -= 1
-                        continue
-
-                    if wait_length != (DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) + PKT_LENGTH_H + 1):
-                        wait_length = DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) + PKT_LENGTH_H + 1
-                        continue
-
-                    if rx_length < wait_length:
-                        if port.isPacketTimeout():
-                            if rx_length == 0:
-                                result = COMM_RX_TIMEOUT
-                            else:
-                                result = COMM_RX_CORRUPT
-                            break
-                        else:
-                            continue
-
-                    crc = DXL_MAKEWORD(rxpacket[wait_length - 2], rxpacket[wait_length - 1])
-
-                    if self.updateCRC(0, rxpacket, wait_length - 2) == crc:
-                        result = COMM_SUCCESS
-                    else:
-                        result = COMM_RX_CORRUPT
-                    break
+            rxpacket, result = parser.nextPacket()
+            if result != COMM_RX_WAITING:
+                break
 
+            if parser.readFrom(port, wait_length=parser.getBytesMissing()) == 0 and port.isPacketTimeout():
+                if parser.getBytesAvailable() == 0:
+                    result = COMM_RX_TIMEOUT
                 else:
-                    # remove unnecessary packets
-                    del rxpacket[0: idx]
-                    rx_length -= idx
+                    result = COMM_RX_CORRUPT
+                timed_out = True
+                break
 
-            else:
-                if port.isPacketTimeout():
-                    if rx_length == 0:
-                        result = COMM_RX_TIMEOUT
-                    else:
-                        result = COMM_RX_CORRUPT
-                    break
+        if timed_out:
+            # a partial reply must not prefix the next one; after a CRC failure the
+            # parser has resynced one byte further and keeps the packets behind it
+            parser.clear()
 
         port.is_using = False
 
-        if result == COMM_SUCCESS:
+        if result == COMM_SUCCESS and parser.last_packet_stuffed:
             rxpacket = self.removeStuffing(rxpacket)
 
         return rxpacket, result
@@ -324,8 +251,8 @@ class Protocol2PacketHandler(object):
         if result != COMM_SUCCESS:
             return rxpacket, result, error
 
-        # (Instruction == BulkRead or SyncRead) == this function is not available.
-        if txpacket[PKT_INSTRUCTION] == INST_BULK_READ or txpacket[PKT_INSTRUCTION] == INST_SYNC_READ:
+        # (Instruction == (Fast) BulkRead or SyncRead) == this function is not available.
+        if txpacket[PKT_INSTRUCTION] in (INST_BULK_READ, INST_SYNC_READ, INST_FAST_SYNC_READ, INST_FAST_BULK_READ):
             result = COMM_NOT_AVAILABLE
 
         # (ID == Broadcast ID) == no need to wait for status packet or not available.
@@ -336,9 +263,9 @@ class Protocol2PacketHandler(object):
 
         # set packet timeout
         if txpacket[PKT_INSTRUCTION] == INST_READ:
-            port.setPacketTimeout(DXL_MAKEWORD(txpacket[PKT_PARAMETER0 + 2], txpacket[PKT_PARAMETER0 + 3]) + 11)
+            port.setPacketTimeout(DXL_MAKEWORD(txpacket[PKT_PARAMETER0 + 2], txpacket[PKT_PARAMETER0 + 3]) + 11, txpacket[PKT_ID])
         else:
-            port.setPacketTimeout(11)
+            port.setPacketTimeout(11, txpacket[PKT_ID])
             # HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H INST ERROR CRC16_L CRC16_H
 
         # rx packet
@@ -349,6 +276,7 @@ class Protocol2PacketHandler(object):
 
         if result == COMM_SUCCESS and txpacket[PKT_ID] == rxpacket[PKT_ID]:
             error = rxpacket[PKT_ERROR]
+            port.recordRoundTrip()
 
         return rxpacket, result, error
 
@@ -356,15 +284,10 @@ class Protocol2PacketHandler(object):
         model_number = 0
         error = 0
 
-        txpacket = [0] * 10
-
         if dxl_id >= BROADCAST_ID:
             return model_number, COMM_NOT_AVAILABLE, error
 
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = 3
-        txpacket[PKT_LENGTH_H] = 0
-        txpacket[PKT_INSTRUCTION] = INST_PING
+        txpacket = self.packet_builder.getPacket(INST_PING, 0, dxl_id)
 
         rxpacket, result, error = self.txRxPacket(port, txpacket)
         if result == COMM_SUCCESS:
@@ -377,19 +300,13 @@ class Protocol2PacketHandler(object):
 
         STATUS_LENGTH = 14
 
-        rx_length = 0
         wait_length = STATUS_LENGTH * MAX_ID
 
-        txpacket = [0] * 10
-        rxpacket = []
+        txpacket = self.packet_builder.getPacket(INST_PING, 0, BROADCAST_ID)
+        parser = self.getStatusParser(port)
 
         tx_time_per_byte = (1000.0 / port.getBaudRate()) *10.0;
 
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH_L] = 3
-        txpacket[PKT_LENGTH_H] = 0
-        txpacket[PKT_INSTRUCTION] = INST_PING
-
         result = self.txPacket(port, txpacket)
         if result != COMM_SUCCESS:
             port.is_using = False
@@ -399,9 +316,19 @@ class Protocol2PacketHandler(object):
         #port.setPacketTimeout(wait_length * 1)
         port.setPacketTimeoutMillis((wait_length * tx_time_per_byte) + (3.0 * MAX_ID) + 16.0);
 
+        rx_length = 0
         while True:
-            rxpacket += port.readPort(wait_length - rx_length)
-            rx_length = len(rxpacket)
+            rx_length += parser.readFrom(port, wait_length=wait_length - rx_length)
+
+            # parse as the replies arrive, the buffer only has to hold a few of them
+            while True:
+                rxpacket, result = parser.nextPacket()
+                if result == COMM_SUCCESS:
+                    data_list[rxpacket[PKT_ID]] = [
+                        DXL_MAKEWORD(rxpacket[PKT_PARAMETER0 + 1], rxpacket[PKT_PARAMETER0 + 2]),
+                        rxpacket[PKT_PARAMETER0 + 3]]
+                elif result == COMM_RX_WAITING:
+                    break
 
             if port.isPacketTimeout():  # or rx_length >= wait_length
                 break
@@ -411,76 +338,25 @@ class Protocol2PacketHandler(object):
         if rx_length == 0:
             return data_list, COMM_RX_TIMEOUT
 
-        while True:
-            if rx_length < STATUS_LENGTH:
-                return data_list, COMM_RX_CORRUPT
-
-            # find packet header
-            for idx in range(0, rx_length - 2):
-                if rxpacket[idx] == 0xFF and rxpacket[idx + 1] == 0xFF and rxpacket[idx + 2] == 0xFD:
-                    break
-
-            if idx == 0:  # found at the beginning of the packet
-                # verify CRC16
-                crc = DXL_MAKEWORD(rxpacket[STATUS_LENGTH - 2], rxpacket[STATUS_LENGTH - 1])
-
-                if self.updateCRC(0, rxpacket, STATUS_LENGTH - 2) == crc:
-                    result = COMM_SUCCESS
-
-                    data_list[rxpacket[PKT_ID]] = [
-                        DXL_MAKEWORD(rxpacket[PKT_PARAMETER0 + 1], rxpacket[PKT_PARAMETER0 + 2]),
-                        rxpacket[PKT_PARAMETER0 + 3]]
-
-                    del rxpacket[0: STATUS_LENGTH]
-                    rx_length = rx_length - STATUS_LENGTH
-
-                    if rx_length == 0:
-                        return data_list, result
-
-                else:
-                    result = COMM_RX_CORRUPT
-
-                    # remove header (0xFF 0xFF 0xFD)
-                    del rxpacket[0: 3]
-                    rx_length = rx_length - 3
-
-            else:
-                # remove unnecessary packets
-                del rxpacket[0: idx]
-                rx_length = rx_length - idx
+        if not data_list:
+            return data_list, COMM_RX_CORRUPT
 
-        # FIXME: unreachable code
-        return data_list, result
+        return data_list, COMM_SUCCESS
 
     def action(self, port, dxl_id):
-        txpacket = [0] * 10
-
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = 3
-        txpacket[PKT_LENGTH_H] = 0
-        txpacket[PKT_INSTRUCTION] = INST_ACTION
+        txpacket = self.packet_builder.getPacket(INST_ACTION, 0, dxl_id)
 
         _, result, _ = self.txRxPacket(port, txpacket)
         return result
 
     def reboot(self, port, dxl_id):
-        txpacket = [0] * 10
-
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = 3
-        txpacket[PKT_LENGTH_H] = 0
-        txpacket[PKT_INSTRUCTION] = INST_REBOOT
+        txpacket = self.packet_builder.getPacket(INST_REBOOT, 0, dxl_id)
 
         _, result, error = self.txRxPacket(port, txpacket)
         return result, error
 
     def clearMultiTurn(self, port, dxl_id):
-        txpacket = [0] * 15
-
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = 8
-        txpacket[PKT_LENGTH_H] = 0
-        txpacket[PKT_INSTRUCTION] = INST_CLEAR
+        txpacket = self.packet_builder.getPacket(INST_CLEAR, 5, dxl_id)
         txpacket[PKT_PARAMETER0 + 0] = 0x01
         txpacket[PKT_PARAMETER0 + 1] = 0x44
         txpacket[PKT_PARAMETER0 + 2] = 0x58
@@ -491,27 +367,17 @@ class Protocol2PacketHandler(object):
         return result, error
 
     def factoryReset(self, port, dxl_id, option):
-        txpacket = [0] * 11
-
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = 4
-        txpacket[PKT_LENGTH_H] = 0
-        txpacket[PKT_INSTRUCTION] = INST_FACTORY_RESET
+        txpacket = self.packet_builder.getPacket(INST_FACTORY_RESET, 1, dxl_id)
         txpacket[PKT_PARAMETER0] = option
 
         _, result, error = self.txRxPacket(port, txpacket)
         return result, error
 
     def readTx(self, port, dxl_id, address, length):
-        txpacket = [0] * 14
-
         if dxl_id >= BROADCAST_ID:
             return COMM_NOT_AVAILABLE
 
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = 7
-        txpacket[PKT_LENGTH_H] = 0
-        txpacket[PKT_INSTRUCTION] = INST_READ
+        txpacket = self.packet_builder.getPacket(INST_READ, 4, dxl_id)
         txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(address)
         txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(address)
         txpacket[PKT_PARAMETER0 + 2] = DXL_LOBYTE(length)
@@ -521,7 +387,7 @@ class Protocol2PacketHandler(object):
 
         # set packet timeout
         if result == COMM_SUCCESS:
-            port.setPacketTimeout(length + 11)
+            port.setPacketTimeout(length + 11, dxl_id)
 
         return result
 
@@ -540,24 +406,104 @@ class Protocol2PacketHandler(object):
 
         if result == COMM_SUCCESS and rxpacket[PKT_ID] == dxl_id:
             error = rxpacket[PKT_ERROR]
+            port.recordRoundTrip()
 
             data.extend(rxpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length])
 
         return data, result, error
 
+    def groupReadRx(self, port, wait_length, data_views):
+        # Receives all status packets of a Sync/Bulk Read in one pass: waits for the
+        # whole wait_length at once, then splits the receive buffer and copies the data
+        # of each ID into data_views[dxl_id] (writable, sized per ID, in request order).
+        parser = self.getStatusParser(port)
+
+        rx_length = parser.getBytesAvailable()
+        while rx_length < wait_length:
+            read_length = parser.readFrom(port, wait_length=wait_length - rx_length)
+            rx_length += read_length
+            if read_length == 0 and port.isPacketTimeout():
+                break
+
+        if parser.packet_length == 0 and parser.getBytesAvailable() >= wait_length and self.splitGroupReply(
+                parser, data_views):
+            port.is_using = False
+            return COMM_SUCCESS
+
+        # anything unexpected (noise, stuffing, missing or reordered replies): packet by packet
+        pending = set(data_views)
+        rx_length = parser.getBytesAvailable()
+        result = COMM_SUCCESS
+
+        while pending:
+            rxpacket, result = parser.nextPacket()
+            if result == COMM_SUCCESS:
+                if parser.last_packet_stuffed:
+                    rxpacket = self.removeStuffing(rxpacket)
+
+                dxl_id = rxpacket[PKT_ID]
+                if dxl_id in pending:
+                    view = data_views[dxl_id]
+                    length = len(view)
+                    if DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) - 4 < length:
+                        result = COMM_RX_CORRUPT
+                        break
+                    view[0: length] = rxpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length]
+                    pending.discard(dxl_id)
+                continue
+
+            if result != COMM_RX_WAITING:
+                break
+
+            read_length = parser.readFrom(port, wait_length=max(wait_length - rx_length, parser.getBytesMissing()))
+            rx_length += read_length
+            if read_length == 0 and port.isPacketTimeout():
+                if parser.getBytesAvailable() == 0:
+                    result = COMM_RX_TIMEOUT
+                else:
+                    result = COMM_RX_CORRUPT
+                break
+
+        port.is_using = False
+        return result
+
+    def splitGroupReply(self, parser, data_views):
+        # The common case: the replies sit back to back in request order. Each one is
+        # checked with a single compare of its first 8 bytes and one CRC over the packet.
+        buf = parser.buffer
+        view = parser.view
+        index = parser.head
+
+        for dxl_id in data_views:
+            data = data_views[dxl_id]
+            length = len(data)
+            packet_length = length + 11
+            header = bytes((0xFF, 0xFF, 0xFD, 0x00, dxl_id, DXL_LOBYTE(length + 4), DXL_HIBYTE(length + 4), INST_STATUS))
+            crc_index = index + packet_length - 2
+            if not buf.startswith(header, index) or updateCRC(0, view, packet_length - 2, index) != DXL_MAKEWORD(
+                    buf[crc_index], buf[crc_index + 1]) or buf.find(STUFFED_HEADER, index + 4, crc_index) >= 0:
+                return False
+            index += packet_length
+
+        index = parser.head + PKT_PARAMETER0 + 1
+        for dxl_id in data_views:
+            data = data_views[dxl_id]
+            length = len(data)
+            data[0: length] = view[index: index + length]
+            index += length + 11
+
+        parser.head = index - PKT_PARAMETER0 - 1
+        return True
+
     def readTxRx(self, port, dxl_id, address, length):
         error = 0
 
-        txpacket = [0] * 14
         data = []
 
         if dxl_id >= BROADCAST_ID:
             return data, COMM_NOT_AVAILABLE, error
 
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = 7
-        txpacket[PKT_LENGTH_H] = 0
-        txpacket[PKT_INSTRUCTION] = INST_READ
+        txpacket = self.packet_builder.getPacket(INST_READ, 4, dxl_id)
         txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(address)
         txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(address)
         txpacket[PKT_PARAMETER0 + 2] = DXL_LOBYTE(length)
@@ -613,12 +559,7 @@ class Protocol2PacketHandler(object):
         return data_read, result, error
 
     def writeTxOnly(self, port, dxl_id, address, length, data):
-        txpacket = [0] * (length + 12)
-
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(length + 5)
-        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(length + 5)
-        txpacket[PKT_INSTRUCTION] = INST_WRITE
+        txpacket = self.packet_builder.getPacket(INST_WRITE, length + 2, dxl_id)
         txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(address)
         txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(address)
 
@@ -630,12 +571,7 @@ class Protocol2PacketHandler(object):
         return result
 
     def writeTxRx(self, port, dxl_id, address, length, data):
-        txpacket = [0] * (length + 12)
-
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(length + 5)
-        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(length + 5)
-        txpacket[PKT_INSTRUCTION] = INST_WRITE
+        txpacket = self.packet_builder.getPacket(INST_WRITE, length + 2, dxl_id)
         txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(address)
         txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(address)
 
@@ -675,12 +611,7 @@ class Protocol2PacketHandler(object):
         return self.writeTxRx(port, dxl_id, address, 4, data_write)
 
     def regWriteTxOnly(self, port, dxl_id, address, length, data):
-        txpacket = [0] * (length + 12)
-
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(length + 5)
-        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(length + 5)
-        txpacket[PKT_INSTRUCTION] = INST_REG_WRITE
+        txpacket = self.packet_builder.getPacket(INST_REG_WRITE, length + 2, dxl_id)
         txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(address)
         txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(address)
 
@@ -692,12 +623,7 @@ class Protocol2PacketHandler(object):
         return result
 
     def regWriteTxRx(self, port, dxl_id, address, length, data):
-        txpacket = [0] * (length + 12)
-
-        txpacket[PKT_ID] = dxl_id
-        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(length + 5)
-        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(length + 5)
-        txpacket[PKT_INSTRUCTION] = INST_REG_WRITE
+        txpacket = self.packet_builder.getPacket(INST_REG_WRITE, length + 2, dxl_id)
         txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(address)
         txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(address)
 
@@ -708,15 +634,8 @@ class Protocol2PacketHandler(object):
         return result, error
 
     def syncReadTx(self, port, start_address, data_length, param, param_length):
-        txpacket = [0] * (param_length + 14)
-        # 14: HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
-
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(
-            param_length + 7)  # 7: INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
-        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(
-            param_length + 7)  # 7: INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
-        txpacket[PKT_INSTRUCTION] = INST_SYNC_READ
+        txpacket = self.packet_builder.getPacket(INST_SYNC_READ, param_length + 4)
+        # 4: START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H
         txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(start_address)
         txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(start_address)
         txpacket[PKT_PARAMETER0 + 2] = DXL_LOBYTE(data_length)
@@ -730,16 +649,27 @@ class Protocol2PacketHandler(object):
 
         return result
 
+    def fastSyncReadTx(self, port, start_address, data_length, param, param_length):
+        txpacket = self.packet_builder.getPacket(INST_FAST_SYNC_READ, param_length + 4)
+        # 4: START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H
+        txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(start_address)
+        txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(start_address)
+        txpacket[PKT_PARAMETER0 + 2] = DXL_LOBYTE(data_length)
+        txpacket[PKT_PARAMETER0 + 3] = DXL_HIBYTE(data_length)
+
+        txpacket[PKT_PARAMETER0 + 4: PKT_PARAMETER0 + 4 + param_length] = param[0: param_length]
+
+        result = self.txPacket(port, txpacket)
+        if result == COMM_SUCCESS:
+            port.setPacketTimeout(8 + (data_length + 4) * param_length)
+            # one status packet: HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H INST
+            # + per ID: ERROR ID DATA CRC16_L CRC16_H
+
+        return result
+
     def syncWriteTxOnly(self, port, start_address, data_length, param, param_length):
-        txpacket = [0] * (param_length + 14)
-        # 14: HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
-
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(
-            param_length + 7)  # 7: INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
-        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(
-            param_length + 7)  # 7: INST START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H CRC16_L CRC16_H
-        txpacket[PKT_INSTRUCTION] = INST_SYNC_WRITE
+        txpacket = self.packet_builder.getPacket(INST_SYNC_WRITE, param_length + 4)
+        # 4: START_ADDR_L START_ADDR_H DATA_LEN_L DATA_LEN_H
         txpacket[PKT_PARAMETER0 + 0] = DXL_LOBYTE(start_address)
         txpacket[PKT_PARAMETER0 + 1] = DXL_HIBYTE(start_address)
         txpacket[PKT_PARAMETER0 + 2] = DXL_LOBYTE(data_length)
@@ -752,13 +682,7 @@ class Protocol2PacketHandler(object):
         return result
 
     def bulkReadTx(self, port, param, param_length):
-        txpacket = [0] * (param_length + 10)
-        # 10: HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST CRC16_L CRC16_H
-
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(param_length + 3)  # 3: INST CRC16_L CRC16_H
-        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(param_length + 3)  # 3: INST CRC16_L CRC16_H
-        txpacket[PKT_INSTRUCTION] = INST_BULK_READ
+        txpacket = self.packet_builder.getPacket(INST_BULK_READ, param_length)
 
         txpacket[PKT_PARAMETER0: PKT_PARAMETER0 + param_length] = param[0: param_length]
 
@@ -773,14 +697,67 @@ class Protocol2PacketHandler(object):
 
         return result
 
-    def bulkWriteTxOnly(self, port, param, param_length):
-        txpacket = [0] * (param_length + 10)
-        # 10: HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST CRC16_L CRC16_H
+    def fastBulkReadTx(self, port, param, param_length):
+        txpacket = self.packet_builder.getPacket(INST_FAST_BULK_READ, param_length)
+
+        txpacket[PKT_PARAMETER0: PKT_PARAMETER0 + param_length] = param[0: param_length]
+
+        result = self.txPacket(port, txpacket)
+        if result == COMM_SUCCESS:
+            wait_length = 8
+            i = 0
+            while i < param_length:
+                wait_length += DXL_MAKEWORD(param[i + 3], param[i + 4]) + 4
+                i += 5
+            port.setPacketTimeout(wait_length)
+
+        return result
+
+    def fastReadRx(self, port):
+        # the combined Fast Sync/Bulk Read status packet, sent from the broadcast ID
+        parser = self.getStatusParser(port)
+        parser.accept_broadcast = True
+        try:
+            while True:
+                rxpacket, result = self.rxPacket(port)
+                if result != COMM_SUCCESS or rxpacket[PKT_ID] == BROADCAST_ID:
+                    break
+        finally:
+            parser.accept_broadcast = False
+
+        return rxpacket, result
+
+    def decodeFastRead(self, rxpacket, data_length):
+        # Splits a combined status packet into {dxl_id: (data, error)}, data being a view of rxpacket.
+        # data_length is the length of every ID (sync) or a dict of lengths per ID (bulk).
+        # Each ID adds ERROR ID DATA CRC16_L CRC16_H, the CRC of the last one is the packet CRC.
+        data_dict = {}
+        packet_length = DXL_MAKEWORD(rxpacket[PKT_LENGTH_L], rxpacket[PKT_LENGTH_H]) + 7
+        index = PKT_ERROR
+
+        while index < packet_length:
+            if index + 2 > packet_length:
+                return data_dict, COMM_RX_CORRUPT
+
+            error = rxpacket[index]
+            dxl_id = rxpacket[index + 1]
+            if isinstance(data_length, dict):
+                length = data_length.get(dxl_id)
+                if length is None:
+                    return data_dict, COMM_RX_CORRUPT
+            else:
+                length = data_length
+
+            if index + length + 4 > packet_length:
+                return data_dict, COMM_RX_CORRUPT
 
-        txpacket[PKT_ID] = BROADCAST_ID
-        txpacket[PKT_LENGTH_L] = DXL_LOBYTE(param_length + 3)  # 3: INST CRC16_L CRC16_H
-        txpacket[PKT_LENGTH_H] = DXL_HIBYTE(param_length + 3)  # 3: INST CRC16_L CRC16_H
-        txpacket[PKT_INSTRUCTION] = INST_BULK_WRITE
+            data_dict[dxl_id] = (rxpacket[index + 2: index + 2 + length], error)
+            index += length + 4
+
+        return data_dict, COMM_SUCCESS
+
+    def bulkWriteTxOnly(self, port, param, param_length):
+        txpacket = self.packet_builder.getPacket(INST_BULK_WRITE, param_length)
 
         txpacket[PKT_PARAMETER0: PKT_PARAMETER0 + param_length] = param[0: param_length]
 
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Reads a set of (ID, address, length) requests with the fewest Sync/Bulk Read transactions and bytes
+
+from .robotis_def import *
+from .group_sync_read import GroupSyncRead
+from .group_bulk_read import GroupBulkRead
+
+
+# Protocol 2.0 packet sizes in bytes (no byte stuffing)
+def syncReadLength(servo_count):
+    # HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST ADDR_L ADDR_H DATA_LEN_L DATA_LEN_H [ID] CRC16_L CRC16_H
+    return 14 + servo_count
+
+
+def bulkReadLength(servo_count):
+    # HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST [ID ADDR_L ADDR_H LEN_L LEN_H] CRC16_L CRC16_H
+    return 10 + 5 * servo_count
+
+
+def statusLength(data_length):
+    # HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST ERROR [DATA] CRC16_L CRC16_H
+    return 11 + data_length
+
+
+def fastStatusLength(data_lengths):
+    # HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST [ERROR ID DATA CRC16_L CRC16_H]
+    return 8 + sum(4 + data_length for data_length in data_lengths)
+
+
+# Protocol 1.0 Bulk Read: 0xFF 0xFF ID LEN INST 0x00 [LEN ID ADDR] CHKSUM, status 0xFF 0xFF ID LEN ERR [DATA] CHKSUM
+def protocol1BulkReadLength(servo_count):
+    return 7 + 3 * servo_count
+
+
+def protocol1StatusLength(data_length):
+    return 6 + data_length
+
+
+class ReadPlanner(object):
+    # Collects (ID, address, length) read requests. The ranges of one ID are merged
+    # when reading the bytes between them costs less bus time than the extra
+    # transaction a second range needs (a Sync/Bulk Read carries one range per ID).
+    # Every transaction ("round") then gets the packet with the fewest bytes: Sync
+    # Read over the range covering all its IDs, or Bulk Read, as Fast Sync/Fast Bulk
+    # Read when `fast_read` is set.
+    #
+    # The plan and its group objects are kept while the requests stay the same.
+    # getData() takes the original (ID, address, length) of a request.
+    def __init__(self, port, ph, fast_read=False, single_buffer=False, transaction_ms=None):
+        self.port = port
+        self.ph = ph
+        self.fast_read = fast_read and ph.getProtocolVersion() == 2.0
+        self.single_buffer = single_buffer
+
+        # fixed cost of one transaction besides its bytes (USB latency, return delay),
+        # the port's latency timer when not given
+        self.transaction_ms = transaction_ms
+
+        self.reads = {}  # (dxl_id, address) -> data_length
+
+        self.plan_key = None
+        self.plan = []  # [(group, kind, [(dxl_id, address, data_length), ..])]
+        self.request_group = {}  # (dxl_id, address) -> group holding it
+        self.plan_length = 0
+        self.unplanned_length = 0
+        self.unplanned_count = 0
+
+        self.last_result = False
+
+    def addRead(self, dxl_id, address, data_length):
+        if data_length <= 0:
+            return False
+
+        self.reads[(dxl_id, address)] = data_length
+        return True
+
+    def removeRead(self, dxl_id, address):
+        self.reads.pop((dxl_id, address), None)
+
+    def clearReads(self):
+        self.reads.clear()
+
+    def getByteTime(self):
+        # ms per byte on the wire, from the baud rate so an unopened port works too
+        return (1000.0 / self.port.getBaudRate()) * 10.0
+
+    def getTransactionTime(self):
+        if self.transaction_ms is not None:
+            return self.transaction_ms
+        return self.port.getLatencyTimer()
+
+    def mergeRanges(self, ranges, range_count=None):
+        # ranges: [(address, data_length)] of one ID. Gaps smaller than what a range of its
+        # own costs are always read; with range_count the smallest gaps are read as well
+        # until no more than range_count ranges are left.
+        merged = []
+        for address, data_length in sorted(ranges):
+            if merged and address - (merged[-1][0] + merged[-1][1]) < self.getRangeOverhead():
+                last_address, last_length = merged[-1]
+                merged[-1] = (last_address, max(last_length, address + data_length - last_address))
+            else:
+                merged.append((address, data_length))
+
+        while range_count is not None and len(merged) > range_count:
+            i = min(range(0, len(merged) - 1), key=lambda i: merged[i + 1][0] - (merged[i][0] + merged[i][1]))
+            merged[i] = (merged[i][0], max(merged[i][1], merged[i + 1][0] + merged[i + 1][1] - merged[i][0]))
+            del merged[i + 1]
+        return merged
+
+    def getRangeOverhead(self):
+        # bytes a range in its own round costs beyond its data: a Bulk Read entry and a status packet
+        if self.ph.getProtocolVersion() == 1.0:
+            return 3 + protocol1StatusLength(0)
+        if self.fast_read:
+            return 5 + 4
+        return 5 + statusLength(0)
+
+    def getRoundLength(self, entries, kind):
+        # bytes on the wire for one round of (dxl_id, address, data_length) entries sent as kind
+        count = len(entries)
+        if kind == "sync":
+            low = min(address for _, address, _ in entries)
+            data_length = max(address + length for _, address, length in entries) - low
+            if self.fast_read:
+                return syncReadLength(count) + fastStatusLength([data_length] * count)
+            return syncReadLength(count) + count * statusLength(data_length)
+
+        if self.ph.getProtocolVersion() == 1.0:
+            return protocol1BulkReadLength(count) + sum(protocol1StatusLength(length) for _, _, length in entries)
+        if self.fast_read:
+            return bulkReadLength(count) + fastStatusLength([length for _, _, length in entries])
+        return bulkReadLength(count) + sum(statusLength(length) for _, _, length in entries)
+
+    def getUnplannedRounds(self):
+        # the requests as they are, one Bulk Read per round of distinct IDs
+        rounds = []
+        for (dxl_id, address), data_length in self.reads.items():
+            for entries in rounds:
+                if all(entry[0] != dxl_id for entry in entries):
+                    entries.append((dxl_id, address, data_length))
+                    break
+            else:
+                rounds.append([(dxl_id, address, data_length)])
+        return rounds
+
+    def getRounds(self, ranges):
+        # [(entries, kind, length)]: round k reads the k-th range of every ID that has one
+        rounds = []
+        for k in range(0, max(len(id_ranges) for id_ranges in ranges.values())):
+            entries = [(dxl_id, ranges[dxl_id][k][0], ranges[dxl_id][k][1]) for dxl_id in ranges if k < len(ranges[dxl_id])]
+
+            kind = "bulk"
+            if self.ph.getProtocolVersion() == 2.0 and (
+                    self.getRoundLength(entries, "sync") <= self.getRoundLength(entries, "bulk")):
+                kind = "sync"
+            rounds.append((entries, kind, self.getRoundLength(entries, kind)))
+        return rounds
+
+    def makePlan(self):
+        self.plan_key = tuple(sorted((key[0], key[1], self.reads[key]) for key in self.reads))
+        self.plan = []
+        self.request_group = {}
+        self.plan_length = 0
+        self.unplanned_length = 0
+        self.unplanned_count = 0
+
+        if not self.reads:
+            return
+
+        # ranges per ID, in the order IDs were first added
+        ranges = {}
+        for (dxl_id, address), data_length in self.reads.items():
+            ranges.setdefault(dxl_id, []).append((address, data_length))
+        for dxl_id in ranges:
+            ranges[dxl_id] = self.mergeRanges(ranges[dxl_id])
+
+        # every round is one transaction: try each round count, reading the gaps that
+        # fewer rounds need, and keep the one with the least bus time
+        transaction_length = self.getTransactionTime() / self.getByteTime()
+        best = None
+        for round_count in range(1, max(len(id_ranges) for id_ranges in ranges.values()) + 1):
+            rounds = self.getRounds(dict((dxl_id, self.mergeRanges(ranges[dxl_id], round_count)) for dxl_id in ranges))
+            cost = sum(length for _, _, length in rounds) + len(rounds) * transaction_length
+            if best is None or cost < best[0]:
+                best = (cost, rounds)
+
+        for entries, kind, length in best[1]:
+            self.plan_length += length
+
+            if kind == "sync":
+                low = min(address for _, address, _ in entries)
+                data_length = max(address + length for _, address, length in entries) - low
+                group = GroupSyncRead(self.port, self.ph, low, data_length,
+                                      fast_read=self.fast_read, single_buffer=self.single_buffer)
+                for dxl_id, _, _ in entries:
+                    group.addParam(dxl_id)
+            else:
+                group = GroupBulkRead(self.port, self.ph, fast_read=self.fast_read, single_buffer=self.single_buffer)
+                for dxl_id, address, data_length in entries:
+                    group.addParam(dxl_id, address, data_length)
+            self.plan.append((group, kind, entries))
+
+            for dxl_id, address, data_length in entries:
+                for request_address, request_length in [(key[1], self.reads[key]) for key in self.reads if key[0] == dxl_id]:
+                    if address <= request_address and request_address + request_length <= address + data_length:
+                        self.request_group[(dxl_id, request_address)] = group
+
+        unplanned_rounds = self.getUnplannedRounds()
+        self.unplanned_length = sum(self.getRoundLength(entries, "bulk") for entries in unplanned_rounds)
+        self.unplanned_count = len(unplanned_rounds)
+
+    def txRxPacket(self):
+        self.last_result = False
+
+        if not self.reads:
+            return COMM_NOT_AVAILABLE
+
+        if self.plan_key != tuple(sorted((key[0], key[1], self.reads[key]) for key in self.reads)):
+            self.makePlan()
+
+        result = COMM_SUCCESS
+        for group, _, _ in self.plan:
+            group_result = group.txRxPacket()
+            if group_result != COMM_SUCCESS:
+                result = group_result
+
+        self.last_result = result == COMM_SUCCESS
+        return result
+
+    def isAvailable(self, dxl_id, address, data_length):
+        group = self.request_group.get((dxl_id, address))
+        if group is None:
+            return False
+
+        return group.isAvailable(dxl_id, address, data_length)
+
+    def getData(self, dxl_id, address, data_length):
+        group = self.request_group.get((dxl_id, address))
+        if group is None:
+            return 0
+
+        return group.getData(dxl_id, address, data_length)
+
+    def getReport(self):
+        # bytes and bus time per tick with the current plan, compared to one Bulk Read per round of the requests as they are
+        transaction_ms = self.getTransactionTime()
+        byte_ms = self.getByteTime()
+        return {
+            "packets": [(("fast " if self.fast_read else "") + kind, len(entries)) for _, kind, entries in self.plan],
+            "bytes_per_tick": self.plan_length,
+            "unplanned_bytes_per_tick": self.unplanned_length,
+            "ms_per_tick": self.plan_length * byte_ms + len(self.plan) * transaction_ms,
+            "unplanned_ms_per_tick": self.unplanned_length * byte_ms + self.unplanned_count * transaction_ms,
+        }
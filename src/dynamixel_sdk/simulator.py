@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Simulated Protocol 2.0 bus on a pseudo-terminal, for running without a U2D2
+#
+#   python -m dynamixel_sdk.simulator --servos 1-4:XL-320 --baudrate 57600
+#   DXL_DEVICENAME=/dev/pts/N python 2v2.py
+
+import argparse
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+from .robotis_def import *
+from .crc16 import updateCRC
+from .bus_capacity import parseServos
+from .protocol2_packet_handler import ERRNUM_INSTRUCTION, ERRNUM_DATA_LENGTH, ERRNUM_ACCESS
+
+INSTRUCTION_HEADER = b'\xff\xff\xfd\x00'
+X_SERIES_TABLE_SIZE = 256  # up to the end of indirect data 28
+DEFAULT_RETURN_DELAY = 250  # Return Delay Time in 2 us units
+READ_ONLY_ITEMS = ('MODEL_NUMBER', 'MODEL_INFORMATION', 'FIRMWARE_VERSION')
+
+# initial values of items when the model has them
+DEFAULT_VALUES = {
+    'FIRMWARE_VERSION': 46,
+    'RETURN_DELAY_TIME': DEFAULT_RETURN_DELAY,
+    'STATUS_RETURN_LEVEL': 2,
+    'MAX_VOLTAGE_LIMIT': 140,
+    'MIN_VOLTAGE_LIMIT': 60,
+    'TEMPERATURE_LIMIT': 80,
+    'PRESENT_VOLTAGE': 74,
+    'PRESENT_INPUT_VOLTAGE': 120,
+    'PRESENT_TEMPERATURE': 35,
+}
+
+
+def stuff(data):
+    # FF FF FD -> FF FF FD FD
+    return bytes(data).replace(b'\xff\xff\xfd', b'\xff\xff\xfd\xfd')
+
+
+def unstuff(data):
+    return bytes(data).replace(b'\xff\xff\xfd\xfd', b'\xff\xff\xfd')
+
+
+def makeStatusPacket(dxl_id, error, params=b''):
+    body = stuff(bytes([INST_STATUS, error]) + bytes(params))
+    length = len(body) + 2  # CRC16_L CRC16_H
+    packet = bytearray(INSTRUCTION_HEADER + bytes([dxl_id, DXL_LOBYTE(length), DXL_HIBYTE(length)]) + body)
+    crc = updateCRC(0, packet, len(packet))
+    packet += bytes([DXL_LOBYTE(crc), DXL_HIBYTE(crc)])
+    return bytes(packet)
+
+
+def makeFastStatusPacket(blocks):
+    # combined Fast Sync/Bulk Read reply for [(dxl_id, error, data)], every block ends in the
+    # CRC of the packet so far. Not byte stuffed.
+    length = 1 + sum(len(data) + 4 for _, _, data in blocks)  # INST + per ID: ERROR ID DATA CRC16_L CRC16_H
+    packet = bytearray(INSTRUCTION_HEADER + bytes([BROADCAST_ID, DXL_LOBYTE(length), DXL_HIBYTE(length), INST_STATUS]))
+    for dxl_id, error, data in blocks:
+        packet += bytes([error, dxl_id]) + bytes(data)
+        crc = updateCRC(0, packet, len(packet))
+        packet += bytes([DXL_LOBYTE(crc), DXL_HIBYTE(crc)])
+    return bytes(packet)
+
+
+class SimulatedServo(object):
+    # Control table memory of one servo. A goal position write moves the present
+    # position there at once; indirect data reads and writes go through the
+    # indirect addresses on models that have them.
+    def __init__(self, dxl_id, control_table):
+        self.control_table = control_table
+        if control_table.hasItem('INDIRECT_DATA_1'):
+            size = X_SERIES_TABLE_SIZE
+        else:
+            size = max(item.address + item.size for item in control_table.items.values())
+        self.memory = bytearray(size)
+
+        self.setItem('MODEL_NUMBER', control_table.model_number)
+        for name, value in DEFAULT_VALUES.items():
+            self.setItem(name, value)
+        self.setItem('ID', dxl_id)
+
+        self.read_only = set()
+        for name in READ_ONLY_ITEMS:
+            item = control_table.getItem(name)
+            if item is not None:
+                self.read_only.update(range(item.address, item.address + item.size))
+
+        self.indirect_data = None
+        if control_table.hasItem('INDIRECT_DATA_1'):
+            start = control_table.INDIRECT_DATA_1.address
+            self.indirect_data = (start, start + 28)
+
+    def setItem(self, name, value):
+        item = self.control_table.getItem(name)
+        if item is not None:
+            self.memory[item.address: item.address + item.size] = item.encode(value)
+
+    def getItem(self, name):
+        item = self.control_table.getItem(name)
+        return item.decode(self.memory, item.address)
+
+    def getId(self):
+        return self.memory[self.control_table.ID.address]
+
+    def getReturnDelay(self):
+        return self.memory[self.control_table.RETURN_DELAY_TIME.address] * 2e-6
+
+    def getStatusReturnLevel(self):
+        return self.memory[self.control_table.STATUS_RETURN_LEVEL.address]
+
+    def resolve(self, address):
+        # indirect data byte -> the address it points at
+        if self.indirect_data is not None and self.indirect_data[0] <= address < self.indirect_data[1]:
+            index = address - self.indirect_data[0]
+            pointer = self.control_table.INDIRECT_ADDRESS_1.address + 2 * index
+            return DXL_MAKEWORD(self.memory[pointer], self.memory[pointer + 1])
+        return address
+
+    def read(self, address, length):
+        if address + length > len(self.memory):
+            return ERRNUM_DATA_LENGTH, bytes(length)
+        if self.indirect_data is None or address + length <= self.indirect_data[0] or address >= self.indirect_data[1]:
+            return 0, bytes(self.memory[address: address + length])
+        targets = [self.resolve(a) for a in range(address, address + length)]
+        return 0, bytes(self.memory[a] if a < len(self.memory) else 0 for a in targets)
+
+    def write(self, address, data):
+        if address + len(data) > len(self.memory):
+            return ERRNUM_DATA_LENGTH
+        targets = [self.resolve(a) for a in range(address, address + len(data))]
+        if any(a in self.read_only or a >= len(self.memory) for a in targets):
+            return ERRNUM_ACCESS
+        for a, value in zip(targets, data):
+            self.memory[a] = value
+
+        goal = self.control_table.GOAL_POSITION
+        if any(goal.address <= a < goal.address + goal.size for a in targets):
+            position = goal.decode(self.memory, goal.address)
+            self.memory[self.control_table.PRESENT_POSITION.address:
+                        self.control_table.PRESENT_POSITION.address + self.control_table.PRESENT_POSITION.size] = \
+                self.control_table.PRESENT_POSITION.encode(position)
+        return 0
+
+
+class BusSimulator(object):
+    # The servos share one pseudo-terminal; point PortHandler at port_name.
+    # Instruction packets take their wire time at `baudrate` before they are
+    # handled; every status packet is written after the servo's return delay
+    # (plus up to `jitter_us`) and its own wire time, so replies of a Sync/Bulk
+    # Read arrive one after the other as on a real bus.
+    def __init__(self, servos, baudrate=57600, jitter_us=0.0, seed=None):
+        # servos: {dxl_id: control table}
+        self.servos = dict((dxl_id, SimulatedServo(dxl_id, table)) for dxl_id, table in servos.items())
+        self.baudrate = baudrate
+        self.tx_time_per_byte = 10.0 / baudrate
+        self.jitter_us = jitter_us
+        self.random = random.Random(seed)
+
+        self.packets_received = 0
+        self.packets_corrupt = 0
+        self.bytes_sent = 0
+
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port_name = os.ttyname(self.slave_fd)
+
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def getServo(self, dxl_id):
+        for servo in self.servos.values():
+            if servo.getId() == dxl_id:
+                return servo
+        return None
+
+    def serve(self):
+        data = bytearray()
+        first_byte_time = 0.0
+        while self.running:
+            if not select.select([self.master_fd], [], [], 0.05)[0]:
+                continue
+            try:
+                chunk = os.read(self.master_fd, 1024)
+            except OSError:
+                return
+            if not data:
+                first_byte_time = time.perf_counter()
+            data += chunk
+
+            while True:
+                idx = data.find(INSTRUCTION_HEADER)
+                if idx < 0 or len(data) - idx < 7:
+                    break
+                del data[:idx]
+                length = DXL_MAKEWORD(data[5], data[6]) + 7
+                if length > 1024:  # not a packet header
+                    del data[:1]
+                    continue
+                if len(data) < length:
+                    break
+                packet = bytes(data[:length])
+                del data[:length]
+
+                # the packet is on the bus until its last byte
+                self.waitUntil(first_byte_time + length * self.tx_time_per_byte)
+                first_byte_time = time.perf_counter()
+                self.handle(packet)
+
+    def waitUntil(self, deadline):
+        delay = deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def reply(self, servo, packet, start):
+        # write packet once the servo's return delay and the packet's wire time are over
+        delay = servo.getReturnDelay()
+        if self.jitter_us:
+            delay += self.random.uniform(0, self.jitter_us) * 1e-6
+        end = start + delay + len(packet) * self.tx_time_per_byte
+        self.waitUntil(end)
+        os.write(self.master_fd, packet)
+        self.bytes_sent += len(packet)
+        return end
+
+    def handle(self, packet):
+        crc = updateCRC(0, packet, len(packet) - 2)
+        if crc != DXL_MAKEWORD(packet[-2], packet[-1]):
+            self.packets_corrupt += 1
+            return
+        self.packets_received += 1
+
+        dxl_id = packet[4]
+        instruction = packet[7]
+        params = unstuff(packet[8:-2])
+        now = time.perf_counter()
+
+        if instruction in (INST_SYNC_WRITE, INST_BULK_WRITE) and dxl_id == BROADCAST_ID:
+            self.groupWrite(instruction, params)
+        elif instruction in (INST_SYNC_READ, INST_BULK_READ, INST_FAST_SYNC_READ, INST_FAST_BULK_READ) and dxl_id == BROADCAST_ID:
+            self.groupRead(instruction, params, now)
+        elif instruction == INST_PING and dxl_id == BROADCAST_ID:
+            for servo in sorted(self.servos.values(), key=SimulatedServo.getId):
+                now = self.reply(servo, self.pingStatus(servo), now)
+        else:
+            servo = self.getServo(dxl_id)
+            if servo is None:
+                return
+            error, status_params = self.unicast(servo, instruction, params)
+            level = servo.getStatusReturnLevel()
+            if instruction == INST_PING or level >= 2 or (level == 1 and instruction == INST_READ):
+                self.reply(servo, makeStatusPacket(servo.getId(), error, status_params), now)
+
+    def pingStatus(self, servo):
+        model_number = servo.getItem('MODEL_NUMBER')
+        return makeStatusPacket(servo.getId(), 0, bytes([DXL_LOBYTE(model_number), DXL_HIBYTE(model_number),
+                                                         servo.getItem('FIRMWARE_VERSION')]))
+
+    def unicast(self, servo, instruction, params):
+        if instruction == INST_PING:
+            model_number = servo.getItem('MODEL_NUMBER')
+            return 0, bytes([DXL_LOBYTE(model_number), DXL_HIBYTE(model_number), servo.getItem('FIRMWARE_VERSION')])
+        if instruction == INST_READ and len(params) == 4:
+            return servo.read(DXL_MAKEWORD(params[0], params[1]), DXL_MAKEWORD(params[2], params[3]))
+        if instruction == INST_WRITE and len(params) >= 2:
+            return servo.write(DXL_MAKEWORD(params[0], params[1]), params[2:]), b''
+        return ERRNUM_INSTRUCTION, b''
+
+    def groupWrite(self, instruction, params):
+        if instruction == INST_SYNC_WRITE:
+            address = DXL_MAKEWORD(params[0], params[1])
+            data_length = DXL_MAKEWORD(params[2], params[3])
+            for i in range(4, len(params) - data_length, 1 + data_length):
+                servo = self.getServo(params[i])
+                if servo is not None:
+                    servo.write(address, params[i + 1: i + 1 + data_length])
+        else:
+            i = 0
+            while i + 5 <= len(params):
+                data_length = DXL_MAKEWORD(params[i + 3], params[i + 4])
+                servo = self.getServo(params[i])
+                if servo is not None:
+                    servo.write(DXL_MAKEWORD(params[i + 1], params[i + 2]), params[i + 5: i + 5 + data_length])
+                i += 5 + data_length
+
+    def groupRead(self, instruction, params, now):
+        # [(dxl_id, address, data_length)] in reply order
+        if instruction in (INST_SYNC_READ, INST_FAST_SYNC_READ):
+            address = DXL_MAKEWORD(params[0], params[1])
+            data_length = DXL_MAKEWORD(params[2], params[3])
+            requests = [(dxl_id, address, data_length) for dxl_id in params[4:]]
+        else:
+            requests = [(params[i], DXL_MAKEWORD(params[i + 1], params[i + 2]), DXL_MAKEWORD(params[i + 3], params[i + 4]))
+                        for i in range(0, len(params) - 4, 5)]
+
+        replies = []
+        for dxl_id, address, data_length in requests:
+            servo = self.getServo(dxl_id)
+            if servo is None:
+                break  # every servo waits for the one before it: a missing servo ends the chain
+            error, data = servo.read(address, data_length)
+            replies.append((servo, error, data))
+
+        if instruction in (INST_FAST_SYNC_READ, INST_FAST_BULK_READ):
+            # models without Fast Sync/Bulk Read ignore the broadcast
+            if not replies or len(replies) != len(requests) or not all(servo.control_table.fast_read for servo, _, _ in replies):
+                return
+            packet = makeFastStatusPacket([(servo.getId(), error, data) for servo, error, data in replies])
+            self.reply(replies[0][0], packet, now)
+            return
+
+        for servo, error, data in replies:
+            now = self.reply(servo, makeStatusPacket(servo.getId(), error, data), now)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated Dynamixel Protocol 2.0 bus on a pseudo-terminal")
+    parser.add_argument("--servos", required=True, help="IDs and model, e.g. 0-3:XL-320,4:XM430-W350")
+    parser.add_argument("--baudrate", type=int, default=57600)
+    parser.add_argument("--jitter-us", type=float, default=0.0, help="extra return delay, uniform from 0")
+    args = parser.parse_args(argv)
+
+    try:
+        servos = parseServos(args.servos)
+    except ValueError as e:
+        parser.error(str(e))
+
+    simulator = BusSimulator(servos, baudrate=args.baudrate, jitter_us=args.jitter_us).start()
+    print("%s  (DXL_DEVICENAME=%s)" % (simulator.port_name, simulator.port_name), flush=True)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.close()
+
+
+if __name__ == "__main__":
+    main()
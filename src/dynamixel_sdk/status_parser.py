@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Streaming Protocol 2.0 status packet parser over a fixed receive buffer
+
+from .robotis_def import *
+from .crc16 import updateCRC
+
+STATUS_HEADER = b'\xff\xff\xfd'
+STUFFED_HEADER = b'\xff\xff\xfd\xfd'
+STATUS_MIN_LENGTH = 11  # HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H INST ERROR CRC16_L CRC16_H
+STATUS_FIELDS_LENGTH = 8  # bytes needed to validate a header: up to and including INST
+STATUS_MAX_LENGTH = 1024  # same as RXPACKET_MAX_LEN
+RX_BUFFER_SIZE = 4 * 1024
+
+
+class StatusPacketParser(object):
+    # Bytes are appended at `tail` and consumed from `head`. When the free space
+    # behind `tail` gets smaller than one maximum-size packet, the unread bytes
+    # are moved back to the front, so the buffer never grows and a packet is
+    # always contiguous. Bytes after the current packet stay for the next call.
+    #
+    # nextPacket() returns a memoryview into the buffer. It is only valid until
+    # the next call that reads into or consumes from this parser.
+    def __init__(self, buffer_size=RX_BUFFER_SIZE):
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.buffer_size = buffer_size
+        self.head = 0
+        self.tail = 0
+
+        # 0 while searching for a header, else the length of the packet at head
+        self.packet_length = 0
+
+        # running CRC of the packet at head
+        self.crc_accum = 0
+        self.crc_length = 0
+
+        # Fast Sync/Bulk Read replies come from the broadcast ID
+        self.accept_broadcast = False
+        self.last_packet_stuffed = False
+
+        self.bytes_discarded = 0
+
+    def clear(self):
+        self.head = 0
+        self.tail = 0
+        self.packet_length = 0
+        self.crc_accum = 0
+        self.crc_length = 0
+
+    def getBytesAvailable(self):
+        return self.tail - self.head
+
+    def getFreeSpace(self):
+        return self.buffer_size - self.tail
+
+    def compact(self):
+        if self.head == self.tail:
+            self.head = 0
+            self.tail = 0
+        elif self.head > 0:
+            length = self.tail - self.head
+            self.buffer[0: length] = self.buffer[self.head: self.tail]
+            self.head = 0
+            self.tail = length
+
+    def feed(self, data):
+        length = len(data)
+        if length > self.getFreeSpace():
+            self.compact()
+
+        if length > self.buffer_size:
+            # overrun: keep only the newest bytes
+            self.bytes_discarded += length - self.buffer_size
+            data = data[length - self.buffer_size:]
+            length = len(data)
+
+        if length > self.getFreeSpace():
+            self.skip(length - self.getFreeSpace())
+            self.compact()
+
+        self.buffer[self.tail: self.tail + length] = data
+        self.tail += length
+        return length
+
+    def readFrom(self, port, length=None, wait_length=0):
+        # read up to `length` bytes from the port straight into the free space,
+        # a blocking port waits for `wait_length` of them
+        if self.head == self.tail or (self.head > 0 and self.buffer_size - self.tail < STATUS_MAX_LENGTH):
+            self.compact()
+
+        tail = self.tail
+        free = self.buffer_size - tail
+        if length is None or length > free:
+            length = free
+        if length <= 0:
+            return 0
+
+        read_into = getattr(port, "readPortInto", None)
+        if read_into is not None:
+            read_length = read_into(self.view[tail: tail + length], min(wait_length, length))
+        else:
+            # a port without readPortInto
+            data = port.readPort(length)
+            read_length = len(data)
+            self.view[tail: tail + read_length] = bytes(data)
+
+        self.tail = tail + read_length
+        return read_length
+
+    def getBytesMissing(self):
+        # bytes still needed to complete the packet at head (or a minimum header)
+        return max(self.getWaitLength() - (self.tail - self.head), 1)
+
+    def skip(self, length):
+        self.head += length
+        self.bytes_discarded += length
+        self.packet_length = 0
+        self.crc_accum = 0
+        self.crc_length = 0
+
+    def getWaitLength(self):
+        # total length of the packet at head once its header has been validated
+        if self.packet_length:
+            return self.packet_length
+        return STATUS_MIN_LENGTH
+
+    def nextPacket(self):
+        buf = self.buffer
+
+        while True:
+            head = self.head
+            tail = self.tail
+            packet_length = self.packet_length
+
+            if packet_length == 0:
+                # state 1: looking for a status packet header
+                available = tail - head
+                if available < STATUS_FIELDS_LENGTH:
+                    return None, COMM_RX_WAITING
+
+                idx = buf.find(STATUS_HEADER, head, tail)
+                if idx < 0:
+                    # keep a possible partial header (FF or FF FF) at the end
+                    keep = 2 if buf[tail - 1] == 0xFF else 0
+                    if keep and buf[tail - 2] != 0xFF:
+                        keep = 1
+                    self.skip(available - keep)
+                    return None, COMM_RX_WAITING
+
+                if idx != head:
+                    # remove unnecessary bytes before the header
+                    self.skip(idx - head)
+                    continue
+
+                packet_id = buf[head + 4]
+                packet_length = DXL_MAKEWORD(buf[head + 5], buf[head + 6]) + 7
+                if (buf[head + 3] != 0x00) or (packet_id > MAX_ID and not (self.accept_broadcast and packet_id == BROADCAST_ID)) or (
+                        packet_length > STATUS_MAX_LENGTH) or (packet_length < STATUS_MIN_LENGTH) or (buf[head + 7] != INST_STATUS):
+                    # not a status packet header: drop the first byte and search again
+                    self.skip(1)
+                    continue
+
+                self.packet_length = packet_length
+
+            # state 2: collecting the packet body, CRC the bytes received so far
+            crc_end = head + packet_length - 2
+            if crc_end > tail:
+                crc_end = tail
+            if crc_end > head + self.crc_length:
+                self.crc_accum = updateCRC(self.crc_accum, buf, crc_end - head - self.crc_length, head + self.crc_length)
+                self.crc_length = crc_end - head
+
+            if tail - head < packet_length:
+                if packet_length > self.buffer_size - head:
+                    self.compact()
+                return None, COMM_RX_WAITING
+
+            crc = DXL_MAKEWORD(buf[head + packet_length - 2], buf[head + packet_length - 1])
+            if self.crc_accum != crc:
+                # corrupt: resync one byte further so a real packet inside is not lost
+                self.skip(1)
+                return None, COMM_RX_CORRUPT
+
+            self.last_packet_stuffed = buf.find(STUFFED_HEADER, head + 4, head + packet_length - 2) >= 0
+            self.head = head + packet_length
+            self.packet_length = 0
+            self.crc_accum = 0
+            self.crc_length = 0
+            return self.view[head: head + packet_length], COMM_SUCCESS
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+################################################################################
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+# Sends a set of register writes as the Sync/Bulk Write packets with the fewest bytes
+
+from itertools import combinations
+
+from .robotis_def import *
+from .group_sync_write import GroupSyncWrite
+from .group_bulk_write import GroupBulkWrite
+
+MAX_PLANNED_SYNC_GROUPS = 10  # (address, length) groups tried exhaustively, more are decided one by one
+
+
+# Protocol 2.0 instruction packet sizes in bytes (no byte stuffing)
+def syncWriteLength(servo_count, data_length):
+    # HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST ADDR_L ADDR_H DATA_LEN_L DATA_LEN_H [ID DATA] CRC16_L CRC16_H
+    return 14 + servo_count * (1 + data_length)
+
+
+def bulkWriteLength(data_lengths):
+    # HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST [ID ADDR_L ADDR_H LEN_L LEN_H DATA] CRC16_L CRC16_H
+    return 10 + sum(5 + data_length for data_length in data_lengths)
+
+
+def writeLength(data_length):
+    # HEADER0 HEADER1 HEADER2 RESERVED ID LEN_L LEN_H INST ADDR_L ADDR_H DATA CRC16_L CRC16_H
+    return 12 + data_length
+
+
+def valueToBytes(value, data_length):
+    # little endian register value, lists and bytes are taken as they are
+    if isinstance(value, int):
+        return [(value >> (8 * i)) & 0xFF for i in range(0, data_length)]
+    return value
+
+
+class WritePlanner(object):
+    # Collects (ID, address, value) writes for one control tick. Writes sharing an
+    # address and length become a Sync Write when that is smaller than carrying them
+    # in a Bulk Write; the rest go into Bulk Writes (each ID once per packet).
+    # Unicast writes are never planned: every one of them would be answered by a
+    # status packet on the half-duplex bus.
+    #
+    # The plan and its group objects are kept while the set of (ID, address, length)
+    # stays the same, later ticks only patch the data bytes in place.
+    def __init__(self, port, ph):
+        self.port = port
+        self.ph = ph
+
+        self.writes = {}  # (dxl_id, address) -> [data_length, data]
+
+        self.plan_key = None
+        self.plan = []  # [(group, [(dxl_id, address), ..])]
+        self.plan_length = 0
+        self.bulk_length = 0
+
+        self.tick_count = 0
+        self.total_length = 0
+        self.total_bulk_length = 0
+
+    def addWrite(self, dxl_id, address, data_length, value):
+        data = valueToBytes(value, data_length)
+        if len(data) > data_length:  # input data is longer than set
+            return False
+
+        self.writes[(dxl_id, address)] = [data_length, data]
+        return True
+
+    def removeWrite(self, dxl_id, address):
+        self.writes.pop((dxl_id, address), None)
+
+    def clearWrites(self):
+        self.writes.clear()
+
+    def makePlan(self):
+        self.plan_key = tuple((key[0], key[1], self.writes[key][0]) for key in self.writes)
+        self.plan = []
+
+        if not self.writes:
+            self.plan_length = 0
+            self.bulk_length = 0
+            return
+
+        # writes sharing (address, length), in the order they were added
+        shared = {}
+        for dxl_id, address, data_length in self.plan_key:
+            shared.setdefault((address, data_length), []).append(dxl_id)
+
+        self.bulk_length = self.getBulkLength(self.plan_key)
+
+        if self.ph.getProtocolVersion() == 1.0:
+            sync_keys = list(shared)  # no Bulk Write in Protocol 1.0
+        else:
+            sync_keys = self.chooseSyncGroups(shared)
+
+        rest = [key for key in self.plan_key if (key[1], key[2]) not in sync_keys]
+        self.plan_length = sum(syncWriteLength(len(shared[key]), key[1]) for key in sync_keys)
+        self.plan_length += self.getBulkLength(rest) if rest else 0
+
+        for address, data_length in sync_keys:
+            group = GroupSyncWrite(self.port, self.ph, address, data_length)
+            for dxl_id in shared[(address, data_length)]:
+                group.addParam(dxl_id, self.writes[(dxl_id, address)][1])
+            self.plan.append((group, [(dxl_id, address) for dxl_id in shared[(address, data_length)]]))
+
+        # one Bulk Write per round of distinct IDs
+        while rest:
+            group = GroupBulkWrite(self.port, self.ph)
+            keys = []
+            left = []
+            for dxl_id, address, data_length in rest:
+                if group.addParam(dxl_id, address, data_length, self.writes[(dxl_id, address)][1]):
+                    keys.append((dxl_id, address))
+                else:
+                    left.append((dxl_id, address, data_length))
+            self.plan.append((group, keys))
+            rest = left
+
+    def chooseSyncGroups(self, shared):
+        # the subset of shared (address, length) groups to send as Sync Writes that
+        # gives the fewest bytes, everything else rides in Bulk Writes
+        candidates = [key for key in shared if len(shared[key]) > 1]  # one ID is never smaller as a Sync Write
+
+        def planLength(sync_keys):
+            rest = [(dxl_id, key[0], key[1]) for key in shared if key not in sync_keys for dxl_id in shared[key]]
+            length = sum(syncWriteLength(len(shared[key]), key[1]) for key in sync_keys)
+            return length + (self.getBulkLength(rest) if rest else 0)
+
+        if len(candidates) <= MAX_PLANNED_SYNC_GROUPS:
+            best = min((subset for size in range(0, len(candidates) + 1) for subset in combinations(candidates, size)),
+                       key=planLength)
+            return list(best)
+
+        # many groups: a group is sent as a Sync Write when that is smaller than its share of a Bulk Write
+        return [key for key in candidates
+                if syncWriteLength(len(shared[key]), key[1]) < len(shared[key]) * (5 + key[1])]
+
+    def getBulkLength(self, keys):
+        # bytes of the Bulk Writes needed for (dxl_id, address, data_length) keys
+        rounds = {}
+        for dxl_id, _, data_length in keys:
+            rounds[dxl_id] = rounds.get(dxl_id, 0) + 1
+        packets = max(rounds.values())
+        return 10 * packets + sum(5 + data_length for _, _, data_length in keys)
+
+    def txPacket(self):
+        if not self.writes:
+            return COMM_NOT_AVAILABLE
+
+        if self.plan_key != tuple((key[0], key[1], self.writes[key][0]) for key in self.writes):
+            self.makePlan()
+        else:
+            for group, keys in self.plan:
+                for dxl_id, address in keys:
+                    data_length, data = self.writes[(dxl_id, address)]
+                    if isinstance(group, GroupSyncWrite):
+                        group.changeParam(dxl_id, data)
+                    else:
+                        group.changeParam(dxl_id, address, data_length, data)
+
+        self.tick_count += 1
+        self.total_length += self.plan_length
+        self.total_bulk_length += self.bulk_length
+
+        result = COMM_SUCCESS
+        for group, _ in self.plan:
+            group_result = group.txPacket()
+            if group_result != COMM_SUCCESS:
+                result = group_result
+
+        return result
+
+    def getReport(self):
+        # bytes on the wire per tick with the current plan, compared to a single Bulk Write
+        tx_time_per_byte = (1000.0 / self.port.getBaudRate()) * 10.0
+        return {
+            "packets": [("sync" if isinstance(group, GroupSyncWrite) else "bulk", len(keys)) for group, keys in self.plan],
+            "bytes_per_tick": self.plan_length,
+            "bulk_bytes_per_tick": self.bulk_length,
+            "saved_bytes_per_tick": self.bulk_length - self.plan_length,
+            "ms_per_tick": self.plan_length * tx_time_per_byte,
+            "saved_ms_per_tick": (self.bulk_length - self.plan_length) * tx_time_per_byte,
+            "ticks": self.tick_count,
+            "total_bytes": self.total_length,
+            "total_saved_bytes": self.total_bulk_length - self.total_length,
+        }
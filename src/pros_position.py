@@ -9,9 +9,10 @@ import pygame.midi
 import keyboard
 import time
 
-fd = sys.stdin.fileno()
-old_settings = termios.tcgetattr(fd)
 def getch():
+    # terminal settings are read here, so the script also imports without a terminal (benchmarks)
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
     try:
         tty.setraw(sys.stdin.fileno())
         ch = sys.stdin.read(1)
@@ -20,9 +21,12 @@ def getch():
     return ch
 
 from dynamixel_sdk import *                    # Uses Dynamixel SDK library
+from control_loop import ControlLoop, DEFAULT_LOOP_RATE
+from rate_control import rateControlFromEnvironment
+from threaded_io import midiReaderFromEnvironment
 
 class Model_Q:
-    def __init__(self): 
+    def __init__(self, midi_input=None): 
         self.move_to = False
         self.just_switched = False
         self.mode = True # True is main, false is individual control
@@ -43,13 +47,15 @@ class Model_Q:
 
         
         pygame.midi.init()
-        self.ADDR_TORQUE_ENABLE          = 24
-        self.ADDR_LED_RED                = 65
-        self.LEN_LED_RED                 = 1         # Data Byte Length
-        self.ADDR_GOAL_POSITION          = 30
-        self.LEN_GOAL_POSITION           = 4         # Data Byte Length
-        self.ADDR_PRESENT_POSITION       = 37
-        self.LEN_PRESENT_POSITION        = 4         # Data Byte Length
+        # Register addresses and byte lengths come from the XL-320 control table
+        self.control_table               = getControlTable(XL320)
+        self.ADDR_TORQUE_ENABLE          = self.control_table.TORQUE_ENABLE.address
+        self.ADDR_LED_RED                = self.control_table.LED.address
+        self.LEN_LED_RED                 = self.control_table.LED.size              # Data Byte Length
+        self.ADDR_GOAL_POSITION          = self.control_table.GOAL_POSITION.address
+        self.LEN_GOAL_POSITION           = self.control_table.GOAL_POSITION.size    # Data Byte Length
+        self.ADDR_PRESENT_POSITION       = self.control_table.PRESENT_POSITION.address
+        self.LEN_PRESENT_POSITION        = self.control_table.PRESENT_POSITION.size # Data Byte Length
         #self.DXL_MINIMUM_POSITION_VALUE  = 0         # Refer to the Minimum Position Limit of product eManual
         #self.DXL_MAXIMUM_POSITION_VALUE  = 4095      # Refer to the Maximum Position Limit of product eManual
         self.BAUDRATE                    = 57600
@@ -66,7 +72,7 @@ class Model_Q:
         self.DXL5_ID                     = 5                 # Dynamixel#1 ID : 5
         
         # Verify this!!
-        self.DEVICENAME                  = '/dev/ttyUSB0'
+        self.DEVICENAME                  = os.environ.get('DXL_DEVICENAME', '/dev/ttyUSB0')    # DXL_DEVICENAME: e.g. the pty of dynamixel_sdk.simulator
 
         self.TORQUE_ENABLE               = 1                 # Value for enabling the torque
         self.TORQUE_DISABLE              = 0                 # Value for disabling the torque
@@ -86,6 +92,14 @@ class Model_Q:
         self.control_val_4 = 63 
         self.control_val_5 = 63
 
+        # Fader speeds integrated over time (DXL_RATE_MODE, see rate_control.py), None keeps linear_map_val per pass;
+        # joints in RATE_MOTORS order, gains in counts per fader step and pass as in linear_map_val
+        self.RATE_MOTORS = [1, 2, 3, 4, 5]
+        self.rate_control = rateControlFromEnvironment([1/5.0, -1/5.0, 1/5.0, 1/5.0, 1/5.0], [-1/5.0, 1/5.0, -1/5.0, -1/5.0, -1/5.0],
+                                                       [self.dy_1_limits[0], self.dy_2_limits[0], self.dy_3_limits[0], self.dy_4_limits[0], self.dy_5_limits[0]],
+                                                       [self.dy_1_limits[1], self.dy_2_limits[1], self.dy_3_limits[1], self.dy_4_limits[1], self.dy_5_limits[1]])
+        self.event_time = None  # pygame.midi timestamp (sec) of the event being mapped
+
         # Initialize PortHandler instance
         # Set the port path
         # Get methods and members of PortHandlerLinux or PortHandlerWindows
@@ -96,8 +110,8 @@ class Model_Q:
         # Get methods and members of Protocol1PacketHandler or Protocol2PacketHandler
         self.packetHandler = PacketHandler(self.PROTOCOL_VERSION)
 
-        # Initialize GroupBulkWrite instance
-        self.groupBulkWrite = GroupBulkWrite(self.portHandler, self.packetHandler)
+        # Initialize WritePlanner instance, sends the goal positions as the smallest Sync/Bulk Write
+        self.writePlanner = WritePlanner(self.portHandler, self.packetHandler)
 
         # Initialize GroupBulkRead instace for Present Position
         self.groupBulkRead = GroupBulkRead(self.portHandler, self.packetHandler)
@@ -119,27 +133,37 @@ class Model_Q:
             print("Press any key to terminate...")
             getch()
             quit()
+
+        # Shorten the USB-serial latency timer, status packets wait up to 16 ms in the adapter otherwise
+        if self.portHandler.setLowLatency():
+            print("Succeeded to set low latency (latency timer: %d ms)" % self.portHandler.getLatencyTimer())
+        else:
+            print("Failed to set low latency (latency timer: %d ms)" % self.portHandler.getLatencyTimer())
 	
 	    
-        devices = pygame.midi.get_count()
-
-        if devices<1:
-            print("No MIDI devices detected")
-            exit(-1)
-        print("Found %d MIDI devices" % devices)
-		
-        id = 3 # 3 for linux, 1 for windows
-
-        if id is not None:
-            input_dev = id
+        if midi_input is not None:
+            # MIDI events from the caller, e.g. a replay in benchmarks.bench_model_q
+            self.controller = midi_input
         else:
-            input_dev = pygame.midi.get_default_input_id()
-            if input_dev==-1:
-                print("No default MIDI input device")
+            devices = pygame.midi.get_count()
+
+            if devices<1:
+                print("No MIDI devices detected")
                 exit(-1)
-        print("Using input device %d" % input_dev)
+            print("Found %d MIDI devices" % devices)
+		
+            id = 3 # 3 for linux, 1 for windows
+
+            if id is not None:
+                input_dev = id
+            else:
+                input_dev = pygame.midi.get_default_input_id()
+                if input_dev==-1:
+                    print("No default MIDI input device")
+                    exit(-1)
+            print("Using input device %d" % input_dev)
 		
-        self.controller = pygame.midi.Input(input_dev)
+            self.controller = pygame.midi.Input(input_dev)
 
         # Enable Dynamixel#4 Torque
         dxl_comm_result, dxl_error = self.packetHandler.write1ByteTxRx(self.portHandler, self.DXL4_ID, self.ADDR_TORQUE_ENABLE, self.TORQUE_ENABLE)
@@ -224,52 +248,49 @@ class Model_Q:
     def model_q_run(self):
 
         # Allocate goal position value into byte array
-        param_goal_position4 = [DXL_LOBYTE(DXL_LOWORD(self.dxl4_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl4_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl4_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl4_goal_position))]
-        param_goal_position = [DXL_LOBYTE(DXL_LOWORD(self.dxl_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl_goal_position))]
-        param_goal_position2 = [DXL_LOBYTE(DXL_LOWORD(self.dxl2_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl2_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl2_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl2_goal_position))]
-        param_goal_position3 = [DXL_LOBYTE(DXL_LOWORD(self.dxl3_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl3_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl3_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl3_goal_position))]
-        param_goal_position5 = [DXL_LOBYTE(DXL_LOWORD(self.dxl5_goal_position)), DXL_HIBYTE(DXL_LOWORD(self.dxl5_goal_position)), DXL_LOBYTE(DXL_HIWORD(self.dxl5_goal_position)), DXL_HIBYTE(DXL_HIWORD(self.dxl5_goal_position))]
+        param_goal_position4 = self.control_table.GOAL_POSITION.encode(int(self.dxl4_goal_position))
+        param_goal_position = self.control_table.GOAL_POSITION.encode(int(self.dxl_goal_position))
+        param_goal_position2 = self.control_table.GOAL_POSITION.encode(int(self.dxl2_goal_position))
+        param_goal_position3 = self.control_table.GOAL_POSITION.encode(int(self.dxl3_goal_position))
+        param_goal_position5 = self.control_table.GOAL_POSITION.encode(int(self.dxl5_goal_position))
         
-        # Add Dynamixel#0 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL4_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position4)
+        # Add Dynamixel#0 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL4_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position4)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL4_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL4_ID)
             quit()
         
-        # Add Dynamixel#1 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL1_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position)
+        # Add Dynamixel#1 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL1_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL1_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL1_ID)
             quit()
 
-        # Add Dynamixel#2 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL2_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position2)
+        # Add Dynamixel#2 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL2_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position2)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL2_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL2_ID)
             quit()
 
-        # Add Dynamixel#3 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL3_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position3)
+        # Add Dynamixel#3 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL3_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position3)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL3_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL3_ID)
             quit()
 
-        # Add Dynamixel#5 goal position value to the Bulkwrite parameter storage
-        dxl_addparam_result = self.groupBulkWrite.addParam(self.DXL5_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position5)
+        # Add Dynamixel#5 goal position value to the write planner
+        dxl_addparam_result = self.writePlanner.addWrite(self.DXL5_ID, self.ADDR_GOAL_POSITION, self.LEN_GOAL_POSITION, param_goal_position5)
         if dxl_addparam_result != True:
-            print("[ID:%03d] groupBulkWrite addparam failed" % self.DXL5_ID)
+            print("[ID:%03d] writePlanner addwrite failed" % self.DXL5_ID)
             quit()
         
     
         
-        # Bulkwrite goal position and LED value
-        dxl_comm_result = self.groupBulkWrite.txPacket()
+        # Write goal positions (one Sync Write, as every servo shares the goal position address)
+        dxl_comm_result = self.writePlanner.txPacket()
         if dxl_comm_result != COMM_SUCCESS:
             print("%s" % self.packetHandler.getTxRxResult(dxl_comm_result))
 
-        # Clear bulkwrite parameter storage
-        self.groupBulkWrite.clearParam()
-
         """ while 1:
             # Bulkread present position and LED status
             dxl_comm_result = groupBulkRead.txRxPacket()
@@ -351,6 +372,7 @@ class Model_Q:
                 for event in data:
                     
                     control = event[0]
+                    self.event_time = event[1] / 1000.0
                     if (control[0] & 0xF0) == 176:
                         control_id = control[1] | ((control[0] & 0x0F) << 8)
                         control_val = control[2]
@@ -398,12 +420,18 @@ class Model_Q:
                             elif (control_id==0):
                                self.map_val(control_val,1)
 
+        self.event_time = None
         if (self.mode):
             self.linear_map_val(self.control_val_1,1)
             self.linear_map_val(self.control_val_2,2)
             self.linear_map_val(self.control_val_3,3)
             self.linear_map_val(self.control_val_4,4)
             self.linear_map_val(self.control_val_5,5)
+            if (self.rate_control is not None):
+                self.rate_map_vals()
+        elif (self.rate_control is not None):
+            # individual control: the faders set positions, the speeds start over in main mode
+            self.rate_control.reset()
 
 
 
@@ -412,6 +440,11 @@ class Model_Q:
     def end_program(self):
         ###### This code runs upon exit ######
 
+        # Bytes on the wire per tick for the goal positions
+        report = self.writePlanner.getReport()
+        print("Goal position writes: %d bytes/tick (%.2f ms), %d bytes/tick saved over Bulk Write" % (
+            report["bytes_per_tick"], report["ms_per_tick"], report["saved_bytes_per_tick"]))
+
         # Clear bulkread parameter storage
         self.groupBulkRead.clearParam()
 
@@ -422,7 +455,7 @@ class Model_Q:
         elif dxl_error != 0:
             print("%s" % self.packetHandler.getRxPacketError(dxl_error))
 
-        # Disable Dynamixel#1 Torque        # Add Dynamixel#3 goal position value to the Bulkwrite parameter storage
+        # Disable Dynamixel#1 Torque        # Add Dynamixel#3 goal position value to the write planner
         dxl_comm_result, dxl_error = self.packetHandler.write1ByteTxRx(self.portHandler, self.DXL1_ID, self.ADDR_TORQUE_ENABLE, self.TORQUE_DISABLE)
         if dxl_comm_result != COMM_SUCCESS:
             print("%s" % self.packetHandler.getTxRxResult(dxl_comm_result))
@@ -480,8 +513,17 @@ class Model_Q:
             #print(self.dxl3_goal_position)
 
 
+    def rate_map_vals(self):
+        # move the goal positions by the fader speeds since the last pass
+        self.dxl_goal_position, self.dxl2_goal_position, self.dxl3_goal_position, self.dxl4_goal_position, self.dxl5_goal_position = self.rate_control.update([self.dxl_goal_position, self.dxl2_goal_position, self.dxl3_goal_position, self.dxl4_goal_position, self.dxl5_goal_position])
+        self.move_to = True
+
     def linear_map_val(self, input_val, motor_id):
         self.move_to = True
+        if (self.rate_control is not None):
+            # the fader only sets the speed here, rate_map_vals() moves the joint
+            self.rate_control.setFader(self.RATE_MOTORS.index(motor_id), input_val, self.event_time)
+            return
         #print('motor: ',motor_id,' input: ',input_val)
         if (input_val < 50):
             if (motor_id==1):
@@ -532,13 +574,37 @@ class Model_Q:
 
 if __name__== "__main__":
     obj_model_q = Model_Q()
+
+    # DXL_PROFILE=1 times each stage of every tick, the histograms are printed on SIGUSR1 (kill -USR1 <pid>) and at exit
+    profiler = profilerFromEnvironment()
+    if profiler is not None:
+        profiler.instrument(obj_model_q.packetHandler, obj_model_q.portHandler)
+        profiler.wrap(obj_model_q.controller, "read", STAGE_MIDI_READ)
+        profiler.wrap(obj_model_q, "_poll", STAGE_MAPPING)
+        profiler.wrap(obj_model_q, "model_q_run", STAGE_ENCODE)
+
+    # DXL_THREADED=1 reads MIDI on its own thread into a latest-value mailbox, the loop below only maps and writes
+    midi_reader = midiReaderFromEnvironment(obj_model_q)
+
+    # Fixed loop rate, so the fingers move at the same speed on any computer (DXL_LOOP_RATE=0: unpaced)
+    loop = ControlLoop(float(os.environ.get('DXL_LOOP_RATE', DEFAULT_LOOP_RATE)))
     try:
         while(True):
+            loop.waitNextTick()
+            if profiler is not None:
+                profiler.beginTick()
             obj_model_q._poll()
             if (obj_model_q.move_to == True):
                 obj_model_q.model_q_run()
                 obj_model_q.move_to = False
+            if profiler is not None:
+                profiler.endTick()
     except KeyboardInterrupt:
         print('PortMidi: Bad Pointer is a known error, just ignore it :(')
         obj_model_q.end_program()
+    finally:
+        if midi_reader is not None:
+            midi_reader.stop()
+    print("Control loop: " + "  ".join("%s=%s" % (key, ("%.2f" % value) if isinstance(value, float) else value)
+                                       for key, value in loop.getReport().items()))
     obj_model_q.end_program()
\ No newline at end of file
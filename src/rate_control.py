@@ -0,0 +1,119 @@
+# Fader rate control for the hand scripts: fader positions set joint velocities,
+# integrated over elapsed time instead of once per loop pass
+#
+# DXL_RATE_MODE selects how:
+#   time  integrate over the measured time between loop passes (default)
+#   midi  integrate over pygame.midi event timestamps, so a fader move counts from when it happened
+#   tick  the scripts' original fixed step per loop pass (linear_map_val), speed depends on the loop rate
+
+import os
+import time
+
+try:
+    import numpy as np
+except ImportError:  # only the time and midi modes need numpy
+    np = None
+
+from control_loop import DEFAULT_LOOP_RATE
+
+RATE_MODE_TICK = "tick"
+RATE_MODE_TIME = "time"
+RATE_MODE_MIDI = "midi"
+
+DEAD_BAND = (50, 77)  # fader values in between (inclusive) leave the joint where it is
+MAX_DT = 0.1  # sec integrated at most per step, a stalled loop does not make the joint jump
+
+
+class FaderRateControl(object):
+    # One entry per joint. Below the dead band a joint moves by
+    # (DEAD_BAND[0] - value) * low_gain counts per pass of a loop running at
+    # reference_rate, above it by (value - DEAD_BAND[1]) * high_gain, and stops at
+    # low_limit or high_limit when moving towards it. That is the speed of the
+    # per-pass code at reference_rate, now at any loop rate.
+    #
+    # setFader() integrates the old fader values up to the event first;
+    # update() integrates up to now and applies the motion to the goal positions,
+    # which the script owns (absolute mapping modes can move them in between).
+    def __init__(self, low_gains, high_gains, low_limits, high_limits, clock=time.perf_counter, event_timestamps=False,
+                 reference_rate=DEFAULT_LOOP_RATE, dead_band=DEAD_BAND, max_dt=MAX_DT):
+        if np is None:
+            raise ImportError("numpy is required for fader rate control, or set DXL_RATE_MODE=tick")
+        self.low_gains = np.asarray(low_gains, dtype=np.float64) * reference_rate  # counts/sec per fader step
+        self.high_gains = np.asarray(high_gains, dtype=np.float64) * reference_rate
+        self.low_limits = np.asarray(low_limits, dtype=np.float64)
+        self.high_limits = np.asarray(high_limits, dtype=np.float64)
+        self.clock = clock
+        self.event_timestamps = event_timestamps  # setFader() takes event times on the clock, otherwise now
+        self.dead_band = dead_band
+        self.max_dt = max_dt
+
+        self.values = np.full(len(self.low_gains), (dead_band[0] + dead_band[1]) / 2.0)
+        # counts integrated but not applied yet, below and above the dead band: a fader
+        # crossing it between updates moves towards both limits
+        self.pending_low = np.zeros(len(self.low_gains))
+        self.pending_high = np.zeros(len(self.low_gains))
+        self.last_time = None
+
+    def getVelocities(self):
+        # counts/sec of every joint at the current fader values, (below, above) the dead band
+        low = np.maximum(self.dead_band[0] - self.values, 0.0) * self.low_gains
+        high = np.maximum(self.values - self.dead_band[1], 0.0) * self.high_gains
+        return low, high
+
+    def getVelocity(self):
+        # counts/sec of every joint at the current fader values
+        low, high = self.getVelocities()
+        return low + high
+
+    def advance(self, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        if self.last_time is not None:
+            dt = min(max(timestamp - self.last_time, 0.0), self.max_dt)
+            low, high = self.getVelocities()
+            self.pending_low += low * dt
+            self.pending_high += high * dt
+        if self.last_time is None or timestamp > self.last_time:
+            self.last_time = timestamp
+
+    def setFader(self, joint, value, event_time=None):
+        self.advance(event_time if self.event_timestamps else None)
+        self.values[joint] = value
+
+    def reset(self):
+        # forget the time since the last update, e.g. after a pause of the rate mode
+        self.pending_low[:] = 0.0
+        self.pending_high[:] = 0.0
+        self.last_time = None
+
+    def update(self, positions, timestamp=None):
+        # positions moved by the motion since the last update, as a new array
+        self.advance(timestamp)
+        positions = np.asarray(positions, dtype=np.float64)
+        positions = self.applyMotion(positions, self.pending_low, self.low_limits)
+        positions = self.applyMotion(positions, self.pending_high, self.high_limits)
+        self.pending_low[:] = 0.0
+        self.pending_high[:] = 0.0
+        return positions
+
+    def applyMotion(self, positions, motion, limits):
+        # positions + motion, stopping at the limits the motion heads for
+        positions = positions + motion
+        positions = np.where((motion > 0) & (positions > limits), limits, positions)
+        return np.where((motion < 0) & (positions < limits), limits, positions)
+
+
+def rateControlFromEnvironment(low_gains, high_gains, low_limits, high_limits, name='DXL_RATE_MODE'):
+    # None in tick mode, the scripts then keep their per-pass code
+    mode = os.environ.get(name, RATE_MODE_TIME)
+    if mode == RATE_MODE_TICK:
+        return None
+    if mode == RATE_MODE_MIDI:
+        import pygame.midi
+
+        # the PortMidi clock, event timestamps are in the same milliseconds
+        return FaderRateControl(low_gains, high_gains, low_limits, high_limits,
+                                clock=lambda: pygame.midi.time() / 1000.0, event_timestamps=True)
+    if mode != RATE_MODE_TIME:
+        raise ValueError("%s must be %s, %s or %s" % (name, RATE_MODE_TIME, RATE_MODE_MIDI, RATE_MODE_TICK))
+    return FaderRateControl(low_gains, high_gains, low_limits, high_limits)
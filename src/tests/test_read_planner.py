@@ -0,0 +1,52 @@
+# ReadPlanner range merging and round choice
+
+from dynamixel_sdk.protocol2_packet_handler import Protocol2PacketHandler
+from dynamixel_sdk.read_planner import ReadPlanner, syncReadLength, statusLength
+from benchmarks.common import NullPort
+
+
+def makePlanner(transaction_ms=0.0):
+    return ReadPlanner(NullPort(57600), Protocol2PacketHandler(), transaction_ms=transaction_ms)
+
+
+def test_gaps_below_the_range_overhead_are_merged():
+    planner = makePlanner()
+    overhead = planner.getRangeOverhead()
+
+    assert planner.mergeRanges([(10, 2), (12 + overhead - 1, 2)]) == [(10, overhead + 3)]
+    assert planner.mergeRanges([(10, 2), (12 + overhead, 2)]) == [(10, 2), (12 + overhead, 2)]
+
+
+def test_range_count_merges_the_smallest_gaps_first():
+    planner = makePlanner()
+    ranges = [(0, 2), (40, 2), (100, 2)]
+
+    assert planner.mergeRanges(ranges) == ranges
+    assert planner.mergeRanges(ranges, 3) == ranges
+    assert planner.mergeRanges(ranges, 2) == [(0, 42), (100, 2)]
+    assert planner.mergeRanges(ranges, 1) == [(0, 102)]
+
+
+def test_rounds_use_sync_read_only_when_it_is_smaller():
+    planner = makePlanner()
+
+    entries, kind, length = planner.getRounds({1: [(132, 4)], 2: [(132, 4)]})[0]
+    assert kind == "sync"
+    assert length == syncReadLength(2) + 2 * statusLength(4)
+
+    entries, kind, _ = planner.getRounds({1: [(0, 2)], 2: [(100, 2)]})[0]
+    assert kind == "bulk"
+    assert entries == [(1, 0, 2), (2, 100, 2)]
+
+
+def test_plan_reads_the_gap_when_a_transaction_costs_more():
+    # one ID, two ranges 98 bytes apart: 2 short rounds on a fast link, 1 long one when a transaction is expensive
+    cheap = makePlanner(transaction_ms=0.0)
+    expensive = makePlanner(transaction_ms=20.0)
+    for planner in (cheap, expensive):
+        planner.addRead(1, 0, 2)
+        planner.addRead(1, 100, 2)
+        planner.makePlan()
+
+    assert [entries for _, _, entries in cheap.plan] == [[(1, 0, 2)], [(1, 100, 2)]]
+    assert [entries for _, _, entries in expensive.plan] == [[(1, 0, 102)]]
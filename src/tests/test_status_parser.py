@@ -0,0 +1,78 @@
+# Status packet parser regression tests, run from src with: python -m pytest tests
+
+from dynamixel_sdk.robotis_def import COMM_SUCCESS, COMM_RX_CORRUPT, COMM_RX_TIMEOUT
+from dynamixel_sdk.crc16 import updateCRC
+from dynamixel_sdk.protocol2_packet_handler import Protocol2PacketHandler
+from dynamixel_sdk.group_sync_read import GroupSyncRead
+from benchmarks.common import StreamPort, statusPacket, fastStatusPacket
+
+
+class ReplyPort(StreamPort):
+    # answers every transaction with the next reply of `replies`
+    def __init__(self, replies):
+        StreamPort.__init__(self, b'')
+        self.replies = list(replies)
+
+    def writePort(self, packet):
+        self.stream = self.replies.pop(0)
+        self.position = 0
+        return len(packet)
+
+
+def test_partial_reply_after_timeout_does_not_corrupt_next_reply():
+    good = statusPacket(1, b'\x00\x08')
+    port = ReplyPort([good[:9], good])
+    ph = Protocol2PacketHandler()
+
+    _, result, _ = ph.read2ByteTxRx(port, 1, 132)
+    assert result == COMM_RX_CORRUPT
+
+    data, result, _ = ph.read2ByteTxRx(port, 1, 132)
+    assert result == COMM_SUCCESS
+    assert data == 0x0800
+    assert not port.is_using
+
+
+def test_timeout_leaves_port_free():
+    port = ReplyPort([b''])
+    ph = Protocol2PacketHandler()
+
+    _, result, _ = ph.read2ByteTxRx(port, 1, 132)
+    assert result == COMM_RX_TIMEOUT
+    assert not port.is_using
+    assert ph.getStatusParser(port).getBytesAvailable() == 0
+
+
+def test_valid_reply_after_corrupt_one_is_kept():
+    bad = bytearray(statusPacket(1, b'\x00\x08'))
+    bad[-1] ^= 0xFF
+    good = statusPacket(1, b'\x01\x08')
+    port = ReplyPort([bytes(bad) + good])
+    ph = Protocol2PacketHandler()
+
+    assert ph.txPacket(port, ph.packet_builder.getPacket(0x01, 0, 1)) == COMM_SUCCESS
+    port.setPacketTimeout(11)
+    _, result = ph.rxPacket(port)
+    assert result == COMM_RX_CORRUPT
+
+    rxpacket, result = ph.rxPacket(port)
+    assert result == COMM_SUCCESS
+    assert bytes(rxpacket) == good
+
+
+def test_fast_sync_read_reply_with_stuffed_byte():
+    ph = Protocol2PacketHandler()
+    packet = ph.addStuffing(bytearray(fastStatusPacket([(1, b'\xff\xff\xfd\x00', 0), (2, b'\x10\x00\x00\x00', 0)])))
+    crc = updateCRC(0, packet, len(packet) - 2)
+    packet[-2:] = bytes([crc & 0xFF, crc >> 8])
+    assert len(packet) == len(fastStatusPacket([(1, b'\x00' * 4, 0), (2, b'\x00' * 4, 0)])) + 1
+
+    port = ReplyPort([bytes(packet)])
+    group = GroupSyncRead(port, ph, 132, 4, fast_read=True)
+    group.addParam(1)
+    group.addParam(2)
+
+    assert group.txRxPacket() == COMM_SUCCESS
+    assert group.isFastRead()
+    assert group.getData(1, 132, 4) == 0x00FDFFFF
+    assert group.getData(2, 132, 4) == 0x10
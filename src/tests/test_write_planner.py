@@ -0,0 +1,36 @@
+# WritePlanner Sync Write group choice
+
+from dynamixel_sdk.protocol2_packet_handler import Protocol2PacketHandler
+from dynamixel_sdk.write_planner import WritePlanner
+from benchmarks.common import NullPort
+
+
+def planPackets(writes):
+    planner = WritePlanner(NullPort(57600), Protocol2PacketHandler())
+    for dxl_id, address, data_length in writes:
+        planner.addWrite(dxl_id, address, data_length, 0)
+    planner.makePlan()
+    return planner.getReport()["packets"], planner
+
+
+def test_shared_register_of_many_ids_is_a_sync_write():
+    # Sync Write 14 + 5 * 5 and Bulk Write 10 + 6 = 55 bytes, one Bulk Write 10 + 5 * 9 + 6 = 61
+    packets, planner = planPackets([(dxl_id, 116, 4) for dxl_id in range(1, 6)] + [(6, 64, 1)])
+    assert packets == [("sync", 5), ("bulk", 1)]
+    assert (planner.plan_length, planner.bulk_length) == (55, 61)
+
+
+def test_few_ids_ride_in_the_bulk_write():
+    # Sync Write 14 + 3 * 5 and Bulk Write 10 + 6 = 45 bytes, one Bulk Write 10 + 3 * 9 + 6 = 43
+    packets, planner = planPackets([(1, 116, 4), (2, 116, 4), (3, 116, 4), (4, 64, 1)])
+    assert packets == [("bulk", 4)]
+    assert planner.plan_length == planner.bulk_length == 43
+
+
+def test_mixed_groups_choose_the_smallest_subset():
+    # IDs 1 and 2 write two registers, so without Sync Writes two Bulk Writes are needed (75 bytes).
+    # Sync Write of 116 only: 34 + 29 = 63, of 64 only: 18 + 53 = 71, both: 34 + 18 + 17 = 69
+    writes = [(dxl_id, 116, 4) for dxl_id in range(1, 5)] + [(1, 64, 1), (2, 64, 1), (5, 102, 2)]
+    packets, planner = planPackets(writes)
+    assert packets == [("sync", 4), ("bulk", 3)]
+    assert (planner.plan_length, planner.bulk_length) == (63, 75)
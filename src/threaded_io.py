@@ -0,0 +1,115 @@
+# Threaded MIDI input for the hand scripts: a reader thread drains PortMidi into a
+# latest-value mailbox, the control loop (the bus thread) maps and writes the newest values
+#
+#   midi_reader = MidiReader(obj_model_q.controller).start()
+#   obj_model_q.controller = midi_reader.mailbox   # _poll() reads the mailbox, never waits on PortMidi
+#   ...
+#   midi_reader.stop()
+#
+# A burst of fader events then costs the loop one event per fader, and a slow bus
+# transaction no longer leaves events piling up in the PortMidi buffer. With
+# DXL_RATE_MODE=midi every fader event is kept: the rate control integrates the
+# time between them, the motion of a dropped event would be lost.
+
+import collections
+import os
+import threading
+
+MIDI_READ_LENGTH = 64  # events taken from PortMidi per read
+MIDI_IDLE_WAIT = 0.0005  # sec between reads once the PortMidi buffer is drained
+QUEUED_CONTROLS = (46,)  # nanoKONTROL2 cycle button: every press toggles the mode, so no event is dropped
+
+
+class MidiMailbox(object):
+    # Stands in for pygame.midi.Input on the loop side. put() keeps only the newest
+    # event of every fader (control change number and channel); events of
+    # QUEUED_CONTROLS and other messages are all kept, and with keep_all every event
+    # is. read() returns the pending events in the order they last changed, with
+    # their PortMidi timestamps.
+    def __init__(self, queued_controls=QUEUED_CONTROLS, keep_all=False):
+        self.queued_controls = queued_controls
+        self.keep_all = keep_all
+        self.lock = threading.Lock()
+        self.pending = collections.OrderedDict()
+        self.sequence = 0  # key of the next kept-in-order event
+        self.error = None  # set by the reader when it stops on an exception
+
+        self.received_count = 0
+        self.replaced_count = 0  # fader events dropped for a newer value
+
+    def put(self, events):
+        with self.lock:
+            for event in events:
+                self.received_count += 1
+                status, control = event[0][0], event[0][1]
+                if not self.keep_all and (status & 0xF0) == 0xB0 and control not in self.queued_controls:
+                    key = (status & 0x0F, control)
+                    if key in self.pending:
+                        del self.pending[key]
+                        self.replaced_count += 1
+                else:
+                    key = self.sequence
+                    self.sequence += 1
+                self.pending[key] = event
+
+    def poll(self):
+        return len(self.pending) > 0
+
+    def read(self, length):
+        if self.error is not None:
+            raise self.error
+        events = []
+        with self.lock:
+            while self.pending and len(events) < length:
+                events.append(self.pending.popitem(last=False)[1])
+        return events
+
+    def close(self):
+        pass
+
+
+class MidiReader(threading.Thread):
+    # Reads midi_input (pygame.midi.Input) into the mailbox until stop(). The input is
+    # only touched by this thread from start() on; an exception ends the thread and is
+    # raised again by the next mailbox read().
+    def __init__(self, midi_input, mailbox=None, read_length=MIDI_READ_LENGTH, idle_wait=MIDI_IDLE_WAIT):
+        threading.Thread.__init__(self, name="midi_reader")
+        self.daemon = True
+        self.midi_input = midi_input
+        self.mailbox = mailbox if mailbox is not None else MidiMailbox()
+        self.read_length = read_length
+        self.idle_wait = idle_wait
+        self.stopped = threading.Event()
+
+    def start(self):
+        threading.Thread.start(self)
+        return self
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                events = self.midi_input.read(self.read_length)
+                if events:
+                    self.mailbox.put(events)
+                if len(events) < self.read_length:
+                    # buffer drained; waiting (not spinning) also lets the loop thread have the GIL
+                    self.stopped.wait(self.idle_wait)
+        except Exception as e:
+            self.mailbox.error = e
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def midiReaderFromEnvironment(model_q, name='DXL_THREADED'):
+    # DXL_THREADED=1 moves the MIDI reads of model_q to a MidiReader and returns it;
+    # unset (or 0) returns None and model_q reads PortMidi itself
+    if os.environ.get(name, '') in ('', '0'):
+        return None
+    # a rate control integrating event timestamps (DXL_RATE_MODE=midi) needs every fader event
+    rate_control = getattr(model_q, "rate_control", None)
+    keep_all = rate_control is not None and rate_control.event_timestamps
+    midi_reader = MidiReader(model_q.controller, mailbox=MidiMailbox(keep_all=keep_all)).start()
+    model_q.controller = midi_reader.mailbox
+    return midi_reader